@@ -2,23 +2,193 @@
 Streamlit編集UI
 収録したスクリーンショットを編集してPowerPointを生成
 """
+import math
 import streamlit as st
 from pathlib import Path
-from config import SESSIONS_DIR
-from utils.image_manager import ImageManager
-from exporter.pptx_generator import PPTXGenerator
+from datetime import datetime
+from config import SESSIONS_DIR, ARCHIVES_DIR, PPTX_STREAMING_MIN_SLIDES, GRID_PAGE_SIZE, BLOB_STORE_ENABLED, FILE_SERVER_PORT
+from utils.image_manager import ImageManager, order_from_positions
+from utils.blob_store import BlobStore
+from utils.session_recovery import recover_session, recover_all_sessions
+from utils.session_ops import merge_sessions, split_session, MODE_LINK, MODE_MOVE
+from utils.thumbnail import ThumbnailCache
+from utils.session_index import SessionIndex
+from utils.file_server import FileServer
+from utils.duplicate_finder import PerceptualHashCache, find_duplicates
+from utils.compaction import compact_session
+from utils.session_archive import ARCHIVE_SUFFIX, export_session, import_archive, open_archive, split_member_path
+from exporter.pptx_generator import PPTXGenerator, STAGE_IMAGES
+from exporter.render_cache import RenderCache
+from exporter.image_processor import CropSettings
+from exporter.overlay import OverlaySettings
+from exporter.html_generator import HTMLGenerator
+from exporter.pdf_generator import PDFGenerator
+from exporter.export_jobs import (
+    ExportJob,
+    ExportJobManager,
+    STATUS_DONE,
+    STATUS_FAILED,
+    STATUS_CANCELLED,
+)
+
+
+# 出力ジョブの進捗を確認する間隔（秒）
+EXPORT_POLL_INTERVAL = 0.5
+
+# 出力形式ごとの表示名とMIMEタイプ
+EXPORT_FORMATS = {
+    ".pptx": ("PowerPoint", "application/vnd.openxmlformats-officedocument.presentationml.presentation"),
+    ".pdf": ("PDF", "application/pdf"),
+}
 
 
 def cleanup_session_state():
     """古いUIステートフラグを削除"""
     keys_to_delete = [
         k for k in st.session_state.keys()
-        if k.startswith(("confirm_delete_", "desc_input_"))
+        if k.startswith(("confirm_delete_", "desc_input_", "full_", "grid_", "reorder_", "duplicates_"))
     ]
     for key in keys_to_delete:
         del st.session_state[key]
 
 
+@st.cache_resource(show_spinner="セッションを検査しています...")
+def run_startup_recovery():
+    """
+    起動時に全セッションを並列に復旧（サーバープロセスごとに1回のみ実行）
+
+    Returns:
+        RecoveryReportのリスト
+    """
+    return recover_all_sessions()
+
+
+@st.cache_resource(show_spinner="削除した画像の領域を回収しています...")
+def run_startup_blob_gc() -> int:
+    """
+    起動時に削除済み画像のリンクを外し、参照のなくなったブロブを回収（サーバープロセスごとに1回のみ実行）
+
+    削除した画像はUndoのためにファイルを残しているため、Undoできなくなる起動時にまとめて回収する。
+
+    Returns:
+        削除したブロブの数
+    """
+    if not BLOB_STORE_ENABLED:
+        return 0
+    return BlobStore().gc(SESSIONS_DIR)
+
+
+@st.cache_resource
+def get_export_jobs() -> ExportJobManager:
+    """
+    出力ジョブ管理を取得（サーバープロセスで共有し、再実行をまたいで保持）
+
+    Returns:
+        ExportJobManagerインスタンス
+    """
+    return ExportJobManager()
+
+
+@st.cache_resource
+def get_thumbnails() -> ThumbnailCache:
+    """
+    サムネイルキャッシュを取得（サーバープロセスで共有し、再実行をまたいで保持）
+
+    Returns:
+        ThumbnailCacheインスタンス
+    """
+    thumbnails = ThumbnailCache()
+    # 起動時に上限サイズを超えた分（削除・差し替えられた画像の古いサムネイルなど）を削除
+    thumbnails.prune()
+    return thumbnails
+
+
+@st.cache_resource
+def get_file_server() -> FileServer | None:
+    """
+    ダウンロードサーバーを起動して取得（サーバープロセスで1つだけ起動）
+
+    Returns:
+        FileServerインスタンス（ポートが使用中などで起動できない場合はNone）
+    """
+    try:
+        return FileServer().start()
+    except OSError:
+        return None
+
+
+def download_file_button(label: str, path: Path, mime: str):
+    """
+    出力ファイルのダウンロードボタンを表示
+
+    ブラウザから接続できる場合はダウンロードサーバーのURLを、ブラウザが編集UIへのアクセスに使った
+    ホスト名で作成する。接続できない場合（ループバックで待ち受けていて他のPCから開いている、
+    サーバーを起動できなかった）は警告を表示し、Streamlitのダウンロードボタンで送信する。
+
+    Args:
+        label: ボタンの表示名
+        path: ダウンロードするファイル
+        mime: MIMEタイプ
+    """
+    server = get_file_server()
+    request_host = st.context.headers.get("Host")
+    if server is not None and server.reachable_from(request_host):
+        st.link_button(
+            label,
+            server.register(path, mime=mime, request_host=request_host),
+            use_container_width=True
+        )
+        return
+    if server is None:
+        st.warning(f"⚠️ ダウンロードサーバー（ポート{FILE_SERVER_PORT}）を起動できなかったため、ファイルをメモリに読み込んで送信します")
+    else:
+        st.warning(
+            f"⚠️ ダウンロードサーバーが {server.host} で待ち受けているため、このブラウザからは接続できません。"
+            "ファイルをメモリに読み込んで送信します（config.py の FILE_SERVER_HOST / FILE_SERVER_PUBLIC_URL を確認してください）"
+        )
+    with open(path, 'rb') as f:
+        st.download_button(label, f, file_name=Path(path).name, mime=mime, use_container_width=True)
+
+
+@st.cache_resource
+def get_hash_cache() -> PerceptualHashCache:
+    """
+    知覚ハッシュのキャッシュを取得（サーバープロセスで共有し、再実行をまたいで保持）
+
+    Returns:
+        PerceptualHashCacheインスタンス
+    """
+    return PerceptualHashCache()
+
+
+@st.cache_resource
+def get_session_index() -> SessionIndex:
+    """
+    セッション一覧のインデックスを取得（サーバープロセスで共有し、再実行をまたいで保持）
+
+    Returns:
+        SessionIndexインスタンス
+    """
+    return SessionIndex()
+
+
+def show_recovery_summary():
+    """起動時復旧の結果をサイドバーに表示"""
+    reports = [r for r in run_startup_recovery() if r.changed or r.error]
+    if not reports:
+        return
+    with st.sidebar.expander(f"🩺 復旧したセッション ({len(reports)}件)"):
+        for report in reports:
+            if report.error:
+                st.error(f"`{report.session_dir.name}`: {report.error}")
+                continue
+            st.markdown(
+                f"`{report.session_dir.name}`: "
+                f"復元 {len(report.restored)}枚 / 欠損 {len(report.missing)}枚"
+                + (f" / パス付け替え {len(report.relocated)}枚" if report.relocated else "")
+            )
+
+
 def main():
     """メインアプリケーション"""
     st.set_page_config(
@@ -27,6 +197,9 @@ def main():
         layout="wide"
     )
 
+    show_recovery_summary()
+    run_startup_blob_gc()
+
     st.title("📸 Manual Maker - 編集UI")
     st.markdown("収録したスクリーンショットを編集してPowerPointマニュアルを生成します")
 
@@ -53,6 +226,12 @@ def main():
             if "current_session" in st.session_state and st.session_state.current_session != session_dir:
                 cleanup_session_state()
 
+            # 起動後に作成・変更されたセッションも開く時点で1回だけ突き合わせる
+            report = recover_session(session_dir)
+            if report.restored:
+                st.toast(f"🩺 メタデータにない画像を{len(report.restored)}枚復元しました")
+            if report.relocated:
+                st.toast(f"🩺 移動したセッションの画像パスを{len(report.relocated)}枚付け替えました")
             st.session_state.image_manager = ImageManager(session_dir)
             st.session_state.current_session = session_dir
         except Exception as e:
@@ -61,6 +240,19 @@ def main():
 
     manager = st.session_state.image_manager
 
+    # 収録中のセッションで追加された画像を差分で取り込み（変更がなければstatのみ）
+    try:
+        new_images = manager.refresh()
+        if new_images:
+            # 新しい画像のサムネイルは表示を待たずにバックグラウンドで作成
+            get_thumbnails().prefetch([img.filepath for img in new_images])
+            st.toast(f"📸 新しい画像を{len(new_images)}枚取り込みました")
+    except TimeoutError as e:
+        st.warning(f"⚠️ メタデータがロック中のため最新の状態を取得できませんでした: {e}")
+
+    if st.sidebar.button("🔄 新しい画像を確認", help="収録中のセッションに追加された画像を取り込みます"):
+        st.rerun()
+
     # 画像リストを表示
     try:
         images = manager.get_images()
@@ -68,6 +260,45 @@ def main():
         st.error(f"❌ 画像リストの取得に失敗しました: {e}")
         return
 
+    # 削除・Undo・取り込みで画像数が変わったらセッション一覧の項目を更新
+    entry = get_session_index().get(session_dir.name)
+    if entry is None or entry.image_count != len(images):
+        try:
+            get_session_index().update(session_dir)
+        except TimeoutError:
+            pass  # 次回の再実行で更新する
+
+    session_tools_ui(session_dir, len(images))
+    compaction_ui(session_dir)
+    archive_ui(session_dir)
+
+    if len(images) == 0:
+        st.subheader("📷 画像一覧 (0枚)")
+        st.warning("このセッションには画像がありません")
+        return
+
+    # 画像の編集（操作時は画像一覧の部分だけを再実行）
+    image_editor()
+
+    # PowerPoint生成UI
+    st.divider()
+    export_pptx_ui(session_dir, manager, images)
+
+    # HTML出力UI
+    export_html_ui(session_dir, images)
+
+
+@st.fragment
+def image_editor():
+    """
+    画像一覧の編集UI（Undo・ページ切り替え・画像グリッド）
+
+    フラグメントとして描画するため、並び替え・削除・説明文の保存では
+    この部分だけが再実行される（セッション選択や出力UIは再実行しない）。
+    """
+    manager = st.session_state.image_manager
+    images = manager.get_images()
+
     st.subheader(f"📷 画像一覧 ({len(images)}枚)")
 
     if len(images) == 0:
@@ -80,47 +311,188 @@ def main():
             try:
                 if manager.undo():
                     st.success("✅ 操作を元に戻しました")
-                    st.rerun()
+                    st.rerun(scope="fragment")
                 else:
                     st.warning("⚠️ 元に戻せる操作がありません")
             except Exception as e:
                 st.error(f"❌ 操作を元に戻すことに失敗しました: {e}")
 
-    # 画像グリッド表示（3列）
-    display_image_grid(images)
+    # 一覧での並び替え（何枚動かしても1回の操作として保存）
+    reorder_ui(manager, images)
 
-    # PowerPoint生成UI
-    st.divider()
-    export_pptx_ui(session_dir, manager, images)
+    # 重複した手順の検出と一括削除
+    duplicates_ui(manager, images)
+
+    # 画像グリッド表示（3列、表示中のページのみ）
+    start, end = grid_page_ui(len(images))
+    display_image_grid(images, start, end)
 
 
-def display_image_grid(images):
+def reorder_ui(manager: ImageManager, images):
+    """
+    番号を書き換えて並び替えるUI（確定時に1回の reorder_images で保存）
+
+    Args:
+        manager: ImageManagerインスタンス
+        images: ImageDataのリスト
+    """
+    # 全画像の一覧になるため、開いているときだけ描画する
+    if not st.toggle("↕️ 一覧で並び替え", key="reorder_open"):
+        return
+
+    st.caption("移動したい画像の番号を書き換えて確定してください（例: 1.5 で1番目と2番目の間へ）")
+    # 確定・Undoのたびに編集内容をリセットするため、キーに版数を含める
+    version = st.session_state.get("reorder_version", 0)
+    edited = st.data_editor(
+        {
+            "番号": [i + 1 for i in range(len(images))],
+            "ファイル": [Path(img.filepath).name for img in images],
+            "説明": [img.description for img in images],
+        },
+        column_config={
+            "番号": st.column_config.NumberColumn("番号", min_value=0, step=0.5, required=True),
+        },
+        disabled=["ファイル", "説明"],
+        hide_index=True,
+        use_container_width=True,
+        key=f"reorder_editor_{version}_{len(manager.undo_stack)}"
+    )
+
+    if st.button("✅ 並び順を確定", key="reorder_commit"):
+        try:
+            manager.reorder_images(order_from_positions(edited["番号"]))
+            st.session_state.reorder_version = version + 1
+            st.rerun(scope="fragment")
+        except Exception as e:
+            st.error(f"❌ 並び替えに失敗しました: {e}")
+
+
+def duplicates_ui(manager: ImageManager, images):
+    """
+    ほぼ同じ画像が続く区間の一覧と一括削除UI（各区間の先頭の画像を残す）
+
+    Args:
+        manager: ImageManagerインスタンス
+        images: ImageDataのリスト
+    """
+    if not st.toggle("🧹 重複した手順を探す", key="duplicates_open"):
+        return
+
+    # ファイルのない画像は比較しない（区間のインデックスは present で画像一覧の位置に戻す）
+    present = [i for i, img in enumerate(images) if not img.missing]
+    try:
+        with st.spinner("画像を比較しています..."):
+            runs = find_duplicates([images[i].filepath for i in present], get_hash_cache())
+    except Exception as e:
+        st.error(f"❌ 重複の検出に失敗しました: {e}")
+        return
+
+    if not runs:
+        st.info("ほぼ同じ画像が続く箇所はありません")
+        return
+
+    thumbnails = get_thumbnails().ensure([images[present[run.start]].filepath for run in runs])
+    selected = []
+    for run, thumbnail in zip(runs, thumbnails):
+        first, last = present[run.start], present[run.end]
+        duplicates = [present[i] for i in run.duplicates]
+        cols = st.columns([1, 4])
+        with cols[0]:
+            st.image(str(thumbnail), use_container_width=True)
+        with cols[1]:
+            label = f"手順 {first + 1}〜{last + 1}: 手順 {first + 1} を残して{len(duplicates)}枚を削除"
+            if st.checkbox(label, value=True, key=f"duplicates_run_{first}_{last}"):
+                selected.extend(duplicates)
+
+    if st.button(f"🗑️ 選択した重複をまとめて削除（{len(selected)}枚）", type="primary", disabled=not selected):
+        try:
+            count = manager.delete_images(selected)
+            st.toast(f"✅ {count}枚を削除しました（元に戻すボタンで1回で戻せます）")
+            st.rerun(scope="fragment")
+        except Exception as e:
+            st.error(f"❌ 削除に失敗しました: {e}")
+
+
+def grid_page_ui(image_count: int) -> tuple[int, int]:
+    """
+    画像グリッドのページ切り替え・手順へのジャンプ
+
+    Args:
+        image_count: 画像数
+
+    Returns:
+        表示する画像の範囲 (開始インデックス, 終了インデックス)
+    """
+    pages = max(1, math.ceil(image_count / GRID_PAGE_SIZE))
+    if pages == 1:
+        return 0, image_count
+
+    # 画像の削除・分割でページ数が減った場合は最後のページに合わせる
+    if st.session_state.get("grid_page", 1) > pages:
+        st.session_state.grid_page = pages
+
+    def jump_to_step():
+        st.session_state.grid_page = (st.session_state.grid_jump - 1) // GRID_PAGE_SIZE + 1
+
+    page_cols = st.columns([1, 1, 1, 2])
+    with page_cols[0]:
+        page = st.number_input(f"ページ（全{pages}ページ）", min_value=1, max_value=pages, key="grid_page")
+    with page_cols[1]:
+        st.number_input("手順番号", min_value=1, max_value=image_count, key="grid_jump")
+    with page_cols[2]:
+        st.button("➡️ 手順へ移動", on_click=jump_to_step)
+
+    start = (page - 1) * GRID_PAGE_SIZE
+    end = min(start + GRID_PAGE_SIZE, image_count)
+    with page_cols[3]:
+        st.caption(f"手順 {start + 1}〜{end} を表示中（全{image_count}枚）")
+    return start, end
+
+
+def display_image_grid(images, start: int = 0, end: int | None = None):
     """
     画像を3列グリッドで表示
 
     Args:
         images: ImageDataのリスト
+        start: 表示する最初の画像のインデックス
+        end: 表示する範囲の終わり（このインデックスの画像は含まない。省略時は最後まで）
     """
     # 3列グリッド
     cols_per_row = 3
+    end = len(images) if end is None else end
+
+    # 表示する画像のサムネイルをまとめて並列に作成（作成済みのものはパスの確認のみ）
+    paths = [img.filepath for img in images[start:end] if not img.missing]
+    try:
+        thumbnails = dict(zip(paths, get_thumbnails().ensure(paths)))
+        # 次のページのサムネイルはバックグラウンドで用意
+        get_thumbnails().prefetch(
+            [img.filepath for img in images[end:end + end - start] if not img.missing]
+        )
+    except Exception as e:
+        st.warning(f"⚠️ サムネイルの作成に失敗したため元画像を表示します: {e}")
+        thumbnails = {}
 
-    for i in range(0, len(images), cols_per_row):
+    for i in range(start, end, cols_per_row):
         cols = st.columns(cols_per_row)
 
         for col_idx, col in enumerate(cols):
             img_idx = i + col_idx
 
-            if img_idx >= len(images):
+            if img_idx >= end:
                 break
 
             img_data = images[img_idx]
             img_path = Path(img_data.filepath)
 
             with col:
-                if img_path.exists():
-                    # サムネイル表示
+                # ファイルの存在確認は起動時の復旧処理で済んでいる（missingフラグ）
+                if not img_data.missing:
+                    # サムネイル表示（元画像は切り替え時のみ読み込む）
+                    show_full = st.toggle("🔍 元のサイズで表示", key=f"full_{img_idx}")
                     st.image(
-                        str(img_path),
+                        str(img_path if show_full else thumbnails.get(img_data.filepath, img_path)),
                         use_container_width=True,
                         caption=f"#{img_idx + 1}"
                     )
@@ -135,7 +507,7 @@ def display_image_grid(images):
                                 try:
                                     manager = st.session_state.image_manager
                                     manager.swap_images(img_idx, img_idx - 1)
-                                    st.rerun()
+                                    st.rerun(scope="fragment")
                                 except Exception as e:
                                     st.error(f"❌ 並び替えに失敗しました: {e}")
 
@@ -146,7 +518,7 @@ def display_image_grid(images):
                                 try:
                                     manager = st.session_state.image_manager
                                     manager.swap_images(img_idx, img_idx + 1)
-                                    st.rerun()
+                                    st.rerun(scope="fragment")
                                 except Exception as e:
                                     st.error(f"❌ 並び替えに失敗しました: {e}")
 
@@ -155,7 +527,7 @@ def display_image_grid(images):
                         if st.button("🗑️ 削除", key=f"delete_{img_idx}", type="secondary"):
                             # 確認用のセッションステート
                             st.session_state[f"confirm_delete_{img_idx}"] = True
-                            st.rerun()
+                            st.rerun(scope="fragment")
 
                     # 削除確認ダイアログ
                     if st.session_state.get(f"confirm_delete_{img_idx}", False):
@@ -169,13 +541,13 @@ def display_image_grid(images):
                                         manager.delete_image(img_idx)
                                         st.session_state[f"confirm_delete_{img_idx}"] = False
                                         st.success(f"✅ 画像#{img_idx + 1}を削除しました")
-                                        st.rerun()
+                                        st.rerun(scope="fragment")
                                     except Exception as e:
                                         st.error(f"❌ 削除に失敗しました: {e}")
                             with confirm_cols[1]:
                                 if st.button("❌ キャンセル", key=f"confirm_no_{img_idx}"):
                                     st.session_state[f"confirm_delete_{img_idx}"] = False
-                                    st.rerun()
+                                    st.rerun(scope="fragment")
 
                     # 説明文編集フォーム
                     with st.expander("✏️ 説明文を編集", expanded=False):
@@ -195,7 +567,7 @@ def display_image_grid(images):
 
 def edit_description_form(img_idx: int, img_data):
     """
-    説明文編集フォーム
+    説明文編集フォーム（入力中は再実行せず、保存時のみ反映）
 
     Args:
         img_idx: 画像のインデックス
@@ -206,21 +578,25 @@ def edit_description_form(img_idx: int, img_data):
     # 現在の説明文を初期値として表示
     current_desc = img_data.description or ""
 
-    new_desc = st.text_area(
-        "説明文",
-        value=current_desc,
-        key=f"desc_input_{img_idx}",
-        height=100,
-        placeholder="この操作の説明を入力してください..."
-    )
+    # 入力欄は画像ごとのキーで保持（並び替え後も入力途中の内容が別の画像に移らない）
+    with st.form(key=f"desc_form_{img_idx}", border=False):
+        new_desc = st.text_area(
+            "説明文",
+            value=current_desc,
+            key=f"desc_input_{Path(img_data.filepath).name}",
+            height=100,
+            placeholder="この操作の説明を入力してください..."
+        )
 
-    # 保存ボタン
-    if st.button("💾 保存", key=f"save_desc_{img_idx}"):
+        # 保存ボタン
+        saved = st.form_submit_button("💾 保存")
+
+    if saved:
         if new_desc != current_desc:
             try:
                 manager.update_description(img_idx, new_desc)
                 st.success("✅ 説明文を更新しました")
-                st.rerun()
+                st.rerun(scope="fragment")
             except Exception as e:
                 st.error(f"❌ 説明文の更新に失敗しました: {e}")
         else:
@@ -229,14 +605,14 @@ def edit_description_form(img_idx: int, img_data):
 
 def export_pptx_ui(session_dir: Path, manager: ImageManager, images):
     """
-    PowerPoint出力UI
+    PowerPoint・PDF出力UI
 
     Args:
         session_dir: セッションディレクトリ
         manager: ImageManagerインスタンス
         images: ImageDataのリスト
     """
-    st.subheader("📊 PowerPoint出力")
+    st.subheader("📊 PowerPoint・PDF出力")
 
     col1, col2 = st.columns([3, 1])
 
@@ -251,39 +627,270 @@ def export_pptx_ui(session_dir: Path, manager: ImageManager, images):
     with col2:
         st.write("")  # スペース調整
         st.write("")
+        focus_crop = st.checkbox(
+            "🔍 クリック位置を拡大",
+            help="クリックした位置の周辺（前の手順から変化した領域を含む）を切り抜いてスライドに配置します"
+        )
+        show_clicks = st.checkbox(
+            "🖱️ クリック位置を表示",
+            help="クリックした位置に印を付け、変化した領域を枠で囲みます（元の画像は変更しません）"
+        )
+
+    jobs = get_export_jobs()
+    pptx_path = session_dir / f"{session_dir.name}_manual.pptx"
+    pdf_path = session_dir / f"{session_dir.name}_manual.pdf"
 
-    # 生成ボタン
-    if st.button("📥 PowerPoint生成", type="primary", use_container_width=True):
+    # 生成ボタン（内容が前回と同じなら生成済みのファイルをそのまま使う）
+    button_cols = st.columns(2)
+    with button_cols[0]:
+        pptx_clicked = st.button("📥 PowerPoint生成", type="primary", use_container_width=True)
+    with button_cols[1]:
+        pdf_clicked = st.button("📄 PDF生成", use_container_width=True)
+
+    if pptx_clicked or pdf_clicked:
         if len(images) == 0:
-            st.error("画像がありません。PowerPointを生成できません。")
+            st.error("画像がありません。ファイルを生成できません。")
+            return
+
+    if pptx_clicked:
+        # 処理済み画像を再利用し、変更のあったスライドの画像だけを処理
+        # 大規模なマニュアルはスライドを1枚ずつ書き出してメモリ使用量を抑える
+        generator = PPTXGenerator(
+            cache=RenderCache(),
+            streaming=len(images) >= PPTX_STREAMING_MIN_SLIDES,
+            crop=CropSettings() if focus_crop else None,
+            overlay=OverlaySettings() if show_clicks else None
+        )
+        jobs.submit(generator, images, pptx_path, title=title)
+
+    if pdf_clicked:
+        # PDFは常にページを1枚ずつ書き出す
+        jobs.submit(PDFGenerator(cache=RenderCache()), images, pdf_path, title=title)
+
+    # 実行中は進捗表示の部分だけを一定間隔で再実行（画像グリッドは再描画しない）
+    polling = any(
+        job is not None and not job.finished
+        for job in (jobs.latest(pptx_path), jobs.latest(pdf_path))
+    )
+    st.fragment(export_jobs_status, run_every=EXPORT_POLL_INTERVAL if polling else None)(
+        [pptx_path, pdf_path], polling
+    )
+
+
+def export_jobs_status(output_paths: list[Path], polling: bool):
+    """
+    出力先ごとの最新ジョブの状態を表示（フラグメントとして実行）
+
+    Args:
+        output_paths: 出力ファイルパスのリスト
+        polling: 一定間隔で再実行しているかどうか
+    """
+    jobs = get_export_jobs()
+    running = False
+    for output_path in output_paths:
+        job = jobs.latest(output_path)
+        if job:
+            running |= show_export_job(job)
+
+    if polling and not running:
+        # すべて終了したら全体を再実行して定期実行を止める
+        st.rerun()
+
+
+def show_export_job(job: ExportJob) -> bool:
+    """
+    出力ジョブの状態を表示
+
+    Args:
+        job: 出力ジョブ
+
+    Returns:
+        実行中かどうか
+    """
+    label, mime = EXPORT_FORMATS[job.output_path.suffix]
+    output_filename = job.output_path.name
+
+    if not job.finished:
+        stage_label = "画像を準備中" if job.stage == STAGE_IMAGES else "ページを作成中"
+        st.progress(job.progress, text=f"{label}: {stage_label}... ({job.done}/{job.total})")
+        if st.button("⏹️ キャンセル", key=f"cancel_export_{job.key}"):
+            job.cancel()
+        return True
+
+    if job.status == STATUS_DONE:
+        if not job.result_valid:
+            st.info(f"{label}の出力ファイルが変更されています。もう一度生成してください。")
+            return False
+
+        st.success(f"✅ {label}ファイルを生成しました: `{output_filename}`")
+
+        # ダウンロードリンク（ファイルはダウンロードサーバーがディスクから直接配信）
+        download_file_button(f"💾 {label}をダウンロード", job.output_path, mime)
+    elif job.status == STATUS_FAILED:
+        st.error(f"❌ {label}生成中にエラーが発生しました: {job.error}")
+    elif job.status == STATUS_CANCELLED:
+        st.warning(f"⏹️ {label}の生成をキャンセルしました")
+    return False
+
+
+def export_html_ui(session_dir: Path, images):
+    """
+    HTML出力UI（セッションディレクトリ内の html/ に書き出す）
+
+    Args:
+        session_dir: セッションディレクトリ
+        images: ImageDataのリスト
+    """
+    with st.expander("🌐 HTML出力（イントラネット公開用）"):
+        title = st.text_input("マニュアルのタイトル", value="操作マニュアル", key="html_title")
+        if st.button("🌐 HTML生成", disabled=len(images) == 0):
+            output_dir = session_dir / "html"
+            try:
+                with st.spinner("HTMLを生成中..."):
+                    # 内容ハッシュの計算結果を再利用し、新しい手順の画像だけを処理
+                    index_path = HTMLGenerator(cache=RenderCache()).generate(images, output_dir, title=title)
+                st.success(f"✅ HTMLを生成しました: `{index_path}`")
+                st.caption("html フォルダごと公開してください")
+            except Exception as e:
+                st.error(f"❌ HTML生成中にエラーが発生しました: {e}")
+
+
+def session_tools_ui(session_dir: Path, image_count: int):
+    """
+    セッションの結合・分割UI（サイドバー）
+
+    Args:
+        session_dir: 選択中のセッションディレクトリ
+        image_count: 選択中のセッションの画像数
+    """
+    with st.sidebar.expander("🔀 セッションの結合・分割"):
+        st.markdown("**結合**")
+        other_names = sorted(name for name in get_session_index().sessions if name != session_dir.name)
+        merge_names = st.multiselect(
+            "後ろに結合するセッション",
+            options=other_names,
+            help="選択した順に、現在のセッションの後ろへ並びます"
+        )
+        move = st.checkbox("元のセッションから画像を移動する", help="オフの場合はハードリンクで元のセッションを残します")
+        if st.button("🔗 結合して新しいセッションを作成", disabled=not merge_names):
+            dest_dir = SESSIONS_DIR / datetime.now().strftime("session_%Y%m%d_%H%M%S_merged")
+            try:
+                sources = [session_dir] + [SESSIONS_DIR / name for name in merge_names]
+                count = merge_sessions(sources, dest_dir, mode=MODE_MOVE if move else MODE_LINK)
+                for updated_dir in (sources if move else []) + [dest_dir]:
+                    get_session_index().update(updated_dir)
+                st.session_state.pop("image_manager", None)
+                st.success(f"✅ {count}枚を `{dest_dir.name}` に結合しました")
+            except Exception as e:
+                st.error(f"❌ 結合に失敗しました: {e}")
+            else:
+                # 破棄した ImageManager・移動した画像で画像一覧を描画しないよう読み込み直す
+                st.rerun()
+
+        st.markdown("**分割**")
+        if image_count < 2:
+            st.caption("画像が2枚以上あるセッションのみ分割できます")
             return
+        split_at = st.number_input(
+            "この番号以降を新しいセッションへ移動",
+            min_value=2,
+            max_value=image_count,
+            value=image_count
+        )
+        if st.button("✂️ 分割"):
+            dest_dir = SESSIONS_DIR / f"{session_dir.name}_from{split_at:04d}"
+            try:
+                count = split_session(session_dir, split_at - 1, dest_dir)
+                for updated_dir in (session_dir, dest_dir):
+                    get_session_index().update(updated_dir)
+                st.session_state.pop("image_manager", None)
+                st.success(f"✅ {count}枚を `{dest_dir.name}` に移動しました")
+                st.rerun()
+            except Exception as e:
+                st.error(f"❌ 分割に失敗しました: {e}")
+
 
+def compaction_ui(session_dir: Path):
+    """
+    画像の圧縮UI（サイドバー）
+
+    Args:
+        session_dir: 選択中のセッションディレクトリ
+    """
+    with st.sidebar.expander("🗜️ 画像の圧縮"):
+        st.caption("画像を最大圧縮で保存し直してディスク容量を減らします（圧縮済みの画像は飛ばします）")
+        if not st.button("🗜️ 画像を圧縮"):
+            return
+        progress = st.progress(0.0, text="圧縮中...")
         try:
-            # 出力ファイル名
-            output_filename = f"{session_dir.name}_manual.pptx"
-            output_path = session_dir / output_filename
-
-            # PowerPoint生成
-            with st.spinner("PowerPointファイルを生成中..."):
-                generator = PPTXGenerator()
-                result_path = generator.generate(images, output_path, title=title)
-
-            st.success(f"✅ PowerPointファイルを生成しました: `{output_filename}`")
-
-            # ダウンロードボタン（ファイルをメモリに読み込んでから渡す）
-            with open(result_path, "rb") as f:
-                pptx_data = f.read()
-
-            st.download_button(
-                label="💾 ダウンロード",
-                data=pptx_data,
-                file_name=output_filename,
-                mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-                use_container_width=True
+            report = compact_session(
+                session_dir,
+                progress_callback=lambda done, total: progress.progress(done / total, text=f"圧縮中... ({done}/{total})")
             )
+            get_session_index().update(session_dir)
+        except Exception as e:
+            st.error(f"❌ 圧縮に失敗しました: {e}")
+            return
+        progress.empty()
+        st.success(
+            f"✅ {report.compacted}枚を圧縮し、{report.bytes_saved / 1024 ** 2:.1f} MB 削減しました"
+            f"（{report.skipped}枚は圧縮済み・共有中のため対象外）"
+        )
+        for error in report.errors:
+            st.warning(f"⚠️ {error}")
+
+
+def archive_ui(session_dir: Path):
+    """
+    セッションのアーカイブUI（サイドバー）
 
+    アーカイブ内の画像は展開せずにメモリマップから直接読み込んでプレビューする。
+
+    Args:
+        session_dir: 選択中のセッションディレクトリ
+    """
+    with st.sidebar.expander("📦 アーカイブ"):
+        st.caption("セッションを1つのファイル（.zip）にまとめ、コピー・バックアップ・共有を速くします")
+        archive_path = ARCHIVES_DIR / f"{session_dir.name}{ARCHIVE_SUFFIX}"
+        if st.button("📦 このセッションをアーカイブ"):
+            try:
+                count = export_session(session_dir, archive_path)
+                st.success(f"✅ {count}枚を `{archive_path.name}` にまとめました")
+            except Exception as e:
+                st.error(f"❌ アーカイブの作成に失敗しました: {e}")
+        if archive_path.exists():
+            download_file_button("💾 アーカイブをダウンロード", archive_path, "application/zip")
+
+        archives = sorted(ARCHIVES_DIR.glob(f"*{ARCHIVE_SUFFIX}")) if ARCHIVES_DIR.exists() else []
+        if not archives:
+            return
+        st.markdown("**アーカイブを開く**")
+        selected = st.selectbox("アーカイブ", options=archives, format_func=lambda path: path.name, key="archive_selected")
+        try:
+            images = open_archive(selected).images()
         except Exception as e:
-            st.error(f"❌ PowerPoint生成中にエラーが発生しました: {e}")
+            st.error(f"❌ アーカイブを開けませんでした: {e}")
+            return
+        available = [img for img in images if not img.missing]
+        if available:
+            number = st.number_input(
+                "プレビューする画像",
+                min_value=1,
+                max_value=len(available),
+                key=f"archive_preview_{selected.name}"
+            )
+            img = available[number - 1]
+            _, name = split_member_path(img.filepath)
+            st.image(open_archive(selected).read(name), caption=img.description or None)
+
+        dest_dir = SESSIONS_DIR / selected.stem
+        if st.button("📂 セッションとして展開", disabled=dest_dir.exists(), help="同じ名前のセッションがある場合は展開できません"):
+            try:
+                count = import_archive(selected, dest_dir)
+                get_session_index().update(dest_dir)
+                st.success(f"✅ {count}枚を `{dest_dir.name}` に展開しました")
+            except Exception as e:
+                st.error(f"❌ 展開に失敗しました: {e}")
 
 
 def select_session() -> Path | None:
@@ -300,28 +907,42 @@ def select_session() -> Path | None:
         st.sidebar.error(f"セッションディレクトリが見つかりません: {SESSIONS_DIR}")
         return None
 
-    session_dirs = sorted(
-        [d for d in SESSIONS_DIR.iterdir() if d.is_dir()],
-        key=lambda d: d.stat().st_mtime,
-        reverse=True  # 新しい順
-    )
+    # セッションの追加・削除がなければインデックスファイルのstatのみで済む
+    index = get_session_index()
+    try:
+        index.refresh()
+    except TimeoutError as e:
+        st.sidebar.warning(f"⚠️ セッション一覧を更新できませんでした: {e}")
 
-    if not session_dirs:
+    if not index.sessions:
         st.sidebar.warning("セッションがありません")
         st.sidebar.info("まず `python recorder.py` でスクリーンショットを収録してください")
         return None
 
-    # セッション名のリスト（フォルダ名）
-    session_names = [d.name for d in session_dirs]
+    # 検索・絞り込み
+    query = st.sidebar.text_input("🔍 セッション名で検索", key="session_query")
+    hide_empty = st.sidebar.checkbox("画像のないセッションを隠す", key="session_hide_empty")
+    entries = index.search(query, min_images=1 if hide_empty else 0)
+    if not entries:
+        st.sidebar.info("条件に合うセッションがありません")
+        return None
 
     # セレクトボックスで選択
+    entries_by_name = {entry.name: entry for entry in entries}
     selected_name = st.sidebar.selectbox(
         "編集するセッションを選択",
-        options=session_names,
+        options=list(entries_by_name),
+        format_func=lambda name: (
+            f"{name}（{entries_by_name[name].image_count}枚・"
+            f"{entries_by_name[name].total_bytes / 1024 ** 2:.1f} MB）"
+        ),
         help="最新のセッションが上に表示されます"
     )
 
     if selected_name:
+        entry = entries_by_name[selected_name]
+        if entry.first_image and Path(entry.first_image).exists():
+            st.sidebar.image(str(get_thumbnails().ensure([entry.first_image])[0]))
         selected_dir = SESSIONS_DIR / selected_name
         return selected_dir
 
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Manual Maker - 一括出力ツール
+複数セッションのPowerPointを画面・Streamlitなしでまとめて生成
+"""
+import os
+import time
+import argparse
+from pathlib import Path
+from typing import List, Optional
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import config
+from utils.image_manager import ImageManager
+from utils.session_ops import resolve_session
+from utils.session_archive import is_archive, open_archive, source_exists
+from exporter.pptx_generator import PPTXGenerator
+from exporter.render_cache import RenderCache
+
+
+# 既定のタイトル（編集UIと同じ）
+DEFAULT_TITLE = "操作マニュアル"
+
+
+@dataclass
+class ExportResult:
+    """セッションごとの出力結果データクラス"""
+    session_dir: Path
+    output_path: Path
+    slides: int = 0  # 書き出した画像スライド数（タイトルスライドを除く）
+    seconds: float = 0.0
+    error: str = ""
+
+
+def output_path_for(session_dir: Path, output_dir: Optional[Path] = None) -> Path:
+    """
+    セッションの出力ファイルパス（編集UIと同じファイル名）
+
+    Args:
+        session_dir: セッションディレクトリまたはアーカイブファイル
+        output_dir: 出力先ディレクトリ（省略時はセッションディレクトリ、アーカイブの場合は同じディレクトリ）
+
+    Returns:
+        出力ファイルパス
+    """
+    if is_archive(session_dir):
+        return Path(output_dir or session_dir.parent) / f"{session_dir.stem}_manual.pptx"
+    return Path(output_dir or session_dir) / f"{session_dir.name}_manual.pptx"
+
+
+def export_session(
+    session_dir: Path,
+    output_path: Path,
+    title: str = DEFAULT_TITLE,
+    use_cache: bool = True,
+    template_path: Optional[Path] = None
+) -> ExportResult:
+    """
+    1セッション分のPowerPointを生成（ワーカープロセスで実行）
+
+    セッション間で並列化するため、画像処理はプロセス内で逐次実行する。
+    アーカイブファイルを指定した場合は展開せずに画像を直接読み込む。
+
+    Args:
+        session_dir: セッションディレクトリまたはアーカイブファイル
+        output_path: 出力ファイルパス
+        title: プレゼンテーションのタイトル
+        use_cache: 処理済み画像のキャッシュを使うかどうか
+        template_path: テンプレート（.pptx）のパス（省略時は config.PPTX_TEMPLATE_PATH）
+
+    Returns:
+        出力結果
+    """
+    result = ExportResult(session_dir=session_dir, output_path=output_path)
+    start = time.perf_counter()
+    try:
+        if is_archive(session_dir):
+            images = open_archive(session_dir).images()
+        else:
+            images = ImageManager(session_dir, enable_undo=False).get_images()
+        generator = PPTXGenerator(
+            max_workers=1,
+            cache=RenderCache() if use_cache else None,
+            streaming=len(images) >= config.PPTX_STREAMING_MIN_SLIDES,
+            template_path=template_path
+        )
+        generator.generate(images, output_path, title=title)
+        # ファイルのない画像は生成時にスキップされるため、書き出した画像スライドだけを数える
+        result.slides = sum(1 for img_data in images if source_exists(img_data.filepath))
+    except Exception as e:
+        result.error = str(e)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def export_sessions(
+    session_dirs: List[Path],
+    output_dir: Optional[Path] = None,
+    title: str = DEFAULT_TITLE,
+    max_workers: Optional[int] = None,
+    use_cache: bool = True,
+    on_result=None,
+    template_path: Optional[Path] = None
+) -> List[ExportResult]:
+    """
+    複数セッションをプロセスプールで並列に出力
+
+    Args:
+        session_dirs: セッションディレクトリのリスト
+        output_dir: 出力先ディレクトリ（省略時は各セッションディレクトリ）
+        title: プレゼンテーションのタイトル
+        max_workers: 並列数（省略時は config.EXPORT_WORKERS、1なら逐次処理）
+        use_cache: 処理済み画像のキャッシュを使うかどうか
+        on_result: セッションの出力が終わるごとに ExportResult を渡して呼ばれる関数
+        template_path: テンプレート（.pptx）のパス（解析結果はワーカープロセスごとに再利用される）
+
+    Returns:
+        session_dirs と同じ順の出力結果
+    """
+    if output_dir:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+    jobs = [(session_dir, output_path_for(session_dir, output_dir)) for session_dir in session_dirs]
+    max_workers = max_workers or config.EXPORT_WORKERS
+
+    if len(jobs) <= 1 or max_workers == 1:
+        results = []
+        for session_dir, output_path in jobs:
+            results.append(export_session(session_dir, output_path, title, use_cache, template_path))
+            if on_result:
+                on_result(results[-1])
+        return results
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(export_session, session_dir, output_path, title, use_cache, template_path)
+            for session_dir, output_path in jobs
+        ]
+        if on_result:
+            for future in as_completed(futures):
+                on_result(future.result())
+        return [future.result() for future in futures]
+
+
+def _print_result(result: ExportResult):
+    """セッションごとの結果を表示"""
+    if result.error:
+        print(f"❌ {result.session_dir.name}: {result.error} ({result.seconds:.1f}s)")
+    else:
+        print(f"✅ {result.session_dir.name}: {result.slides} slides in {result.seconds:.1f}s -> {result.output_path}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """コマンドライン引数の解析"""
+    parser = argparse.ArgumentParser(description="Manual Maker - 一括出力ツール")
+    parser.add_argument("sessions", nargs="*", help="出力するセッション（セッション名・パス、またはアーカイブ）")
+    parser.add_argument("--all", action="store_true", help=f"{config.SESSIONS_DIR} 内の全セッションを出力")
+    parser.add_argument("-o", "--output-dir", type=Path, help="出力先ディレクトリ（既定は各セッションディレクトリ）")
+    parser.add_argument("-w", "--workers", type=int, help="並列に出力するセッション数（既定はCPU数）")
+    parser.add_argument("--title", default=DEFAULT_TITLE, help="プレゼンテーションのタイトル")
+    parser.add_argument("-t", "--template", type=Path, help="会社のテンプレート（.pptx）")
+    parser.add_argument("--no-cache", action="store_true", help="処理済み画像のキャッシュを使わない")
+    args = parser.parse_args(argv)
+    if not args.sessions and not args.all:
+        parser.error("セッションを指定するか --all を指定してください")
+    return args
+
+
+def main(argv=None):
+    """メイン処理"""
+    args = parse_args(argv)
+    try:
+        if args.all:
+            with os.scandir(config.SESSIONS_DIR) as entries:
+                session_dirs = sorted(Path(entry.path) for entry in entries if entry.is_dir())
+        else:
+            session_dirs = [Path(name) if is_archive(name) else resolve_session(name) for name in args.sessions]
+    except FileNotFoundError as e:
+        raise SystemExit(f"❌ {e}")
+
+    start = time.perf_counter()
+    results = export_sessions(
+        session_dirs,
+        output_dir=args.output_dir,
+        title=args.title,
+        max_workers=args.workers,
+        use_cache=not args.no_cache,
+        on_result=_print_result,
+        template_path=args.template
+    )
+    elapsed = time.perf_counter() - start
+
+    failed = [result for result in results if result.error]
+    slides = sum(result.slides for result in results)
+    busy = sum(result.seconds for result in results)
+    print(f"\n📊 Exported {len(results) - len(failed)}/{len(results)} sessions ({slides} slides)")
+    print(f"   Wall time: {elapsed:.1f}s (sum of session times: {busy:.1f}s)")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
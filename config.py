@@ -10,11 +10,24 @@ BASE_DIR = Path(__file__).parent
 # データ保存先
 DATA_DIR = BASE_DIR / "data"
 SESSIONS_DIR = DATA_DIR / "sessions"
+SESSION_INDEX_FILE = DATA_DIR / "session_index.json"  # セッション一覧のインデックス
+ARCHIVES_DIR = DATA_DIR / "archives"  # セッションを1ファイルにまとめたアーカイブ（.zip）の保存先
 
 # スクリーンショット設定
 SCREENSHOT_FORMAT = "png"
 SCREENSHOT_QUALITY = 95
 
+# 重複排除ストア設定（Trueで同一内容の画像をセッション間でハードリンク共有）
+BLOB_STORE_ENABLED = False
+BLOBS_DIR = DATA_DIR / "blobs"
+
+# 後からエンコードする収録設定（収録中はPNGに変換せず生データをスピルファイルへ追記）
+DEFER_ENCODING = False  # 非力なPCで収録対象のアプリの動作を妨げないようにする場合は True
+SPILL_FILE_BYTES = 1024 ** 3  # スピルファイルを一度に確保・拡張するサイズ
+SPILL_IDLE_SECONDS = 10  # この時間操作がなければ収録中でもエンコードを進める
+SPILL_IDLE_WORKERS = 1  # アイドル時のエンコードの並列数
+ENCODE_WORKERS = None  # 収録停止後のエンコードの並列数（NoneでCPU数）
+
 # 収録設定
 DETECT_MOUSE_CLICK = True
 DETECT_KEY_PRESS = True
@@ -24,6 +37,63 @@ DEBOUNCE_TIME = 0.5  # 連続操作の検知間隔（秒）
 PPTX_SLIDE_WIDTH = 10  # インチ
 PPTX_SLIDE_HEIGHT = 7.5  # インチ
 PPTX_IMAGE_WIDTH_RATIO = 0.8  # スライド幅に対する画像の比率
+PPTX_IMAGE_DPI = 150  # 埋め込み画像の解像度（スライド上の表示サイズ基準）
+PPTX_IMAGE_FORMAT = "png"  # 埋め込み画像の形式（png / jpeg）
+PPTX_IMAGE_QUALITY = 85  # JPEG品質
+PPTX_STREAMING_MIN_SLIDES = 300  # この枚数以上はスライドを1枚ずつ書き出す省メモリモード
+PPTX_TEMPLATE_PATH = None  # 会社のテンプレート（.pptx）のパス（Noneで python-pptx の既定テンプレート）
+
+# クリック位置の拡大表示（出力時に画像をクリック周辺へ切り抜く）
+FOCUS_CROP_RATIO = 0.5  # 元画像に対する切り抜き範囲の最小の大きさ（幅・高さの比率）
+FOCUS_CROP_EXPAND_TO_CHANGES = True  # 前の手順から変化した領域を含むよう切り抜き範囲を広げる
+FOCUS_CROP_DIFF_THRESHOLD = 24  # 変化とみなす画素値の差（0〜255）
+
+# クリック位置のオーバーレイ（出力時に描画、元画像は変更しない）
+OVERLAY_MARKER_RADIUS = 28  # マーカーの半径（元画像のピクセル）
+OVERLAY_LINE_WIDTH = 6
+OVERLAY_COLOR = (230, 40, 40)
+OVERLAY_FILL_OPACITY = 70  # マーカー内側の不透明度（0〜255）
+OVERLAY_HIGHLIGHT_CHANGES = True  # クリック位置を含む変化領域を枠で囲む
+
+# HTML出力設定
+HTML_IMAGE_WIDTHS = (320, 640, 1280)  # 画面幅に応じて切り替える画像の幅（px）
+HTML_IMAGE_FORMAT = "webp"  # 画像の形式（webp / jpeg / png）
+HTML_IMAGE_QUALITY = 80
+
+# 出力処理の並列数（NoneでCPU数）
+EXPORT_WORKERS = None
+
+# 出力用キャッシュ設定（処理済み画像を再出力時に再利用）
+CACHE_DIR = DATA_DIR / "cache"
+RENDER_CACHE_DIR = CACHE_DIR / "render"
+RENDER_CACHE_MAX_BYTES = 2 * 1024 ** 3  # 超過時は古いものから削除
+
+# 編集UIのサムネイル設定（画像グリッドには縮小画像を表示）
+THUMBNAIL_DIR = CACHE_DIR / "thumbnails"
+THUMBNAIL_WIDTH = 480  # px
+THUMBNAIL_FORMAT = "webp"  # 保存形式（webp / jpeg / png）
+THUMBNAIL_QUALITY = 75
+THUMBNAIL_WORKERS = 2  # 作成に使うスレッド数
+THUMBNAIL_MAX_BYTES = 512 * 1024 ** 2  # 超過時は最後に使った時刻の古いものから削除
+GRID_PAGE_SIZE = 30  # 画像グリッドの1ページの枚数（3の倍数）
+
+# 重複した手順の検出設定（知覚ハッシュで隣り合うほぼ同じ画像を探す）
+DUPLICATE_HASH_SIZE = 8  # ハッシュの一辺のビット数（8で64ビット）
+DUPLICATE_MAX_DISTANCE = 4  # ほぼ同じとみなすハミング距離の上限
+PERCEPTUAL_HASH_CACHE_FILE = CACHE_DIR / "perceptual_hashes.json"
+
+# 出力ファイルのダウンロードサーバー設定（ファイルをメモリに読み込まずディスクから配信）
+FILE_SERVER_HOST = "0.0.0.0"  # 待ち受けるアドレス（Streamlitと同じく全インターフェース。このPCだけで使う場合は "127.0.0.1"）
+FILE_SERVER_PORT = 8600  # 固定ポート（ファイアウォール・リバースプロキシで許可する）
+FILE_SERVER_PUBLIC_URL = None  # ブラウザから見たURL（例: "https://manual.example.com/files"、Noneでブラウザが使ったホスト名から作成）
+FILE_SERVER_TOKEN_TTL = 3600  # ダウンロードURLの有効期間（秒）
+
+# 収録後の画像圧縮設定（速度優先で保存した画像を最大圧縮で再エンコード）
+COMPACT_AFTER_RECORDING = True  # 収録停止時にバックグラウンドで圧縮する
+COMPACTION_COLORS = None  # 減色する色数（例: 256、Noneで画質を変えない可逆圧縮のみ）
+COMPACTION_MIN_SAVING = 0.02  # この割合以上小さくなった画像だけを置き換える
+COMPACTION_WORKERS = None  # 並列数（NoneでCPU数）
+COMPACTION_NICE = 10  # ワーカープロセスの優先度を下げる量（Windowsでは「通常以下」）
 
 # ディレクトリの自動作成
 DATA_DIR.mkdir(exist_ok=True)
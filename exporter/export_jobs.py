@@ -0,0 +1,233 @@
+"""
+PowerPoint・PDF出力のバックグラウンドジョブ管理モジュール
+
+出力はワーカースレッドで実行し、ジョブの状態はStreamlitの再実行をまたいで保持する。
+内容が変わっていないマニュアルの再出力要求には、新しいジョブを作らず前回のジョブを返す。
+"""
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field, replace
+from concurrent.futures import ThreadPoolExecutor
+from utils.image_manager import ImageData
+from utils.session_archive import source_stamp
+from exporter.pptx_generator import PPTXGenerator, ExportCancelled, STAGE_IMAGES, STAGE_SLIDES
+
+
+# ジョブの状態
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+# 全体の進捗に占める各段階の割合
+STAGE_WEIGHTS = {STAGE_IMAGES: (0.0, 0.5), STAGE_SLIDES: (0.5, 0.5)}
+
+
+def _file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    """ファイルのサイズと更新時刻（存在しない場合はNone）"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def deck_key(
+    image_data_list: List[ImageData],
+    output_path: Path,
+    title: Optional[str],
+    generator: PPTXGenerator
+) -> str:
+    """
+    出力内容を識別するキーを作成
+
+    画像の並び・説明文・ファイルのサイズと更新時刻、タイトル、出力形式と設定、テンプレートが同じなら同じキーになる。
+
+    Args:
+        image_data_list: 画像データのリスト
+        output_path: 出力ファイルパス
+        title: プレゼンテーションのタイトル
+        generator: 出力に使うジェネレーター（PPTXGenerator / PDFGenerator）
+
+    Returns:
+        SHA-256ハッシュ
+    """
+    template_path = getattr(generator, "template_path", None)
+    source = {
+        "output": str(output_path),
+        "title": title,
+        "generator": type(generator).__name__,
+        "settings": [generator.image_settings.dpi, generator.image_settings.format,
+                     generator.image_settings.quality, getattr(generator, "streaming", False),
+                     str(getattr(generator, "crop", None)), str(getattr(generator, "overlay", None))],
+        "template": [str(template_path), _file_stamp(Path(template_path))] if template_path else None,
+        "images": [
+            [img.filepath, img.description, source_stamp(img.filepath)]
+            for img in image_data_list
+        ],
+    }
+    return hashlib.sha256(json.dumps(source, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+@dataclass
+class ExportJob:
+    """出力ジョブデータクラス"""
+    key: str
+    output_path: Path
+    status: str = STATUS_QUEUED
+    stage: str = ""
+    done: int = 0
+    total: int = 0
+    error: str = ""
+    output_stamp: Optional[Tuple[int, int]] = None  # 完了時の出力ファイルのサイズと更新時刻
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    finished_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        """終了したかどうか（成功・失敗・キャンセル）"""
+        return self.status in (STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED)
+
+    @property
+    def progress(self) -> float:
+        """全体の進捗（0.0〜1.0）"""
+        if self.status == STATUS_DONE:
+            return 1.0
+        start, weight = STAGE_WEIGHTS.get(self.stage, (0.0, 0.0))
+        if self.total == 0:
+            return start
+        return start + weight * self.done / self.total
+
+    @property
+    def result_valid(self) -> bool:
+        """完了後に出力ファイルが削除・上書きされていないか"""
+        return self.status == STATUS_DONE and _file_stamp(self.output_path) == self.output_stamp
+
+    def cancel(self):
+        """キャンセルを要求（実行中の場合は次の画像・スライドの区切りで中断）"""
+        self.cancel_event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        ジョブの終了を待機
+
+        Args:
+            timeout: 最大待機時間（秒）
+
+        Returns:
+            終了したかどうか
+        """
+        return self.finished_event.wait(timeout)
+
+    def _update(self, stage: str, done: int, total: int):
+        """進捗を記録（ワーカースレッドから呼ばれる）"""
+        self.stage, self.done, self.total = stage, done, total
+
+
+class ExportJobManager:
+    """出力ジョブ管理クラス"""
+
+    def __init__(self, max_workers: int = 1):
+        """
+        Args:
+            max_workers: 同時に実行するジョブ数（画像処理は各ジョブ内で並列化される）
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export")
+        self._jobs: Dict[str, ExportJob] = {}
+        self._latest: Dict[str, str] = {}  # 出力ファイルパス → 最新ジョブのキー
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        generator: PPTXGenerator,
+        image_data_list: List[ImageData],
+        output_path: Path,
+        title: Optional[str] = None
+    ) -> ExportJob:
+        """
+        出力ジョブを登録
+
+        同じ内容のジョブが実行中、または完了済みで出力ファイルが残っている場合はそのジョブを返す。
+        同じ出力先で内容の異なるジョブが実行中の場合はキャンセルする。
+
+        Args:
+            generator: 出力に使うジェネレーター（PPTXGenerator / PDFGenerator）
+            image_data_list: 画像データのリスト
+            output_path: 出力ファイルパス
+            title: プレゼンテーションのタイトル
+
+        Returns:
+            出力ジョブ
+        """
+        output_path = Path(output_path)
+        key = deck_key(image_data_list, output_path, title, generator)
+
+        with self._lock:
+            job = self._jobs.get(key)
+            if job and (not job.finished or job.result_valid):
+                return job
+
+            previous = self._jobs.pop(self._latest.get(str(output_path), ""), None)
+            if previous and not previous.finished:
+                previous.cancel()
+
+            job = ExportJob(key=key, output_path=output_path)
+            self._jobs[key] = job
+            self._latest[str(output_path)] = key
+
+        # UI側での編集の影響を受けないよう画像データを複製して渡す
+        images = [replace(img) for img in image_data_list]
+        self._executor.submit(self._run, job, generator, images, title)
+        return job
+
+    def get(self, key: str) -> Optional[ExportJob]:
+        """キーに対応するジョブを取得"""
+        with self._lock:
+            return self._jobs.get(key)
+
+    def latest(self, output_path: Path) -> Optional[ExportJob]:
+        """出力先ごとの最新のジョブを取得"""
+        with self._lock:
+            return self._jobs.get(self._latest.get(str(output_path), ""))
+
+    def shutdown(self, cancel: bool = True):
+        """
+        ジョブ管理を終了
+
+        Args:
+            cancel: 実行中・待機中のジョブをキャンセルするかどうか
+        """
+        if cancel:
+            with self._lock:
+                for job in self._jobs.values():
+                    job.cancel()
+        self._executor.shutdown(wait=True)
+
+    def _run(self, job: ExportJob, generator: PPTXGenerator, images: List[ImageData], title: Optional[str]):
+        """ワーカースレッドでジョブを実行"""
+        try:
+            if job.cancel_event.is_set():
+                job.status = STATUS_CANCELLED
+                return
+            job.status = STATUS_RUNNING
+            generator.generate(
+                images,
+                job.output_path,
+                title=title,
+                progress_callback=job._update,
+                cancel_event=job.cancel_event
+            )
+            job.output_stamp = _file_stamp(job.output_path)
+            job.status = STATUS_DONE
+        except ExportCancelled:
+            job.status = STATUS_CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.status = STATUS_FAILED
+        finally:
+            job.finished_event.set()
@@ -0,0 +1,227 @@
+"""
+HTMLマニュアル生成モジュール
+
+画面幅に応じて切り替える複数サイズの画像（srcset）を事前に生成し、
+遅延読み込みの静的HTMLと1つのCSSファイルを書き出す。
+画像は内容ハッシュと処理設定から決まるファイル名で保存するため、再出力時は新しい手順の画像だけを処理する。
+"""
+import os
+import html
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, replace
+from PIL import Image
+import config
+from utils.image_manager import ImageData
+from utils.blob_store import file_digest
+from exporter.image_processor import ImageSettings, ImageTask, process_images
+from exporter.render_cache import RenderCache, task_key
+
+
+# 出力ファイル名
+INDEX_FILE = "index.html"
+STYLE_FILE = "style.css"
+IMAGES_DIR = "images"
+
+# デフォルト値
+DEFAULT_TITLE = "マニュアル"
+
+# 本文の最大幅（px）。sizes属性とCSSで共通
+CONTENT_MAX_WIDTH = 960
+
+STYLE_CSS = f"""\
+*,*::before,*::after{{box-sizing:border-box}}
+body{{margin:0;font-family:system-ui,-apple-system,"Segoe UI","Hiragino Sans","Yu Gothic UI",Meiryo,sans-serif;line-height:1.7;color:#222;background:#f6f7f9}}
+header,main{{max-width:{CONTENT_MAX_WIDTH}px;margin:0 auto;padding:0 16px}}
+h1{{font-size:1.6rem;margin:32px 0 16px}}
+.step{{background:#fff;border-radius:8px;box-shadow:0 1px 3px rgba(0,0,0,.12);margin:0 0 24px;padding:16px}}
+.step h2{{font-size:1.1rem;margin:0 0 12px}}
+.step img{{display:block;max-width:100%;height:auto;border:1px solid #ddd}}
+.step p{{margin:12px 0 0;white-space:pre-wrap}}
+"""
+
+
+@dataclass(frozen=True)
+class ImageVariant:
+    """1サイズ分の画像（前処理タスクと出力後のピクセル数）"""
+    task: ImageTask
+    width: int
+    height: int
+
+
+class HTMLGenerator:
+    """HTMLマニュアル生成クラス"""
+
+    def __init__(
+        self,
+        image_widths: Optional[Tuple[int, ...]] = None,
+        image_settings: Optional[ImageSettings] = None,
+        max_workers: Optional[int] = None,
+        cache: Optional[RenderCache] = None
+    ):
+        """
+        Args:
+            image_widths: 生成する画像の幅（省略時は config.HTML_IMAGE_WIDTHS）
+            image_settings: 画像の形式・品質（省略時は config.HTML_IMAGE_FORMAT / HTML_IMAGE_QUALITY）
+            max_workers: 画像処理の並列数（省略時は config.EXPORT_WORKERS）
+            cache: 内容ハッシュの計算結果を再利用するキャッシュ（省略時は毎回計算）
+        """
+        self.image_widths = tuple(sorted(image_widths or config.HTML_IMAGE_WIDTHS))
+        self.image_settings = image_settings or ImageSettings(
+            format=config.HTML_IMAGE_FORMAT,
+            quality=config.HTML_IMAGE_QUALITY
+        )
+        self.max_workers = max_workers
+        self.cache = cache
+
+    def generate(
+        self,
+        image_data_list: List[ImageData],
+        output_dir: Path,
+        title: Optional[str] = None
+    ) -> Path:
+        """
+        HTMLマニュアルを生成
+
+        Args:
+            image_data_list: 画像データのリスト
+            output_dir: 出力ディレクトリ（index.html / style.css / images/ を作成）
+            title: マニュアルのタイトル（オプション）
+
+        Returns:
+            Path: 生成された index.html のパス
+        """
+        output_dir = Path(output_dir)
+        images_dir = output_dir / IMAGES_DIR
+        images_dir.mkdir(parents=True, exist_ok=True)
+
+        existing = [img_data for img_data in image_data_list if Path(img_data.filepath).exists()]
+        steps = [self._plan_variants(img_data, images_dir) for img_data in existing]
+        if self.cache:
+            # 次回の出力で内容ハッシュを再計算しないよう記録を保存
+            self.cache.save()
+
+        # 出力ディレクトリにまだない画像だけを並列に処理
+        pending: Dict[str, ImageTask] = {
+            variant.task.dest: variant.task
+            for variants in steps for variant in variants
+            if not Path(variant.task.dest).exists()
+        }
+        tasks = list(pending.values())
+        for task, path in zip(tasks, process_images(tasks, self.max_workers)):
+            if path != task.dest:
+                # 処理不要だった画像は元ファイルをそのまま使う
+                shutil.copyfile(path, task.dest)
+
+        self._remove_unused(images_dir, {variant.task.dest for variants in steps for variant in variants})
+        (output_dir / STYLE_FILE).write_text(STYLE_CSS, encoding='utf-8')
+        return self._write_index(output_dir, existing, steps, title or DEFAULT_TITLE)
+
+    def _plan_variants(self, img_data: ImageData, images_dir: Path) -> List[ImageVariant]:
+        """
+        1枚の画像から生成するサイズごとのタスクを作成（元画像より大きいサイズは作らない）
+
+        Args:
+            img_data: 画像データ
+            images_dir: 画像の出力先
+
+        Returns:
+            幅の小さい順の画像リスト
+        """
+        with Image.open(img_data.filepath) as img:
+            width, height = img.size
+        digest = self.cache.content_hash(img_data.filepath) if self.cache else file_digest(Path(img_data.filepath))
+
+        variants = []
+        for target_width in sorted({min(w, width) for w in self.image_widths}):
+            max_height = max(1, round(height * target_width / width))
+            if max_height < height:
+                variant_width = max(1, round(width * max_height / height))
+            else:
+                max_height, variant_width = height, width
+            task = ImageTask(src=img_data.filepath, dest="", max_height=max_height, settings=self.image_settings)
+            dest = images_dir / f"{task_key(task, digest)}{self.image_settings.suffix}"
+            variants.append(ImageVariant(replace(task, dest=str(dest)), variant_width, max_height))
+        return variants
+
+    def _remove_unused(self, images_dir: Path, keep: set) -> None:
+        """
+        削除された手順の画像を出力ディレクトリから削除
+
+        Args:
+            images_dir: 画像の出力先
+            keep: 今回の出力で使う画像パス
+        """
+        with os.scandir(images_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and str(images_dir / entry.name) not in keep:
+                    os.unlink(entry.path)
+
+    def _write_index(
+        self,
+        output_dir: Path,
+        image_data_list: List[ImageData],
+        steps: List[List[ImageVariant]],
+        title: str
+    ) -> Path:
+        """
+        index.html を手順ごとに逐次書き出し（一時ファイル経由）
+
+        Args:
+            output_dir: 出力ディレクトリ
+            image_data_list: 画像データのリスト
+            steps: 画像データごとの画像リスト
+            title: マニュアルのタイトル
+
+        Returns:
+            index.html のパス
+        """
+        index_path = output_dir / INDEX_FILE
+        tmp_path = index_path.with_name(f"{INDEX_FILE}.{os.getpid()}.tmp")
+        escaped_title = html.escape(title)
+
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(
+                '<!DOCTYPE html>\n<html lang="ja">\n<head>\n<meta charset="utf-8">\n'
+                '<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+                f'<title>{escaped_title}</title>\n<link rel="stylesheet" href="{STYLE_FILE}">\n'
+                f'</head>\n<body>\n<header><h1>{escaped_title}</h1></header>\n<main>\n'
+            )
+            for i, (img_data, variants) in enumerate(zip(image_data_list, steps), 1):
+                f.write(self._step_html(i, img_data, variants))
+            f.write('</main>\n</body>\n</html>\n')
+        os.replace(tmp_path, index_path)
+        return index_path
+
+    def _step_html(self, number: int, img_data: ImageData, variants: List[ImageVariant]) -> str:
+        """
+        1手順分のHTML
+
+        Args:
+            number: 手順番号（1始まり）
+            img_data: 画像データ
+            variants: 幅の小さい順の画像リスト
+
+        Returns:
+            section要素のHTML
+        """
+        def url(variant: ImageVariant) -> str:
+            return f"{IMAGES_DIR}/{Path(variant.task.dest).name}"
+
+        largest = variants[-1]
+        srcset = ", ".join(f"{url(variant)} {variant.width}w" for variant in variants)
+        # 最初の手順はすぐに表示されるため遅延読み込みしない
+        loading = "" if number == 1 else ' loading="lazy"'
+        description = (
+            f'<p>{html.escape(img_data.description)}</p>\n' if img_data.description else ""
+        )
+        return (
+            f'<section class="step" id="step-{number}">\n'
+            f'<h2>手順 {number}</h2>\n'
+            f'<img src="{url(largest)}" srcset="{srcset}" '
+            f'sizes="(max-width: {CONTENT_MAX_WIDTH}px) 100vw, {CONTENT_MAX_WIDTH}px" '
+            f'width="{largest.width}" height="{largest.height}"{loading} decoding="async" '
+            f'alt="手順 {number}">\n'
+            f'{description}</section>\n'
+        )
@@ -0,0 +1,326 @@
+"""
+出力用画像の前処理モジュール（表示サイズへの縮小・再エンコード）
+"""
+import os
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+from dataclasses import dataclass, replace
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image, ImageChops
+import config
+from utils.image_manager import ImageData
+from utils.session_archive import image_source, source_exists
+from exporter.overlay import OverlaySettings, draw_overlay
+
+
+# 1インチあたりのEMU（PowerPointの長さ単位）
+EMU_PER_INCH = 914400
+
+# 形式ごとの拡張子
+FORMAT_SUFFIXES = {"png": ".png", "jpeg": ".jpg", "jpg": ".jpg", "webp": ".webp"}
+
+# 変化領域の検出に使う縮小率（ノイズの抑制と高速化のため縮小画像で比較）
+DIFF_REDUCE_FACTOR = 4
+
+
+@dataclass(frozen=True)
+class ImageSettings:
+    """画像前処理の設定"""
+    dpi: int = config.PPTX_IMAGE_DPI
+    format: str = config.PPTX_IMAGE_FORMAT
+    quality: int = config.PPTX_IMAGE_QUALITY
+
+    @property
+    def suffix(self) -> str:
+        """出力ファイルの拡張子"""
+        return FORMAT_SUFFIXES[self.format.lower()]
+
+    def max_height_px(self, box_height_emu: int) -> int:
+        """
+        表示枠の高さに対応するピクセル数
+
+        Args:
+            box_height_emu: 表示枠の高さ（EMU）
+
+        Returns:
+            設定DPIでのピクセル数
+        """
+        return max(1, round(box_height_emu / EMU_PER_INCH * self.dpi))
+
+
+@dataclass(frozen=True)
+class CropSettings:
+    """クリック位置への切り抜き設定"""
+    ratio: float = config.FOCUS_CROP_RATIO
+    expand_to_changes: bool = config.FOCUS_CROP_EXPAND_TO_CHANGES
+    diff_threshold: int = config.FOCUS_CROP_DIFF_THRESHOLD
+
+
+@dataclass(frozen=True)
+class ImageTask:
+    """1枚分の画像前処理タスク（プロセス間で受け渡すため値のみを持つ）"""
+    src: str
+    dest: str
+    max_height: int
+    settings: ImageSettings
+    crop: Optional[CropSettings] = None
+    overlay: Optional[OverlaySettings] = None
+    click: Optional[Tuple[int, int]] = None  # 切り抜きの中心・マーカーの位置（画像上の座標）
+    previous: Optional[str] = None  # 変化領域の比較に使う前の手順の画像
+
+
+def _changed_bbox(previous: str, img: Image.Image, threshold: int) -> Optional[Tuple[int, int, int, int]]:
+    """
+    前の手順の画像から変化した領域
+
+    Args:
+        previous: 前の手順の画像ファイル
+        img: 現在の画像
+        threshold: 変化とみなす画素値の差
+
+    Returns:
+        変化領域 (left, top, right, bottom)（サイズが異なる・変化がない場合はNone）
+    """
+    with Image.open(image_source(previous)) as prev:
+        if prev.size != img.size:
+            return None
+        before = prev.convert("L").reduce(DIFF_REDUCE_FACTOR)
+    after = img.convert("L").reduce(DIFF_REDUCE_FACTOR)
+    bbox = ImageChops.difference(before, after).point(lambda v: 255 if v > threshold else 0).getbbox()
+    if bbox is None:
+        return None
+    left, top, right, bottom = (v * DIFF_REDUCE_FACTOR for v in bbox)
+    return left, top, min(right, img.width), min(bottom, img.height)
+
+
+def uses_previous(task: ImageTask) -> bool:
+    """
+    前の手順の画像との比較（変化領域の強調・切り抜きの拡大）を行うタスクかどうか
+
+    Args:
+        task: 前処理タスク
+
+    Returns:
+        前の手順の画像が処理結果に影響する場合True
+    """
+    if task.click is None or not task.previous:
+        return False
+    return bool(
+        (task.overlay is not None and task.overlay.highlight_changes)
+        or (task.crop is not None and task.crop.expand_to_changes)
+    )
+
+
+def click_change_region(task: ImageTask, img: Image.Image) -> Optional[Tuple[int, int, int, int]]:
+    """
+    前の手順から変化した領域のうち、クリック位置を含むもの
+
+    Args:
+        task: クリック位置と前の手順の画像を持つタスク
+        img: 元画像
+
+    Returns:
+        変化領域 (left, top, right, bottom)（比較できない・クリック位置を含まない場合はNone）
+    """
+    if task.click is None or not task.previous or not source_exists(task.previous):
+        return None
+    threshold = task.crop.diff_threshold if task.crop else config.FOCUS_CROP_DIFF_THRESHOLD
+    changed = _changed_bbox(task.previous, img, threshold)
+    x, y = task.click
+    if changed and changed[0] <= x < changed[2] and changed[1] <= y < changed[3]:
+        return changed
+    return None
+
+
+def focus_box(
+    task: ImageTask,
+    img: Image.Image,
+    changed: Optional[Tuple[int, int, int, int]] = None
+) -> Tuple[int, int, int, int]:
+    """
+    クリック位置を中心とした切り抜き範囲（元画像と同じ縦横比）
+
+    変化領域が指定され、切り抜き設定で有効な場合はその領域全体が収まるよう広げる。
+
+    Args:
+        task: 切り抜き設定とクリック位置を持つタスク
+        img: 元画像
+        changed: クリック位置を含む変化領域（click_change_region の結果）
+
+    Returns:
+        切り抜き範囲 (left, top, right, bottom)
+    """
+    width, height = img.size
+    x = min(max(task.click[0], 0), width - 1)
+    y = min(max(task.click[1], 0), height - 1)
+    box_w, box_h = width * task.crop.ratio, height * task.crop.ratio
+    left, top, right, bottom = x - box_w / 2, y - box_h / 2, x + box_w / 2, y + box_h / 2
+
+    if task.crop.expand_to_changes and changed:
+        left, top = min(left, changed[0]), min(top, changed[1])
+        right, bottom = max(right, changed[2]), max(bottom, changed[3])
+
+    # 元画像の縦横比に合わせて短い辺を中心から広げる
+    box_w, box_h = right - left, bottom - top
+    if box_w / box_h < width / height:
+        box_w = box_h * width / height
+    else:
+        box_h = box_w * height / width
+    box_w, box_h = min(box_w, width), min(box_h, height)
+    center_x, center_y = (left + right) / 2, (top + bottom) / 2
+
+    # 画像からはみ出す分は内側へずらす
+    left = min(max(center_x - box_w / 2, 0), width - box_w)
+    top = min(max(center_y - box_h / 2, 0), height - box_h)
+    return round(left), round(top), round(left + box_w), round(top + box_h)
+
+
+def process_image(task: ImageTask) -> str:
+    """
+    画像を表示サイズまで縮小して再エンコード
+
+    オーバーレイ設定がある場合はクリック位置のマーカーを描画し、
+    切り抜き設定がある場合はクリック位置の周辺に切り抜いてから縮小する（座標は元画像基準）。
+    描画も切り抜きも縮小も形式変換も不要な場合は元ファイルをそのまま使う。
+
+    Args:
+        task: 前処理タスク
+
+    Returns:
+        埋め込みに使う画像ファイルのパス
+    """
+    target_format = task.settings.format.lower()
+    with Image.open(image_source(task.src)) as img:
+        same_format = (img.format or "").lower() == ("jpeg" if target_format == "jpg" else target_format)
+        overlaid = task.overlay is not None and task.click is not None
+        cropped = task.crop is not None and task.click is not None
+        changed = None
+        if uses_previous(task):
+            changed = click_change_region(task, img)
+        if overlaid:
+            img = draw_overlay(img, task.click, task.overlay, changed)
+        if cropped:
+            img = img.crop(focus_box(task, img, changed))
+        needs_resize = img.height > task.max_height
+        if not needs_resize and same_format and not cropped and not overlaid:
+            return task.src
+
+        if needs_resize:
+            width = max(1, round(img.width * task.max_height / img.height))
+            # reducing_gapで大きな画像は先に整数倍で縮小してから高品質に補間
+            img = img.resize((width, task.max_height), Image.LANCZOS, reducing_gap=3.0)
+
+        # キャッシュに書きかけのファイルが残らないよう一時ファイル経由で保存
+        tmp_dest = f"{task.dest}.{os.getpid()}.tmp"
+        if target_format in ("jpeg", "jpg"):
+            img.convert("RGB").save(tmp_dest, format="JPEG", quality=task.settings.quality, optimize=True)
+        elif target_format == "webp":
+            img.save(tmp_dest, format="WEBP", quality=task.settings.quality)
+        else:
+            img.save(tmp_dest, format="PNG", optimize=True)
+    os.replace(tmp_dest, task.dest)
+    return task.dest
+
+
+def process_images(
+    tasks: List[ImageTask],
+    max_workers: Optional[int] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None
+) -> List[str]:
+    """
+    複数の画像をプロセスプールで並列に前処理
+
+    progress_callback が例外を送出した場合は未着手のタスクを取り消して中断する。
+
+    Args:
+        tasks: 前処理タスクのリスト
+        max_workers: 並列数（省略時は config.EXPORT_WORKERS、1なら逐次処理）
+        progress_callback: 1枚処理するごとに (処理済み数, 総数) で呼ばれる関数
+
+    Returns:
+        tasks と同じ順の画像ファイルパス
+    """
+    max_workers = max_workers or config.EXPORT_WORKERS
+    total = len(tasks)
+    if total <= 1 or max_workers == 1:
+        results = []
+        for task in tasks:
+            results.append(process_image(task))
+            if progress_callback:
+                progress_callback(len(results), total)
+        return results
+
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [executor.submit(process_image, task) for task in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            future.result()
+            if progress_callback:
+                progress_callback(done, total)
+        return [future.result() for future in futures]
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def build_tasks(
+    image_paths: List[str],
+    work_dir: Path,
+    box_height_emu: int,
+    settings: ImageSettings
+) -> List[ImageTask]:
+    """
+    画像パスのリストから前処理タスクを作成
+
+    Args:
+        image_paths: 元画像のパス
+        work_dir: 処理済み画像の出力先
+        box_height_emu: 表示枠の高さ（EMU）
+        settings: 画像前処理の設定
+
+    Returns:
+        前処理タスクのリスト
+    """
+    max_height = settings.max_height_px(box_height_emu)
+    return [
+        ImageTask(
+            src=str(path),
+            dest=str(Path(work_dir) / f"{i:05d}{settings.suffix}"),
+            max_height=max_height,
+            settings=settings
+        )
+        for i, path in enumerate(image_paths)
+    ]
+
+
+def with_click_options(
+    tasks: List[ImageTask],
+    image_data_list: List[ImageData],
+    crop: Optional[CropSettings] = None,
+    overlay: Optional[OverlaySettings] = None
+) -> List[ImageTask]:
+    """
+    クリック位置が記録された画像のタスクに切り抜き・オーバーレイ設定を追加
+
+    Args:
+        tasks: 前処理タスクのリスト
+        image_data_list: tasks と同じ順の画像データ
+        crop: 切り抜き設定
+        overlay: オーバーレイ設定
+
+    Returns:
+        設定を追加したタスクのリスト（クリック位置のない画像はそのまま）
+    """
+    result = []
+    previous = None
+    for task, img_data in zip(tasks, image_data_list):
+        if img_data.click_x is not None and img_data.click_y is not None:
+            task = replace(
+                task,
+                crop=crop,
+                overlay=overlay,
+                click=(img_data.click_x, img_data.click_y),
+                previous=previous
+            )
+        result.append(task)
+        previous = task.src
+    return result
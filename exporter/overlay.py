@@ -0,0 +1,62 @@
+"""
+クリック位置のオーバーレイ描画モジュール
+
+出力時に処理済み画像へクリック位置のマーカーと変化領域の枠を描画する。
+元画像は変更せず、描画結果は前処理タスクのキー（内容ハッシュ + 描画設定）でキャッシュされる。
+"""
+from typing import Optional, Tuple
+from dataclasses import dataclass
+from PIL import Image, ImageDraw
+import config
+
+
+@dataclass(frozen=True)
+class OverlaySettings:
+    """オーバーレイの描画設定"""
+    marker_radius: int = config.OVERLAY_MARKER_RADIUS
+    line_width: int = config.OVERLAY_LINE_WIDTH
+    color: Tuple[int, int, int] = config.OVERLAY_COLOR
+    fill_opacity: int = config.OVERLAY_FILL_OPACITY
+    highlight_changes: bool = config.OVERLAY_HIGHLIGHT_CHANGES
+
+
+def draw_overlay(
+    img: Image.Image,
+    click: Tuple[int, int],
+    settings: OverlaySettings,
+    changed: Optional[Tuple[int, int, int, int]] = None
+) -> Image.Image:
+    """
+    クリック位置のマーカーと変化領域の枠を描画した画像を作成
+
+    Args:
+        img: 元画像（変更しない）
+        click: クリック位置（画像上の座標）
+        settings: 描画設定
+        changed: クリック位置を含む変化領域 (left, top, right, bottom)
+
+    Returns:
+        描画後の画像（RGB）
+    """
+    layer = Image.new("RGBA", img.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    outline = settings.color + (255,)
+
+    if settings.highlight_changes and changed:
+        pad = settings.line_width
+        left, top, right, bottom = changed
+        draw.rectangle(
+            (left - pad, top - pad, right + pad, bottom + pad),
+            outline=outline,
+            width=settings.line_width
+        )
+
+    x, y = click
+    r = settings.marker_radius
+    draw.ellipse(
+        (x - r, y - r, x + r, y + r),
+        fill=settings.color + (settings.fill_opacity,),
+        outline=outline,
+        width=settings.line_width
+    )
+    return Image.alpha_composite(img.convert("RGBA"), layer).convert("RGB")
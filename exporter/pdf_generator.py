@@ -0,0 +1,438 @@
+"""
+PDF生成モジュール
+
+ページは1枚ずつファイルへ直接書き出し、メモリに保持するのは処理中のページ1枚分と
+オブジェクトの位置情報のみ。画像は表示サイズへ縮小したJPEGをそのまま埋め込み（DCTDecode）、
+日本語は埋め込み不要のCIDフォント（平成角ゴシック）で描画する。
+レイアウトはPowerPoint出力と同じ定数を使う。
+"""
+import io
+import zlib
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+from PIL import Image
+import config
+from utils.image_manager import ImageData
+from exporter.image_processor import ImageSettings, build_tasks, process_images
+from exporter.render_cache import RenderCache
+from exporter.pptx_generator import (
+    IMAGE_LEFT,
+    IMAGE_TOP,
+    IMAGE_HEIGHT,
+    DESC_LEFT,
+    DESC_TOP,
+    DESC_WIDTH,
+    DESC_FONT_SIZE,
+    DEFAULT_TITLE,
+    STAGE_IMAGES,
+    STAGE_SLIDES,
+    ExportCancelled,
+    ProgressCallback,
+)
+
+
+# 長さの単位変換（EMU → ポイント）
+EMU_PER_POINT = 12700
+
+# ページサイズ（スライドと同じ）
+PAGE_WIDTH = config.PPTX_SLIDE_WIDTH * 72
+PAGE_HEIGHT = config.PPTX_SLIDE_HEIGHT * 72
+
+# テキストボックスの内側余白（PowerPointの既定値: 左右0.1インチ・上下0.05インチ）
+TEXT_INSET_X = 7.2
+TEXT_INSET_Y = 3.6
+LINE_SPACING = 1.2  # フォントサイズに対する行送り
+
+# タイトルページ（PowerPointのタイトルスライドに合わせた位置とサイズ）
+TITLE_FONT_SIZE = 44
+TITLE_CENTER_Y = 3.13 * 72  # ページ上端からのタイトル中心（ポイント）
+
+# 日本語フォント（Adobe-Japan1の標準CIDフォント、ASCIIは半角グリフに対応付け）
+FONT_NAME = "HeiseiKakuGo-W5"
+FONT_ENCODING = "UniJIS-UCS2-HW-H"
+FONT_ASCENT = 0.752
+HALF_WIDTH_CIDS = (231, 389)  # 半角英数字・半角カナ
+REPLACEMENT_CHAR = "〓"  # UCS-2で表せない文字の代替
+
+# 画像の色空間
+COLOR_SPACES = {"RGB": "/DeviceRGB", "L": "/DeviceGray", "CMYK": "/DeviceCMYK"}
+
+
+def _pt(emu: int) -> float:
+    """EMUをポイントに変換"""
+    return emu / EMU_PER_POINT
+
+
+def _is_half_width(char: str) -> bool:
+    """半角グリフで描画される文字かどうか"""
+    return " " <= char <= "~" or "｡" <= char <= "ﾟ"
+
+
+def text_width(text: str, font_size: float) -> float:
+    """
+    文字列の描画幅（ポイント）
+
+    Args:
+        text: 文字列
+        font_size: フォントサイズ（ポイント）
+
+    Returns:
+        描画幅
+    """
+    return sum(0.5 if _is_half_width(char) else 1.0 for char in text) * font_size
+
+
+def wrap_text(text: str, max_width: float, font_size: float) -> List[str]:
+    """
+    文字列を指定幅で折り返す（改行は段落として保持し、英単語は可能な限り空白で区切る）
+
+    Args:
+        text: 文字列
+        max_width: 1行の最大幅（ポイント）
+        font_size: フォントサイズ（ポイント）
+
+    Returns:
+        行のリスト
+    """
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        width = 0.0
+        for char in paragraph:
+            char_width = text_width(char, font_size)
+            if line and width + char_width > max_width:
+                space = line.rfind(" ")
+                if char != " " and _is_half_width(char) and space > 0:
+                    lines.append(line[:space])
+                    line = line[space + 1:]
+                else:
+                    lines.append(line)
+                    line = ""
+                width = text_width(line, font_size)
+                if char == " " and not line:
+                    continue
+            line += char
+            width += char_width
+        lines.append(line)
+    return lines
+
+
+def _encode_text(text: str) -> str:
+    """CIDフォント用の16進文字列（UCS-2）"""
+    encoded = "".join(char if ord(char) <= 0xFFFF else REPLACEMENT_CHAR for char in text)
+    return f"<{encoded.encode('utf-16-be').hex().upper()}>"
+
+
+def _encode_info(text: str) -> str:
+    """文書情報用の16進文字列（BOM付きUTF-16）"""
+    return f"<FEFF{text.encode('utf-16-be').hex().upper()}>"
+
+
+def _text_op(text: str, x: float, y: float, font_size: float) -> str:
+    """1行分のテキスト描画命令（座標はベースラインの左端）"""
+    return f"BT /F1 {font_size:g} Tf {x:.2f} {y:.2f} Td {_encode_text(text)} Tj ET\n"
+
+
+class StreamingPDFWriter:
+    """ページを1枚ずつ書き出すPDFライタークラス"""
+
+    # 事前に番号を確保するオブジェクト
+    CATALOG_ID = 1
+    PAGES_ID = 2
+    FONT_ID = 3
+    CID_FONT_ID = 4
+    FONT_DESCRIPTOR_ID = 5
+
+    def __init__(self, output_path: Path, title: str = ""):
+        """
+        Args:
+            output_path: 出力ファイルパス
+            title: 文書のタイトル（文書情報に記録）
+        """
+        self.output_path = Path(output_path)
+        self.title = title
+        self.pages = 0
+        self._file = None
+        self._offsets: List[int] = []
+        self._page_ids: List[int] = []
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(completed=exc_type is None)
+
+    def open(self):
+        """出力ファイルを開き、ヘッダーとフォントを書き出す"""
+        self._file = open(self.output_path, 'wb')
+        self._file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._offsets = [0] * self.FONT_DESCRIPTOR_ID
+        self._write_object(self.CATALOG_ID, f"<< /Type /Catalog /Pages {self.PAGES_ID} 0 R >>")
+        self._write_object(
+            self.FONT_ID,
+            f"<< /Type /Font /Subtype /Type0 /BaseFont /{FONT_NAME}-{FONT_ENCODING} "
+            f"/Encoding /{FONT_ENCODING} /DescendantFonts [{self.CID_FONT_ID} 0 R] >>"
+        )
+        self._write_object(
+            self.CID_FONT_ID,
+            f"<< /Type /Font /Subtype /CIDFontType0 /BaseFont /{FONT_NAME} "
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (Japan1) /Supplement 2 >> "
+            f"/FontDescriptor {self.FONT_DESCRIPTOR_ID} 0 R "
+            f"/DW 1000 /W [{HALF_WIDTH_CIDS[0]} {HALF_WIDTH_CIDS[1]} 500] >>"
+        )
+        self._write_object(
+            self.FONT_DESCRIPTOR_ID,
+            f"<< /Type /FontDescriptor /FontName /{FONT_NAME} /Flags 4 "
+            "/FontBBox [-92 -250 1010 922] /ItalicAngle 0 /Ascent 752 /Descent -221 "
+            "/CapHeight 737 /StemV 114 >>"
+        )
+
+    def add_text_page(self, content: str) -> None:
+        """
+        テキストのみのページを書き出し
+
+        Args:
+            content: ページの描画命令
+        """
+        self._add_page(content, image_id=None)
+
+    def add_image_page(
+        self,
+        image_path: str,
+        box: Tuple[float, float, float, float],
+        content: str = ""
+    ) -> None:
+        """
+        画像付きのページを書き出し（画像ファイルはJPEGのまま逐次コピー）
+
+        Args:
+            image_path: 埋め込むJPEG画像
+            box: 画像の配置 (左, 上, 幅, 高さ)（ポイント、ページ左上基準）
+            content: 画像以外の描画命令
+        """
+        with Image.open(image_path) as img:
+            if img.format != "JPEG":
+                raise ValueError(f"PDFに埋め込めるのはJPEG画像のみです: {image_path}")
+            width_px, height_px = img.size
+            color_space = COLOR_SPACES.get(img.mode)
+        if color_space is None:
+            raise ValueError(f"対応していない色空間です: {image_path}")
+
+        image_id = self._next_id()
+        length = Path(image_path).stat().st_size
+        self._begin_object(image_id)
+        self._file.write(
+            f"<< /Type /XObject /Subtype /Image /Width {width_px} /Height {height_px} "
+            f"/ColorSpace {color_space} /BitsPerComponent 8 /Filter /DCTDecode "
+            f"/Length {length} >>\nstream\n".encode('ascii')
+        )
+        with open(image_path, 'rb') as src:
+            shutil.copyfileobj(src, self._file)
+        self._file.write(b"\nendstream\nendobj\n")
+
+        left, top, width, height = box
+        placement = f"q {width:.2f} 0 0 {height:.2f} {left:.2f} {PAGE_HEIGHT - top - height:.2f} cm /Im1 Do Q\n"
+        self._add_page(placement + content, image_id)
+
+    def close(self, completed: bool = True):
+        """
+        ページツリー・文書情報・相互参照表を書き出してファイルを閉じる
+
+        Args:
+            completed: 正常終了かどうか（False の場合は書きかけのファイルを削除）
+        """
+        if self._file is None:
+            return
+        try:
+            if completed:
+                kids = " ".join(f"{page_id} 0 R" for page_id in self._page_ids)
+                self._write_object(
+                    self.PAGES_ID,
+                    f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>"
+                )
+                info_id = self._next_id()
+                self._write_object(info_id, f"<< /Title {_encode_info(self.title)} /Producer (Manual Maker) >>")
+                self._write_xref(info_id)
+        finally:
+            self._file.close()
+            self._file = None
+            if not completed:
+                self.output_path.unlink(missing_ok=True)
+
+    def _add_page(self, content: str, image_id: Optional[int]) -> None:
+        """描画命令のストリームとページオブジェクトを書き出し"""
+        data = zlib.compress(content.encode('ascii'))
+        content_id = self._next_id()
+        self._begin_object(content_id)
+        self._file.write(f"<< /Length {len(data)} /Filter /FlateDecode >>\nstream\n".encode('ascii'))
+        self._file.write(data)
+        self._file.write(b"\nendstream\nendobj\n")
+
+        xobjects = f" /XObject << /Im1 {image_id} 0 R >>" if image_id else ""
+        page_id = self._next_id()
+        self._write_object(
+            page_id,
+            f"<< /Type /Page /Parent {self.PAGES_ID} 0 R /MediaBox [0 0 {PAGE_WIDTH:g} {PAGE_HEIGHT:g}] "
+            f"/Resources << /Font << /F1 {self.FONT_ID} 0 R >>{xobjects} >> /Contents {content_id} 0 R >>"
+        )
+        self._page_ids.append(page_id)
+        self.pages += 1
+
+    def _next_id(self) -> int:
+        """次のオブジェクト番号を確保"""
+        self._offsets.append(0)
+        return len(self._offsets)
+
+    def _begin_object(self, object_id: int):
+        """オブジェクトの開始位置を記録して書き出しを開始"""
+        self._offsets[object_id - 1] = self._file.tell()
+        self._file.write(f"{object_id} 0 obj\n".encode('ascii'))
+
+    def _write_object(self, object_id: int, body: str):
+        """辞書のみのオブジェクトを書き出し"""
+        self._begin_object(object_id)
+        self._file.write(f"{body}\nendobj\n".encode('ascii'))
+
+    def _write_xref(self, info_id: int):
+        """相互参照表とトレーラーを書き出し"""
+        xref_offset = self._file.tell()
+        out = io.StringIO()
+        out.write(f"xref\n0 {len(self._offsets) + 1}\n0000000000 65535 f \n")
+        for offset in self._offsets:
+            out.write(f"{offset:010d} 00000 n \n")
+        out.write(
+            f"trailer\n<< /Size {len(self._offsets) + 1} /Root {self.CATALOG_ID} 0 R /Info {info_id} 0 R >>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n"
+        )
+        self._file.write(out.getvalue().encode('ascii'))
+
+
+class PDFGenerator:
+    """PDF生成クラス"""
+
+    def __init__(
+        self,
+        image_settings: Optional[ImageSettings] = None,
+        max_workers: Optional[int] = None,
+        cache: Optional[RenderCache] = None
+    ):
+        """
+        Args:
+            image_settings: 埋め込み画像の縮小設定（形式は常にJPEG、省略時は config の値）
+            max_workers: 画像処理の並列数（省略時は config.EXPORT_WORKERS）
+            cache: 処理済み画像のキャッシュ（指定時は変更のあった画像だけを処理）
+        """
+        settings = image_settings or ImageSettings()
+        self.image_settings = ImageSettings(dpi=settings.dpi, format="jpeg", quality=settings.quality)
+        self.max_workers = max_workers
+        self.cache = cache
+
+    def generate(
+        self,
+        image_data_list: List[ImageData],
+        output_path: Path,
+        title: Optional[str] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        cancel_event=None
+    ) -> Path:
+        """
+        PDFファイルを生成
+
+        Args:
+            image_data_list: 画像データのリスト
+            output_path: 出力ファイルパス
+            title: 文書のタイトル（オプション）
+            progress_callback: 画像・ページを1枚処理するごとに (段階, 処理済み数, 総数) で呼ばれる関数
+            cancel_event: セットされると出力を中断するイベント（threading.Event など）
+
+        Returns:
+            Path: 生成されたファイルのパス
+
+        Raises:
+            ExportCancelled: cancel_event により中断された場合（出力ファイルは作成されない）
+        """
+        def report(stage: str, done: int, total: int):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled("PDFの出力がキャンセルされました")
+            if progress_callback:
+                progress_callback(stage, done, total)
+
+        output_path = Path(output_path)
+        existing = [img_data for img_data in image_data_list if Path(img_data.filepath).exists()]
+
+        with tempfile.TemporaryDirectory(prefix="pdf_images_") as work_dir:
+            tasks = build_tasks(
+                [img_data.filepath for img_data in existing],
+                Path(work_dir),
+                IMAGE_HEIGHT,
+                self.image_settings
+            )
+            image_progress = lambda done, total: report(STAGE_IMAGES, done, total)
+            if self.cache is not None:
+                image_paths = self.cache.prepare(tasks, self.max_workers, image_progress)
+            else:
+                image_paths = process_images(tasks, self.max_workers, image_progress)
+
+            report(STAGE_SLIDES, 0, len(existing))
+            with StreamingPDFWriter(output_path, title=title or DEFAULT_TITLE) as writer:
+                # タイトルページを作成（タイトル指定時または画像がある場合）
+                if title or existing:
+                    writer.add_text_page(self._title_content(title or DEFAULT_TITLE))
+                for i, (img_data, image_path) in enumerate(zip(existing, image_paths), 1):
+                    self._add_content_page(writer, img_data, image_path)
+                    report(STAGE_SLIDES, i, len(existing))
+
+        return output_path
+
+    def _title_content(self, title: str) -> str:
+        """
+        タイトルページの描画命令（中央揃え、長いタイトルは折り返す）
+
+        Args:
+            title: タイトル文字列
+
+        Returns:
+            描画命令
+        """
+        lines = wrap_text(title, PAGE_WIDTH - 2 * 54, TITLE_FONT_SIZE)
+        leading = TITLE_FONT_SIZE * LINE_SPACING
+        top = TITLE_CENTER_Y - leading * len(lines) / 2
+        return "".join(
+            _text_op(
+                line,
+                (PAGE_WIDTH - text_width(line, TITLE_FONT_SIZE)) / 2,
+                PAGE_HEIGHT - (top + leading * i + TITLE_FONT_SIZE * FONT_ASCENT),
+                TITLE_FONT_SIZE
+            )
+            for i, line in enumerate(lines)
+        )
+
+    def _add_content_page(self, writer: StreamingPDFWriter, img_data: ImageData, image_path: str) -> None:
+        """
+        画像ページを作成（画像 + 説明文）
+
+        Args:
+            writer: PDFライター
+            img_data: 画像データ
+            image_path: 埋め込む画像（JPEG）
+        """
+        with Image.open(image_path) as img:
+            width_px, height_px = img.size
+        height = _pt(IMAGE_HEIGHT)
+        box = (_pt(IMAGE_LEFT), _pt(IMAGE_TOP), height * width_px / height_px, height)
+
+        content = ""
+        if img_data.description:
+            font_size = DESC_FONT_SIZE.pt
+            leading = font_size * LINE_SPACING
+            left = _pt(DESC_LEFT) + TEXT_INSET_X
+            top = _pt(DESC_TOP) + TEXT_INSET_Y
+            lines = wrap_text(img_data.description, _pt(DESC_WIDTH) - 2 * TEXT_INSET_X, font_size)
+            content = "".join(
+                _text_op(line, left, PAGE_HEIGHT - (top + leading * i + font_size * FONT_ASCENT), font_size)
+                for i, line in enumerate(lines) if line
+            )
+        writer.add_image_page(image_path, box, content)
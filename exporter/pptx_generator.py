@@ -1,11 +1,24 @@
 """
 PowerPoint生成モジュール
 """
+import io
+import os
+import copy
+import tempfile
+import threading
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
+import pptx
 from pptx import Presentation
+from pptx.package import Package
+from pptx.enum.shapes import PP_PLACEHOLDER
 from pptx.util import Inches, Pt
+import config
 from utils.image_manager import ImageData
+from utils.session_archive import image_source, source_exists
+from exporter.image_processor import CropSettings, ImageSettings, build_tasks, process_images, with_click_options
+from exporter.overlay import OverlaySettings
+from exporter.render_cache import RenderCache
 
 
 # レイアウト定数
@@ -27,19 +40,150 @@ DESC_FONT_SIZE = Pt(14)
 # デフォルト値
 DEFAULT_TITLE = "マニュアル"
 
+# PowerPointに埋め込める画像形式
+SUPPORTED_IMAGE_FORMATS = ("png", "jpeg", "jpg")
+
+# 進捗通知の段階
+STAGE_IMAGES = "images"  # 画像の縮小・再エンコード
+STAGE_SLIDES = "slides"  # スライドの作成・書き出し
+
+# 進捗通知関数の型（段階, 処理済み数, 総数）
+ProgressCallback = Callable[[str, int, int], None]
+
+
+# スライドに複製されないプレースホルダー（日付・フッター・スライド番号）
+FOOTER_PLACEHOLDERS = (PP_PLACEHOLDER.DATE, PP_PLACEHOLDER.FOOTER, PP_PLACEHOLDER.SLIDE_NUMBER)
+TITLE_PLACEHOLDERS = (PP_PLACEHOLDER.CENTER_TITLE, PP_PLACEHOLDER.TITLE)
+
+# python-pptx の既定テンプレート
+DEFAULT_TEMPLATE_PATH = Path(pptx.__file__).parent / "templates" / "default.pptx"
+
+# 解析済みテンプレートのプロセス内キャッシュ（パス → (サイズと更新時刻, パッケージ)）
+_template_cache: Dict[str, Tuple[Tuple[int, int], Package]] = {}
+_template_lock = threading.Lock()
+
+
+class ExportCancelled(Exception):
+    """出力がキャンセルされたことを示す例外"""
+
+
+def load_template(template_path: Optional[Path] = None) -> Presentation:
+    """
+    テンプレートを複製して取得
+
+    解析はファイルが変わらない限りプロセスごとに1回だけ行い、呼び出しごとに解析済みの
+    パッケージを複製して返す。テンプレート内の既存スライドは取り除く。
+
+    Args:
+        template_path: テンプレート（.pptx）のパス（省略時は python-pptx の既定テンプレート）
+
+    Returns:
+        スライドのないプレゼンテーション
+    """
+    path = str(template_path or DEFAULT_TEMPLATE_PATH)
+    st = os.stat(path)
+    stamp = (st.st_size, st.st_mtime_ns)
+
+    with _template_lock:
+        cached = _template_cache.get(path)
+        if cached is None or cached[0] != stamp:
+            package = Package.open(path)
+            _remove_slides(package.presentation_part)
+            cached = (stamp, package)
+            _template_cache[path] = cached
+        # 複製はパッケージ単位で行う（ラッパーオブジェクトを介さずXMLとパーツをまとめて複製する）
+        package = copy.deepcopy(cached[1])
+    return package.presentation_part.presentation
+
+
+def _remove_slides(presentation_part) -> None:
+    """テンプレートのスライドをすべて取り除く（マスター・レイアウトは残す）"""
+    sld_id_lst = presentation_part._element.get_or_add_sldIdLst()
+    for sld_id in list(sld_id_lst):
+        sld_id_lst.remove(sld_id)
+        presentation_part.drop_rel(sld_id.rId)
+
+
+def _content_placeholder_count(layout) -> int:
+    """スライドに複製されるプレースホルダーの数"""
+    return sum(
+        1 for ph in layout.placeholders
+        if ph.placeholder_format.type not in FOOTER_PLACEHOLDERS
+    )
+
+
+def _has_title(layout) -> bool:
+    """タイトルのプレースホルダーを持つレイアウトかどうか"""
+    return any(ph.placeholder_format.type in TITLE_PLACEHOLDERS for ph in layout.placeholders)
+
+
+def resolve_layouts(prs: Presentation) -> Tuple:
+    """
+    タイトルスライドと画像スライドに使うレイアウトを決定
+
+    既定のインデックス（SLIDE_LAYOUT_TITLE / SLIDE_LAYOUT_BLANK）が目的に合わないテンプレートでは、
+    タイトルを持つ最初のレイアウト・プレースホルダーの最も少ないレイアウトで代替する。
+
+    Args:
+        prs: プレゼンテーション
+
+    Returns:
+        (タイトルスライドのレイアウト, 画像スライドのレイアウト)
+    """
+    layouts = list(prs.slide_layouts)
+
+    if len(layouts) > SLIDE_LAYOUT_BLANK and _content_placeholder_count(layouts[SLIDE_LAYOUT_BLANK]) == 0:
+        blank = layouts[SLIDE_LAYOUT_BLANK]
+    else:
+        blank = min(layouts, key=_content_placeholder_count)
+
+    if len(layouts) > SLIDE_LAYOUT_TITLE and _has_title(layouts[SLIDE_LAYOUT_TITLE]):
+        title = layouts[SLIDE_LAYOUT_TITLE]
+    else:
+        title = next((layout for layout in layouts if _has_title(layout)), blank)
+    return title, blank
+
 
 class PPTXGenerator:
     """PowerPoint生成クラス"""
 
-    def __init__(self):
-        """初期化"""
-        pass
+    def __init__(
+        self,
+        image_settings: Optional[ImageSettings] = None,
+        max_workers: Optional[int] = None,
+        cache: Optional[RenderCache] = None,
+        streaming: bool = False,
+        crop: Optional[CropSettings] = None,
+        overlay: Optional[OverlaySettings] = None,
+        template_path: Optional[Path] = None
+    ):
+        """
+        Args:
+            image_settings: 埋め込み画像の縮小・再エンコード設定（省略時は config の値）
+            max_workers: 画像処理の並列数（省略時は config.EXPORT_WORKERS）
+            cache: 処理済み画像のキャッシュ（指定時は変更のあった画像だけを処理）
+            streaming: スライドを1枚ずつファイルへ書き出す（大規模マニュアル向けの省メモリモード）
+            crop: クリック位置の周辺へ切り抜いて拡大表示する設定（省略時は画像全体）
+            overlay: クリック位置のマーカーを描画する設定（省略時は描画しない）
+            template_path: 会社のテンプレート（.pptx）のパス（省略時は config.PPTX_TEMPLATE_PATH）
+        """
+        self.image_settings = image_settings or ImageSettings()
+        if self.image_settings.format.lower() not in SUPPORTED_IMAGE_FORMATS:
+            raise ValueError(f"PowerPointに埋め込めない画像形式です: {self.image_settings.format}")
+        self.max_workers = max_workers
+        self.cache = cache
+        self.streaming = streaming
+        self.crop = crop
+        self.overlay = overlay
+        self.template_path = template_path or config.PPTX_TEMPLATE_PATH
 
     def generate(
         self,
         image_data_list: List[ImageData],
         output_path: Path,
-        title: Optional[str] = None
+        title: Optional[str] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        cancel_event=None
     ) -> Path:
         """
         PowerPointファイルを生成
@@ -48,55 +192,161 @@ class PPTXGenerator:
             image_data_list: 画像データのリスト
             output_path: 出力ファイルパス
             title: プレゼンテーションのタイトル（オプション）
+            progress_callback: 画像・スライドを1枚処理するごとに (段階, 処理済み数, 総数) で呼ばれる関数
+            cancel_event: セットされると出力を中断するイベント（threading.Event など）
 
         Returns:
             Path: 生成されたファイルのパス
+
+        Raises:
+            ExportCancelled: cancel_event により中断された場合（出力ファイルは作成されない）
         """
-        # 新しいプレゼンテーションを作成
-        prs = Presentation()
+        def report(stage: str, done: int, total: int):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled("PowerPointの出力がキャンセルされました")
+            if progress_callback:
+                progress_callback(stage, done, total)
+
+        # テンプレートから新しいプレゼンテーションを作成（レイアウトは出力ごとに1回だけ解決）
+        prs = load_template(self.template_path)
+        title_layout, blank_layout = resolve_layouts(prs)
 
         # タイトルスライドを作成（タイトル指定時または画像がある場合）
         if title or len(image_data_list) > 0:
-            self._create_title_slide(prs, title or DEFAULT_TITLE)
+            self._create_title_slide(prs, title or DEFAULT_TITLE, title_layout)
+
+        existing = [img_data for img_data in image_data_list if source_exists(img_data.filepath)]
 
-        # 画像スライドを作成
-        for img_data in image_data_list:
-            if Path(img_data.filepath).exists():
-                self._create_content_slide(prs, img_data)
+        with tempfile.TemporaryDirectory(prefix="pptx_images_") as work_dir:
+            # 画像をスライド上の表示サイズに縮小（プロセスプールで並列処理）
+            image_paths = self._prepare_images(
+                existing,
+                Path(work_dir),
+                lambda done, total: report(STAGE_IMAGES, done, total)
+            )
 
-        # ファイルを保存
-        prs.save(str(output_path))
+            report(STAGE_SLIDES, 0, len(existing))
+            if self.streaming:
+                self._write_streaming(prs, blank_layout, existing, image_paths, output_path, report)
+                return output_path
+
+            # 画像スライドを作成
+            for i, (img_data, image_path) in enumerate(zip(existing, image_paths), 1):
+                self._create_content_slide(prs, img_data, image_path, blank_layout)
+                report(STAGE_SLIDES, i, len(existing))
+
+            # ファイルを保存
+            prs.save(str(output_path))
 
         return output_path
 
-    def _create_title_slide(self, prs: Presentation, title: str) -> None:
+    def _write_streaming(
+        self,
+        prs: Presentation,
+        layout,
+        image_data_list: List[ImageData],
+        image_paths: List[str],
+        output_path: Path,
+        report: ProgressCallback
+    ) -> None:
+        """
+        画像スライドを1枚ずつ .pptx へ直接書き出す（メモリ使用量はスライド1枚分）
+
+        Args:
+            prs: タイトルスライドまで作成した雛形のプレゼンテーション
+            layout: 画像スライドのレイアウト
+            image_data_list: 画像データのリスト
+            image_paths: 埋め込み用画像パス
+            output_path: 出力ファイルパス
+            report: 進捗通知関数（中断時は書きかけのファイルを削除）
+        """
+        from exporter.pptx_stream_writer import StreamingPPTXWriter
+
+        skeleton = io.BytesIO()
+        prs.save(skeleton)
+        writer = StreamingPPTXWriter(
+            skeleton.getvalue(),
+            output_path,
+            slide_count=len(image_data_list),
+            layout_partname=layout.part.partname,
+            image_left=IMAGE_LEFT,
+            image_top=IMAGE_TOP,
+            image_height=IMAGE_HEIGHT,
+            desc_box=(DESC_LEFT, DESC_TOP, DESC_WIDTH, DESC_HEIGHT),
+            desc_font_size=DESC_FONT_SIZE
+        )
+        with writer:
+            for i, (img_data, image_path) in enumerate(zip(image_data_list, image_paths), 1):
+                writer.add_slide(image_path, img_data.description)
+                report(STAGE_SLIDES, i, len(image_data_list))
+
+    def _prepare_images(
+        self,
+        image_data_list: List[ImageData],
+        work_dir: Path,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> List[str]:
+        """
+        埋め込み用の画像を準備（クリック位置の描画・切り抜き、表示サイズへの縮小・再エンコード）
+
+        Args:
+            image_data_list: 画像データのリスト
+            work_dir: 処理済み画像の出力先
+            progress_callback: 1枚準備するごとに (準備済み数, 総数) で呼ばれる関数
+
+        Returns:
+            image_data_list と同じ順の埋め込み用画像パス
+        """
+        tasks = build_tasks(
+            [img_data.filepath for img_data in image_data_list],
+            work_dir,
+            IMAGE_HEIGHT,
+            self.image_settings
+        )
+        if self.crop is not None or self.overlay is not None:
+            tasks = with_click_options(tasks, image_data_list, self.crop, self.overlay)
+        if self.cache is not None:
+            return self.cache.prepare(tasks, self.max_workers, progress_callback)
+        return process_images(tasks, self.max_workers, progress_callback)
+
+    def _create_title_slide(self, prs: Presentation, title: str, layout=None) -> None:
         """
         タイトルスライドを作成
 
         Args:
             prs: プレゼンテーションオブジェクト
             title: タイトル文字列
+            layout: タイトルスライドのレイアウト（省略時は SLIDE_LAYOUT_TITLE）
         """
-        title_slide_layout = prs.slide_layouts[SLIDE_LAYOUT_TITLE]
+        title_slide_layout = layout or prs.slide_layouts[SLIDE_LAYOUT_TITLE]
         slide = prs.slides.add_slide(title_slide_layout)
 
         # タイトルを設定
         title_shape = slide.shapes.title
-        title_shape.text = title
+        if title_shape is not None:
+            title_shape.text = title
 
-    def _create_content_slide(self, prs: Presentation, img_data: ImageData) -> None:
+    def _create_content_slide(
+        self,
+        prs: Presentation,
+        img_data: ImageData,
+        image_path: Optional[str] = None,
+        layout=None
+    ) -> None:
         """
         コンテンツスライドを作成（画像 + 説明文）
 
         Args:
             prs: プレゼンテーションオブジェクト
             img_data: 画像データ
+            image_path: 埋め込む画像（省略時は元画像）
+            layout: 画像スライドのレイアウト（省略時は SLIDE_LAYOUT_BLANK）
         """
-        blank_slide_layout = prs.slide_layouts[SLIDE_LAYOUT_BLANK]
+        blank_slide_layout = layout or prs.slide_layouts[SLIDE_LAYOUT_BLANK]
         slide = prs.slides.add_slide(blank_slide_layout)
 
         # 画像を追加
-        self._add_image_to_slide(slide, img_data.filepath)
+        self._add_image_to_slide(slide, image_path or img_data.filepath)
 
         # 説明文を追加
         if img_data.description:
@@ -111,7 +361,7 @@ class PPTXGenerator:
             image_path: 画像ファイルパス
         """
         slide.shapes.add_picture(
-            image_path,
+            image_source(image_path),
             IMAGE_LEFT,
             IMAGE_TOP,
             height=IMAGE_HEIGHT
@@ -0,0 +1,280 @@
+"""
+大規模マニュアル向けのストリーミングPPTX書き出しモジュール
+
+python-pptx で作成した雛形（マスター・レイアウト・タイトルスライド）をそのまま複製し、
+画像スライドは1枚ずつスライドXMLと画像を .pptx（zip）へ直接書き込む。
+メモリに保持するのは処理中のスライド1枚分のみ。
+"""
+import re
+import io
+import zipfile
+import posixpath
+from pathlib import Path
+from typing import Optional
+from xml.sax.saxutils import escape, quoteattr
+from lxml import etree
+from PIL import Image
+from pptx.util import Length
+from utils.session_archive import image_source, split_member_path
+
+
+# OPCパッケージの名前空間
+NS_CT = "http://schemas.openxmlformats.org/package/2006/content-types"
+NS_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_P = "http://schemas.openxmlformats.org/presentationml/2006/main"
+NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+RT_SLIDE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide"
+RT_SLIDE_LAYOUT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout"
+RT_IMAGE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+CT_SLIDE = "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+
+# 画像の拡張子ごとのContent-Type
+IMAGE_CONTENT_TYPES = {"png": "image/png", "jpg": "image/jpeg", "jpeg": "image/jpeg"}
+
+# 書き直すパッケージ部品（それ以外は雛形からそのまま複製）
+CONTENT_TYPES_PART = "[Content_Types].xml"
+PRESENTATION_PART = "ppt/presentation.xml"
+PRESENTATION_RELS_PART = "ppt/_rels/presentation.xml.rels"
+
+XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+
+# XMLで使用できない制御文字
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class StreamingPPTXWriter:
+    """
+    ストリーミングPPTX書き出しクラス
+
+    スライド数は事前に分かっているため、パッケージ構造（Content-Types・スライド一覧）を
+    先頭に書き出してから、スライドと画像を順に追記する。
+    """
+
+    def __init__(
+        self,
+        skeleton: bytes,
+        output_path: Path,
+        slide_count: int,
+        layout_partname: str,
+        image_left: int,
+        image_top: int,
+        image_height: int,
+        desc_box: tuple,
+        desc_font_size: Length
+    ):
+        """
+        Args:
+            skeleton: 雛形の .pptx（python-pptx で保存したバイト列）
+            output_path: 出力ファイルパス
+            slide_count: 追加する画像スライドの枚数
+            layout_partname: 画像スライドに使うレイアウトの部品名（例: /ppt/slideLayouts/slideLayout7.xml）
+            image_left: 画像の左位置（EMU）
+            image_top: 画像の上位置（EMU）
+            image_height: 画像の高さ（EMU）
+            desc_box: 説明文の (left, top, width, height)（EMU）
+            desc_font_size: 説明文のフォントサイズ（pptx.util.Pt）
+        """
+        self.skeleton = skeleton
+        self.output_path = Path(output_path)
+        self.slide_count = slide_count
+        self.layout_partname = layout_partname
+        self.image_left = image_left
+        self.image_top = image_top
+        self.image_height = image_height
+        self.desc_box = desc_box
+        self.desc_font_size = desc_font_size
+        self.added = 0
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._first_slide_number = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(completed=exc_type is None)
+
+    def open(self):
+        """出力ファイルを開き、パッケージ構造と雛形の部品を書き出す"""
+        self._zip = zipfile.ZipFile(self.output_path, 'w', compression=zipfile.ZIP_DEFLATED)
+        with zipfile.ZipFile(io.BytesIO(self.skeleton)) as skeleton:
+            names = skeleton.namelist()
+            self._first_slide_number = 1 + sum(
+                1 for name in names if re.fullmatch(r"ppt/slides/slide\d+\.xml", name)
+            )
+            new_slides = [
+                f"ppt/slides/slide{self._first_slide_number + i}.xml" for i in range(self.slide_count)
+            ]
+
+            self._zip.writestr(CONTENT_TYPES_PART, _add_content_types(
+                skeleton.read(CONTENT_TYPES_PART), new_slides
+            ))
+            presentation, rels = _add_slide_list(
+                skeleton.read(PRESENTATION_PART), skeleton.read(PRESENTATION_RELS_PART), new_slides
+            )
+            self._zip.writestr(PRESENTATION_PART, presentation)
+            self._zip.writestr(PRESENTATION_RELS_PART, rels)
+
+            for info in skeleton.infolist():
+                if info.filename in (CONTENT_TYPES_PART, PRESENTATION_PART, PRESENTATION_RELS_PART):
+                    continue
+                self._zip.writestr(info, skeleton.read(info))
+
+    def add_slide(self, image_path: str, description: str = "") -> None:
+        """
+        画像スライドを1枚書き出し
+
+        Args:
+            image_path: 埋め込む画像ファイル
+            description: 説明文
+        """
+        if self.added >= self.slide_count:
+            raise ValueError("事前に指定したスライド数を超えています")
+
+        number = self._first_slide_number + self.added
+        ext = Path(image_path).suffix.lower().lstrip(".")
+        if ext not in IMAGE_CONTENT_TYPES:
+            raise ValueError(f"PowerPointに埋め込めない画像形式です: {image_path}")
+        media_name = f"ppt/media/slide{number}_image.{ext}"
+        if split_member_path(image_path) is None:
+            with Image.open(image_path) as img:
+                width_px, height_px = img.size
+            # 画像は圧縮済みのため無圧縮で格納（ファイルから逐次コピーされる）
+            self._zip.write(image_path, media_name, compress_type=zipfile.ZIP_STORED)
+        else:
+            # アーカイブ内の画像はメモリマップ上の内容をそのまま書き込む
+            with image_source(image_path) as source:
+                with Image.open(source) as img:
+                    width_px, height_px = img.size
+                self._zip.writestr(media_name, source.getbuffer(), compress_type=zipfile.ZIP_STORED)
+        image_width = int(round(self.image_height * width_px / height_px))
+        self._zip.writestr(
+            f"ppt/slides/_rels/slide{number}.xml.rels",
+            _slide_rels(
+                posixpath.relpath(self.layout_partname, "/ppt/slides"),
+                f"../media/{posixpath.basename(media_name)}"
+            )
+        )
+        self._zip.writestr(
+            f"ppt/slides/slide{number}.xml",
+            self._slide_xml(Path(image_path).name, image_width, description)
+        )
+        self.added += 1
+
+    def close(self, completed: bool = True):
+        """
+        出力ファイルを閉じる
+
+        Args:
+            completed: 正常終了かどうか（False の場合は書きかけのファイルを削除）
+        """
+        if self._zip is None:
+            return
+        self._zip.close()
+        self._zip = None
+        if not completed:
+            self.output_path.unlink(missing_ok=True)
+        elif self.added != self.slide_count:
+            self.output_path.unlink(missing_ok=True)
+            raise ValueError(f"スライド数が一致しません（予定 {self.slide_count} / 書き出し {self.added}）")
+
+    def _slide_xml(self, image_name: str, image_width: int, description: str) -> str:
+        """画像スライドのXML（python-pptx の add_picture / add_textbox と同じ構造）"""
+        shapes = (
+            '<p:pic><p:nvPicPr>'
+            f'<p:cNvPr id="2" name="Picture 1" descr={quoteattr(image_name)}/>'
+            '<p:cNvPicPr><a:picLocks noChangeAspect="1"/></p:cNvPicPr><p:nvPr/></p:nvPicPr>'
+            '<p:blipFill><a:blip r:embed="rId2"/><a:stretch><a:fillRect/></a:stretch></p:blipFill>'
+            f'<p:spPr><a:xfrm><a:off x="{self.image_left}" y="{self.image_top}"/>'
+            f'<a:ext cx="{image_width}" cy="{self.image_height}"/></a:xfrm>'
+            '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></p:spPr></p:pic>'
+        )
+        if description:
+            left, top, width, height = self.desc_box
+            shapes += (
+                '<p:sp><p:nvSpPr><p:cNvPr id="3" name="TextBox 2"/><p:cNvSpPr txBox="1"/><p:nvPr/></p:nvSpPr>'
+                f'<p:spPr><a:xfrm><a:off x="{left}" y="{top}"/><a:ext cx="{width}" cy="{height}"/></a:xfrm>'
+                '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom><a:noFill/></p:spPr>'
+                '<p:txBody><a:bodyPr wrap="none"><a:spAutoFit/></a:bodyPr><a:lstStyle/>'
+                f'{self._paragraphs_xml(description)}</p:txBody></p:sp>'
+            )
+        return (
+            XML_DECLARATION
+            + f'<p:sld xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+            f'xmlns:p="{NS_P}" xmlns:r="{NS_R}"><p:cSld><p:spTree>'
+            '<p:nvGrpSpPr><p:cNvPr id="1" name=""/><p:cNvGrpSpPr/><p:nvPr/></p:nvGrpSpPr><p:grpSpPr/>'
+            f'{shapes}</p:spTree></p:cSld><p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sld>'
+        )
+
+    def _paragraphs_xml(self, description: str) -> str:
+        """説明文の段落XML（改行ごとに段落を分け、先頭段落にフォントサイズを設定）"""
+        font_size = int(self.desc_font_size.pt * 100)
+        paragraphs = []
+        for i, line in enumerate(_INVALID_XML_CHARS.sub("", description).split("\n")):
+            props = f'<a:pPr><a:defRPr sz="{font_size}"/></a:pPr>' if i == 0 else ""
+            run = f'<a:r><a:t>{escape(line)}</a:t></a:r>' if line else ""
+            paragraphs.append(f'<a:p>{props}{run}</a:p>')
+        return "".join(paragraphs)
+
+
+def _slide_rels(layout_target: str, image_target: str) -> str:
+    """画像スライドのリレーションシップ"""
+    return (
+        XML_DECLARATION
+        + f'<Relationships xmlns="{NS_REL}">'
+        f'<Relationship Id="rId1" Type="{RT_SLIDE_LAYOUT}" Target="{layout_target}"/>'
+        f'<Relationship Id="rId2" Type="{RT_IMAGE}" Target="{image_target}"/>'
+        '</Relationships>'
+    )
+
+
+def _serialize(root) -> bytes:
+    """XML部品をシリアライズ"""
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+def _add_content_types(content_types: bytes, new_slides: list) -> bytes:
+    """Content-Typesに画像拡張子と追加スライドを登録"""
+    root = etree.fromstring(content_types)
+    defaults = {el.get("Extension").lower() for el in root.findall(f"{{{NS_CT}}}Default")}
+    for ext, content_type in IMAGE_CONTENT_TYPES.items():
+        if ext not in defaults:
+            etree.SubElement(root, f"{{{NS_CT}}}Default", Extension=ext, ContentType=content_type)
+    for slide in new_slides:
+        etree.SubElement(root, f"{{{NS_CT}}}Override", PartName=f"/{slide}", ContentType=CT_SLIDE)
+    return _serialize(root)
+
+
+def _add_slide_list(presentation: bytes, rels: bytes, new_slides: list) -> tuple:
+    """presentation.xml のスライド一覧とリレーションシップに追加スライドを登録"""
+    pres_root = etree.fromstring(presentation)
+    rels_root = etree.fromstring(rels)
+
+    rel_numbers = [
+        int(el.get("Id")[3:]) for el in rels_root.findall(f"{{{NS_REL}}}Relationship")
+        if el.get("Id", "").startswith("rId") and el.get("Id")[3:].isdigit()
+    ]
+    next_rel = max(rel_numbers, default=0) + 1
+
+    sld_id_lst = pres_root.find(f"{{{NS_P}}}sldIdLst")
+    if sld_id_lst is None:
+        # スライド一覧はマスター一覧の直後に置く
+        sld_id_lst = etree.Element(f"{{{NS_P}}}sldIdLst")
+        master_lst = pres_root.find(f"{{{NS_P}}}sldMasterIdLst")
+        index = list(pres_root).index(master_lst) + 1 if master_lst is not None else 0
+        pres_root.insert(index, sld_id_lst)
+    slide_ids = [int(el.get("id")) for el in sld_id_lst.findall(f"{{{NS_P}}}sldId")]
+    next_id = max(slide_ids, default=255) + 1
+
+    for i, slide in enumerate(new_slides):
+        rel_id = f"rId{next_rel + i}"
+        etree.SubElement(
+            rels_root, f"{{{NS_REL}}}Relationship",
+            Id=rel_id, Type=RT_SLIDE, Target=slide[len("ppt/"):]
+        )
+        etree.SubElement(
+            sld_id_lst, f"{{{NS_P}}}sldId",
+            {"id": str(next_id + i), f"{{{NS_R}}}id": rel_id}
+        )
+    return _serialize(pres_root), _serialize(rels_root)
@@ -0,0 +1,215 @@
+"""
+出力用画像のレンダーキャッシュモジュール
+
+処理済み画像を「元画像の内容ハッシュ + 処理設定」をキーにディスクへ保存し、
+再出力時は変更のあったスライドの画像だけを処理する。
+処理不要で元画像をそのまま使う画像も、同じキーの空ファイルで記録してキャッシュヒットにする。
+"""
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from dataclasses import asdict, replace
+import config
+from utils.blob_store import file_digest
+from utils.session_archive import source_digest, source_exists, source_stamp
+from exporter.image_processor import ImageTask, process_images, uses_previous
+
+
+# 内容ハッシュの記録ファイル（パス・サイズ・更新時刻が同じなら再計算しない）
+HASH_INDEX_FILE = "content_hashes.json"
+
+# 処理不要で元画像をそのまま使うタスクの記録ファイルの拡張子（空ファイル）
+PASSTHROUGH_SUFFIX = ".passthrough"
+
+
+def task_key(task: ImageTask, content_hash: str, previous_hash: Optional[str] = None) -> str:
+    """
+    処理済み画像を識別するキー（元画像の内容ハッシュと、入出力パス以外のすべての処理設定）
+
+    前の手順の画像はパスではなく内容ハッシュで識別する（並び替え・名前変更では無効にならず、
+    同じパスの画像が差し替えられた場合は無効になる）。
+
+    Args:
+        task: 前処理タスク
+        content_hash: 元画像の内容ハッシュ
+        previous_hash: 前の手順の画像の内容ハッシュ（比較に使わない場合はNone）
+
+    Returns:
+        SHA-256ハッシュ
+    """
+    params = asdict(task)
+    params.pop("src")
+    params.pop("dest")
+    params["previous"] = previous_hash
+    key_source = content_hash + json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+
+class RenderCache:
+    """レンダーキャッシュクラス"""
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: Optional[int] = None):
+        """
+        Args:
+            cache_dir: キャッシュディレクトリ（省略時は config.RENDER_CACHE_DIR）
+            max_bytes: キャッシュの上限サイズ（省略時は config.RENDER_CACHE_MAX_BYTES）
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else config.RENDER_CACHE_DIR
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes if max_bytes is not None else config.RENDER_CACHE_MAX_BYTES
+        self.index_file = self.cache_dir / HASH_INDEX_FILE
+        self._hashes: Dict[str, Tuple[int, int, str]] = self._load_index()
+        self.hits = 0
+        self.misses = 0
+
+    def _load_index(self) -> Dict[str, Tuple[int, int, str]]:
+        """内容ハッシュの記録を読み込み"""
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                return {path: tuple(value) for path, value in json.load(f).items()}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save(self):
+        """内容ハッシュの記録を保存（content_hash だけを使った場合は呼び出し側で保存する）"""
+        tmp_file = self.index_file.with_name(f"{self.index_file.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._hashes, f)
+        os.replace(tmp_file, self.index_file)
+
+    def content_hash(self, path: str) -> str:
+        """
+        画像の内容ハッシュを取得（サイズと更新時刻が変わっていなければ記録を再利用）
+
+        Args:
+            path: 画像ファイルパス
+
+        Returns:
+            SHA-256ハッシュ
+        """
+        stamp = source_stamp(path)
+        if stamp is None:
+            raise FileNotFoundError(f"画像が見つかりません: {path}")
+        cached = self._hashes.get(path)
+        if cached and tuple(cached[:2]) == stamp:
+            return cached[2]
+        # アーカイブ内の画像はメモリマップから直接ハッシュを計算
+        digest = source_digest(path) or file_digest(Path(path))
+        self._hashes[path] = (*stamp, digest)
+        return digest
+
+    def cache_path(self, task: ImageTask) -> Path:
+        """
+        タスクに対応するキャッシュファイルのパス
+
+        Args:
+            task: 前処理タスク
+
+        Returns:
+            キャッシュファイルのパス
+        """
+        previous_hash = None
+        if uses_previous(task) and source_exists(task.previous):
+            previous_hash = self.content_hash(task.previous)
+        key = task_key(task, self.content_hash(task.src), previous_hash)
+        return self.cache_dir / key[:2] / f"{key}{task.settings.suffix}"
+
+    def prepare(
+        self,
+        tasks: List[ImageTask],
+        max_workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> List[str]:
+        """
+        キャッシュ済みの画像を再利用し、未処理の画像だけを並列に処理
+
+        Args:
+            tasks: 前処理タスクのリスト
+            max_workers: 並列数
+            progress_callback: 1枚準備するごとに (準備済み数, 総数) で呼ばれる関数（キャッシュ済み分を含む）
+
+        Returns:
+            tasks と同じ順の画像ファイルパス
+        """
+        results: List[Optional[str]] = []
+        pending: List[Tuple[int, ImageTask]] = []
+        for i, task in enumerate(tasks):
+            cached = self.cache_path(task)
+            marker = cached.with_suffix(PASSTHROUGH_SUFFIX)
+            if cached.exists():
+                os.utime(cached)  # 古い順の削除で残るよう更新時刻を更新
+                results.append(str(cached))
+                self.hits += 1
+            elif marker.exists():
+                # 前回処理不要だった画像は開き直さずに元画像を使う
+                os.utime(marker)
+                results.append(task.src)
+                self.hits += 1
+            else:
+                cached.parent.mkdir(exist_ok=True)
+                results.append(None)
+                pending.append((i, replace(task, dest=str(cached))))
+        self.misses += len(pending)
+
+        def _progress(done: int, _total: int):
+            progress_callback(len(tasks) - len(pending) + done, len(tasks))
+
+        if progress_callback:
+            progress_callback(len(tasks) - len(pending), len(tasks))
+        try:
+            paths = process_images(
+                [task for _, task in pending],
+                max_workers,
+                _progress if progress_callback else None
+            )
+        finally:
+            # 中断された場合も計算済みの内容ハッシュは残す
+            self.save()
+        for (i, task), path in zip(pending, paths):
+            results[i] = path
+            if path != task.dest:
+                # 処理不要だった画像は、同じキーの記録だけを残して次回のキャッシュヒットにする
+                Path(task.dest).with_suffix(PASSTHROUGH_SUFFIX).touch()
+
+        if pending:
+            self.prune(keep=set(results))
+        return results
+
+    def prune(self, keep: Optional[set] = None) -> int:
+        """
+        上限サイズを超えた分を更新時刻の古い順に削除
+
+        Args:
+            keep: 削除しないファイルパス（出力中の画像）
+
+        Returns:
+            削除したファイル数
+        """
+        keep = keep or set()
+        entries = []
+        total = 0
+        for bucket in self.cache_dir.iterdir():
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue  # 別プロセスが削除済み
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path in keep:
+                continue
+            Path(path).unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
@@ -4,38 +4,146 @@ Manual Maker - 収録モード
 マウス・キーボード操作を検知してスクリーンショットを自動撮影
 """
 import sys
+import time
 import signal
+import threading
+import subprocess
+import argparse
 from pathlib import Path
+from typing import Optional, Tuple
 from datetime import datetime
 import config
 from utils.screenshot import ScreenshotCapture
 from utils.event_detector import EventDetector
 from utils.image_manager import ImageManager
+from utils.session_recovery import recover_session
+from utils.session_ops import resolve_session
+from utils.session_index import SessionIndex
+from utils.frame_spill import FrameSpill, encode_spill, spill_path
 
 
 class Recorder:
     """収録クラス"""
 
-    def __init__(self):
-        # セッションディレクトリの作成
-        session_name = datetime.now().strftime("session_%Y%m%d_%H%M%S")
-        self.session_dir = config.SESSIONS_DIR / session_name
-        self.session_dir.mkdir(parents=True, exist_ok=True)
-
-        # コンポーネントの初期化
-        self.screenshot = ScreenshotCapture(self.session_dir)
-        self.image_manager = ImageManager(self.session_dir)
+    def __init__(self, session_dir: Optional[Path] = None, defer_encoding: Optional[bool] = None):
+        """
+        Args:
+            session_dir: 収録を再開する既存セッション（省略時は新規セッションを作成）
+            defer_encoding: 収録中は生データをスピルファイルへ追記し、エンコードを後で行うかどうか
+                （省略時は config.DEFER_ENCODING）
+        """
+        if session_dir is None:
+            # セッションディレクトリの作成
+            session_name = datetime.now().strftime("session_%Y%m%d_%H%M%S")
+            self.session_dir = config.SESSIONS_DIR / session_name
+            self.session_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            # 中断時にメタデータへ登録されなかった画像を先に取り込む
+            self.session_dir = session_dir
+            report = recover_session(self.session_dir)
+            if report.restored:
+                print(f"🩺 Restored {len(report.restored)} unregistered screenshots")
+
+        # 後からエンコードする場合は生データの書き込み先を確保
+        if config.DEFER_ENCODING if defer_encoding is None else defer_encoding:
+            self.spill = FrameSpill(spill_path(self.session_dir))
+        else:
+            self.spill = None
+        self._last_event = time.monotonic()
+        self._activity = threading.Event()  # 操作があるとアイドル時のエンコードを中断する
+        self._stopping = threading.Event()
+        self._idle_thread: Optional[threading.Thread] = None
+
+        # コンポーネントの初期化（連番は既存ファイルの続きから、Undo履歴は不要）
+        self.screenshot = ScreenshotCapture(self.session_dir, spill=self.spill)
+        self.image_manager = ImageManager(self.session_dir, enable_undo=False)
         self.event_detector = EventDetector(on_event=self._on_event)
 
+        # 編集UIのセッション一覧に収録中のセッションを反映
+        self.session_index = SessionIndex()
+        self._update_index(self.session_index.update, self.session_dir)
+
+        if session_dir is not None:
+            print(f"⏯️  Resuming session at #{self.screenshot.counter:04d}")
         print(f"📁 Session directory: {self.session_dir}\n")
 
-    def _on_event(self):
-        """イベント発生時の処理（スクリーンショット撮影）"""
-        filepath = self.screenshot.capture()
-        self.image_manager.add_image(filepath)
+    def _on_event(self, position: Optional[Tuple[int, int]] = None):
+        """
+        イベント発生時の処理（スクリーンショット撮影）
+
+        Args:
+            position: クリック位置（画面上の座標、キー入力時は None）
+        """
+        click = self.screenshot.to_image_position(*position) if position else None
+        filepath = self.screenshot.capture(click=click)
+        self._last_event = time.monotonic()
+        if self.spill:
+            # 画像の登録はエンコード時に行う
+            self._activity.set()
+            return
+        self.image_manager.add_image(filepath, click=click)
+        self._update_index(self.session_index.record_capture, self.session_dir, filepath)
+
+    def _update_index(self, update, *args):
+        """セッション一覧のインデックスを更新（失敗しても収録は続ける）"""
+        try:
+            update(*args)
+        except (OSError, TimeoutError) as e:
+            print(f"⚠️  Failed to update session index: {e}")
+
+    def _idle_encode_loop(self):
+        """操作が途切れている間にスピルファイルのフレームをエンコード"""
+        encoded_position = self.spill.position
+        while not self._stopping.wait(config.SPILL_IDLE_SECONDS):
+            idle = time.monotonic() - self._last_event >= config.SPILL_IDLE_SECONDS
+            if not idle or self.spill.position == encoded_position:
+                continue
+            position = self.spill.position
+            self._activity.clear()
+            try:
+                report = encode_spill(
+                    self.session_dir,
+                    max_workers=config.SPILL_IDLE_WORKERS,
+                    remove=False,
+                    low_priority=True,
+                    cancel_event=self._activity
+                )
+            except Exception as e:
+                print(f"⚠️  Idle encoding failed: {e}")
+                continue
+            if report.registered:
+                self._update_index(self.session_index.update, self.session_dir)
+            if not self._activity.is_set() and not report.errors:
+                encoded_position = position
+
+    def _encode_spill(self):
+        """収録停止後に残りのフレームをすべてエンコード"""
+        self._stopping.set()
+        self._activity.set()
+        if self._idle_thread is not None:
+            self._idle_thread.join()
+        self.spill.close()
+
+        def on_progress(done: int, total: int):
+            print(f"\r🖼️  Encoding screenshots: {done}/{total}", end="", flush=True)
+
+        try:
+            report = encode_spill(self.session_dir, progress_callback=on_progress)
+        except TimeoutError:
+            print("⚠️  Screenshots are being encoded by another process")
+            return
+        if report.encoded:
+            print()
+        for error in report.errors:
+            print(f"⚠️  {error}")
+        self.image_manager.refresh()
+        self._update_index(self.session_index.update, self.session_dir)
 
     def start(self):
         """収録開始"""
+        if self.spill:
+            self._idle_thread = threading.Thread(target=self._idle_encode_loop, name="idle-encode", daemon=True)
+            self._idle_thread.start()
         self.event_detector.start()
 
         try:
@@ -48,15 +156,58 @@ class Recorder:
         """収録停止"""
         self.event_detector.stop()
         self.screenshot.close()
+        if self.spill:
+            self._encode_spill()
         print(f"\n✅ Recording completed!")
         print(f"   Screenshots saved: {len(self.image_manager.get_images())}")
         print(f"   Location: {self.session_dir}")
+        if config.COMPACT_AFTER_RECORDING:
+            self._start_compaction()
         print(f"\nNext step: Run 'streamlit run app.py' to edit and generate PowerPoint")
 
+    def _start_compaction(self):
+        """画像の圧縮を別プロセスで開始（収録プロセスの終了を待たせない）"""
+        command = [sys.executable, str(Path(__file__).parent / "session_tool.py"), "compact", str(self.session_dir)]
+        try:
+            subprocess.Popen(
+                command,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+                creationflags=getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)
+            )
+        except OSError as e:
+            print(f"⚠️  Failed to start compaction: {e}")
+            return
+        print(f"🗜️  Compacting screenshots in the background")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """コマンドライン引数の解析"""
+    parser = argparse.ArgumentParser(description="Manual Maker - 収録モード")
+    parser.add_argument(
+        "--resume",
+        metavar="SESSION",
+        help="既存セッションに続けて収録する（セッション名またはパス）"
+    )
+    parser.add_argument(
+        "--defer-encoding",
+        action="store_true",
+        default=None,
+        help="収録中は画像をエンコードせず、停止後・アイドル時にまとめて変換する（非力なPC向け）"
+    )
+    return parser.parse_args(argv)
+
 
 def main():
     """メイン処理"""
-    recorder = Recorder()
+    args = parse_args()
+    try:
+        session_dir = resolve_session(args.resume) if args.resume else None
+    except FileNotFoundError as e:
+        raise SystemExit(f"❌ {e}")
+    recorder = Recorder(session_dir, defer_encoding=args.defer_encoding)
 
     # Ctrl+C のシグナルハンドラ
     def signal_handler(sig, frame):
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Manual Maker - セッション操作ツール
+セッションの結合・分割・圧縮・アーカイブ・画像変換・ブロブ回収をコマンドラインから実行
+"""
+import argparse
+from pathlib import Path
+from datetime import datetime
+import config
+from utils.session_ops import merge_sessions, split_session, resolve_session, MODE_LINK, MODE_MOVE
+from utils.session_index import SessionIndex
+from utils.compaction import CompactionSettings, compact_session
+from utils.session_archive import ARCHIVE_SUFFIX, export_session, import_archive
+from utils.frame_spill import encode_spill
+from utils.blob_store import BlobStore
+
+
+def cmd_merge(args):
+    """結合コマンド"""
+    sources = [resolve_session(name) for name in args.sessions]
+    name = args.output or datetime.now().strftime("session_%Y%m%d_%H%M%S_merged")
+    dest_dir = config.SESSIONS_DIR / name
+    count = merge_sessions(sources, dest_dir, mode=MODE_MOVE if args.move else MODE_LINK)
+    print(f"✅ Merged {len(sources)} sessions ({count} screenshots) into {dest_dir}")
+
+
+def cmd_split(args):
+    """分割コマンド"""
+    source = resolve_session(args.session)
+    name = args.output or f"{source.name}_from{args.at:04d}"
+    dest_dir = config.SESSIONS_DIR / name
+    count = split_session(source, args.at - 1, dest_dir)
+    print(f"✅ Moved {count} screenshots (from #{args.at}) into {dest_dir}")
+
+
+def cmd_compact(args):
+    """圧縮コマンド"""
+    source = resolve_session(args.session)
+    settings = CompactionSettings(colors=args.colors) if args.colors else CompactionSettings()
+    report = compact_session(source, settings=settings, max_workers=args.workers)
+    SessionIndex().update(source)
+    print(
+        f"✅ Compacted {report.compacted} screenshots in {source.name} "
+        f"({report.bytes_saved / 1024 ** 2:.1f} MB saved, {report.skipped} skipped)"
+    )
+    for error in report.errors:
+        print(f"⚠️  {error}")
+
+
+def cmd_encode(args):
+    """スピルファイルの画像変換コマンド"""
+    source = resolve_session(args.session)
+    try:
+        report = encode_spill(source, max_workers=args.workers)
+    except TimeoutError:
+        raise SystemExit(f"❌ {source.name} は収録中です")
+    SessionIndex().update(source)
+    print(f"✅ Encoded {report.encoded} and registered {report.registered} of {report.frames} spilled frames")
+    for error in report.errors:
+        print(f"⚠️  {error}")
+
+
+def cmd_archive(args):
+    """アーカイブ作成コマンド"""
+    source = resolve_session(args.session)
+    archive_path = args.output or config.ARCHIVES_DIR / f"{source.name}{ARCHIVE_SUFFIX}"
+    count = export_session(source, archive_path)
+    print(f"✅ Archived {count} screenshots into {archive_path}")
+
+
+def cmd_unarchive(args):
+    """アーカイブ展開コマンド"""
+    archive_path = Path(args.archive)
+    if not archive_path.is_file():
+        archive_path = config.ARCHIVES_DIR / args.archive
+    if not archive_path.is_file():
+        raise FileNotFoundError(f"アーカイブが見つかりません: {args.archive}")
+    dest_dir = config.SESSIONS_DIR / (args.output or archive_path.stem)
+    count = import_archive(archive_path, dest_dir)
+    SessionIndex().update(dest_dir)
+    print(f"✅ Extracted {count} screenshots into {dest_dir}")
+
+
+def cmd_gc(args):
+    """ブロブ回収コマンド"""
+    removed = BlobStore().gc(config.SESSIONS_DIR)
+    print(f"✅ Removed {removed} unreferenced blobs from {config.BLOBS_DIR}")
+
+
+def main(argv=None):
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="Manual Maker - セッション操作ツール")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    merge_parser = subparsers.add_parser("merge", help="複数のセッションを順番に結合")
+    merge_parser.add_argument("sessions", nargs="+", help="結合するセッション（この順に並ぶ）")
+    merge_parser.add_argument("-o", "--output", help="作成するセッション名")
+    merge_parser.add_argument(
+        "--move",
+        action="store_true",
+        help="画像を元のセッションから移動する（既定はハードリンクで元のセッションを残す）"
+    )
+    merge_parser.set_defaults(func=cmd_merge)
+
+    split_parser = subparsers.add_parser("split", help="セッションを指定した画像番号で分割")
+    split_parser.add_argument("session", help="分割するセッション")
+    split_parser.add_argument(
+        "--at",
+        type=int,
+        required=True,
+        help="新しいセッションに移す最初の画像番号（1始まり）"
+    )
+    split_parser.add_argument("-o", "--output", help="作成するセッション名")
+    split_parser.set_defaults(func=cmd_split)
+
+    compact_parser = subparsers.add_parser("compact", help="セッションの画像を最大圧縮で再エンコード")
+    compact_parser.add_argument("session", help="圧縮するセッション")
+    compact_parser.add_argument(
+        "--colors",
+        type=int,
+        help="指定した色数に減色する（既定は config.COMPACTION_COLORS、未設定なら可逆圧縮のみ）"
+    )
+    compact_parser.add_argument("-j", "--workers", type=int, help="並列数（既定はCPU数）")
+    compact_parser.set_defaults(func=cmd_compact)
+
+    encode_parser = subparsers.add_parser("encode", help="後からエンコードする収録の残りのフレームを画像に変換")
+    encode_parser.add_argument("session", help="変換するセッション")
+    encode_parser.add_argument("-j", "--workers", type=int, help="並列数（既定はCPU数）")
+    encode_parser.set_defaults(func=cmd_encode)
+
+    archive_parser = subparsers.add_parser("archive", help="セッションを1つのアーカイブファイル（.zip）にまとめる")
+    archive_parser.add_argument("session", help="アーカイブするセッション")
+    archive_parser.add_argument("-o", "--output", type=Path, help=f"作成するアーカイブ（既定は {config.ARCHIVES_DIR} 内）")
+    archive_parser.set_defaults(func=cmd_archive)
+
+    unarchive_parser = subparsers.add_parser("unarchive", help="アーカイブを展開して編集できるセッションを作成")
+    unarchive_parser.add_argument("archive", help="アーカイブのパスまたはファイル名")
+    unarchive_parser.add_argument("-o", "--output", help="作成するセッション名（既定はアーカイブ名）")
+    unarchive_parser.set_defaults(func=cmd_unarchive)
+
+    gc_parser = subparsers.add_parser("gc", help="削除した画像のリンクを外し、参照のなくなったブロブを回収")
+    gc_parser.set_defaults(func=cmd_gc)
+
+    args = parser.parse_args(argv)
+    try:
+        args.func(args)
+    except (FileNotFoundError, FileExistsError) as e:
+        raise SystemExit(f"❌ {e}")
+
+
+if __name__ == "__main__":
+    main()
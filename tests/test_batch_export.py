@@ -0,0 +1,89 @@
+"""
+一括出力ツールのテスト
+"""
+import pytest
+from pptx import Presentation
+from utils.image_manager import ImageManager
+from batch_export import export_sessions, output_path_for, main
+
+
+@pytest.fixture
+def sessions(tmp_path, sample_images):
+    """画像を持つセッション3つ"""
+    session_dirs = []
+    for i in range(3):
+        session_dir = tmp_path / "sessions" / f"session_{i}"
+        session_dir.mkdir(parents=True)
+        manager = ImageManager(session_dir)
+        for path in sample_images[:i + 1]:
+            dest = session_dir / path.name
+            dest.write_bytes(path.read_bytes())
+            manager.add_image(str(dest))
+        session_dirs.append(session_dir)
+    return session_dirs
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """レンダーキャッシュを一時ディレクトリに向ける"""
+    monkeypatch.setattr("config.RENDER_CACHE_DIR", tmp_path / "render")
+
+
+class TestBatchExport:
+    """一括出力のテスト"""
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_exports_each_session(self, sessions, workers):
+        """セッションごとにPowerPointを生成し、入力順に結果を返す"""
+        results = export_sessions(sessions, max_workers=workers)
+
+        assert [result.session_dir for result in results] == sessions
+        for i, result in enumerate(results):
+            assert result.error == ""
+            assert result.slides == i + 1
+            assert result.output_path == output_path_for(sessions[i])
+            assert len(Presentation(str(result.output_path)).slides) == i + 2
+
+    def test_output_dir(self, sessions, tmp_path):
+        """出力先ディレクトリを指定できる"""
+        output_dir = tmp_path / "out"
+        results = export_sessions(sessions, output_dir=output_dir, max_workers=1, use_cache=False)
+        assert all(result.output_path.parent == output_dir for result in results)
+        assert len(list(output_dir.glob("*.pptx"))) == 3
+
+    def test_failure_is_reported_per_session(self, sessions):
+        """失敗したセッションがあっても他のセッションは出力される"""
+        output_path_for(sessions[1]).mkdir()  # 出力先をディレクトリにして書き込みを失敗させる
+
+        results = export_sessions(sessions, max_workers=1)
+
+        assert results[1].error
+        assert results[0].error == "" and results[2].error == ""
+        assert output_path_for(sessions[2]).is_file()
+
+    def test_main_requires_sessions(self):
+        """セッション未指定はエラー"""
+        with pytest.raises(SystemExit):
+            main([])
+
+    def test_main_all(self, sessions, monkeypatch, capsys):
+        """--all で全セッションを出力して集計を表示"""
+        monkeypatch.setattr("config.SESSIONS_DIR", sessions[0].parent)
+        main(["--all", "--workers", "1"])
+
+        out = capsys.readouterr().out
+        assert "Exported 3/3 sessions (6 slides)" in out
+        assert all(output_path_for(session_dir).exists() for session_dir in sessions)
+
+    def test_main_template(self, sessions, tmp_path, monkeypatch):
+        """--template のスライドサイズで出力される"""
+        template = Presentation()
+        template.slide_width = template.slide_height * 16 // 9
+        template_path = tmp_path / "template.pptx"
+        template.save(str(template_path))
+
+        monkeypatch.setattr("config.SESSIONS_DIR", sessions[0].parent)
+        main(["--all", "--workers", "1", "--template", str(template_path)])
+
+        prs = Presentation(str(output_path_for(sessions[0])))
+        assert prs.slide_width == template.slide_width
@@ -0,0 +1,145 @@
+"""
+BlobStoreのテスト
+"""
+import os
+import pytest
+from pathlib import Path
+from PIL import Image
+from utils.blob_store import BlobStore, file_digest
+from utils.image_manager import ImageManager
+
+
+@pytest.fixture
+def blob_store(tmp_path):
+    """一時ディレクトリ上のBlobStore"""
+    return BlobStore(tmp_path / "blobs")
+
+
+class TestBlobStore:
+    """BlobStoreクラスのテスト"""
+
+    def test_store_deduplicates_identical_bytes(self, blob_store, tmp_path):
+        """同一内容の画像は1つのブロブを共有する"""
+        session_a = tmp_path / "a"
+        session_b = tmp_path / "b"
+        session_a.mkdir()
+        session_b.mkdir()
+
+        blob_store.store(b"same-bytes", session_a / "0000_x.png")
+        blob_store.store(b"same-bytes", session_b / "0000_y.png")
+
+        blobs = list(blob_store.root.glob("*/*.png"))
+        assert len(blobs) == 1
+        assert blob_store.refcount(blobs[0]) == 2
+        assert os.path.samefile(session_a / "0000_x.png", session_b / "0000_y.png")
+
+    def test_import_file_links_existing_image(self, blob_store, sample_images):
+        """既存ファイルをブロブへのリンクに置き換える"""
+        # 最初のファイルはそのままブロブとして登録される
+        assert blob_store.import_file(sample_images[0]) is False
+        # 同一内容の2枚目は同じブロブへのリンクに置き換わる
+        assert blob_store.import_file(sample_images[1]) is True
+        assert blob_store.import_file(sample_images[1]) is False
+
+        blob = blob_store.blob_path(file_digest(sample_images[0]), ".png")
+        assert blob_store.refcount(blob) == 2
+
+    def test_copy_session_rewrites_metadata(self, blob_store, temp_session_dir, sample_images, tmp_path):
+        """セッションコピーはリンクで共有し、パスを付け替える"""
+        manager = ImageManager(temp_session_dir)
+        manager.update_description(1, "Copied description")
+
+        dest = blob_store.copy_session(temp_session_dir, tmp_path / "copy")
+
+        copied = ImageManager(dest)
+        assert len(copied.images) == 3
+        assert copied.images[1].description == "Copied description"
+        for img in copied.images:
+            assert Path(img.filepath).parent == dest
+            assert Path(img.filepath).exists()
+        assert os.path.samefile(dest / sample_images[2].name, sample_images[2])
+
+    def test_gc_removes_unreferenced_blobs(self, blob_store, tmp_path):
+        """セッション削除後に参照のないブロブが回収される"""
+        session = tmp_path / "session"
+        session.mkdir()
+        blob_store.store(b"only-here", session / "0000_x.png")
+        assert blob_store.gc() == 0
+
+        assert blob_store.delete_session(session) == 1
+        assert list(blob_store.root.iterdir()) == []
+
+    def test_gc_prunes_images_deleted_from_metadata(self, blob_store, tmp_path):
+        """メタデータから削除された画像のブロブも回収される"""
+        sessions_dir = tmp_path / "sessions"
+        session = sessions_dir / "session_1"
+        session.mkdir(parents=True)
+        for i, color in enumerate([(255, 0, 0), (0, 255, 0)]):
+            path = session / f"{i:04d}_x.png"
+            Image.new('RGB', (10, 10), color=color).save(path)
+            blob_store.import_file(path)
+
+        manager = ImageManager(session)
+        manager.delete_image(0)
+
+        assert blob_store.gc(sessions_dir) == 1
+        assert not (session / "0000_x.png").exists()
+        assert (session / "0001_x.png").exists()
+
+
+    def test_prune_keeps_undone_and_unlinked_images(self, blob_store, temp_session_dir, sample_images):
+        """Undoで戻した画像と、ブロブと共有していない削除済み画像は残す"""
+        for path in sample_images[:2]:
+            blob_store.import_file(path)
+        manager = ImageManager(temp_session_dir)
+        manager.delete_image(0)
+        manager.undo()
+        manager.delete_images([1, 2])
+
+        assert blob_store.prune_session(temp_session_dir) == 1
+        assert [path.exists() for path in sample_images] == [True, False, True]
+
+    def test_copy_session_rebases_relative_paths(self, blob_store, temp_session_dir, sample_images, tmp_path, monkeypatch):
+        """相対パスで指定したセッションでも画像パスを付け替える"""
+        ImageManager(temp_session_dir).save_metadata()
+        monkeypatch.chdir(temp_session_dir.parent)
+
+        dest = blob_store.copy_session(Path(temp_session_dir.name), tmp_path / "copy")
+
+        assert [Path(img.filepath).parent for img in ImageManager(dest).images] == [dest] * 3
+
+
+class TestSessionOpsRelease:
+    """セッション操作後のブロブ回収のテスト"""
+
+    def test_merge_move_releases_deleted_images(self, blob_store, tmp_path, mocker):
+        from utils.session_ops import merge_sessions, MODE_MOVE
+        mocker.patch("utils.session_ops.config.BLOB_STORE_ENABLED", True)
+        mocker.patch("utils.session_ops.BlobStore", return_value=blob_store)
+        source = tmp_path / "source"
+        source.mkdir()
+        for i in range(2):
+            blob_store.store(bytes([i]) * 16, source / f"{i:04d}_x.png")
+        ImageManager(source).delete_image(0)
+
+        merge_sessions([source], tmp_path / "merged", mode=MODE_MOVE)
+
+        assert not (source / "0000_x.png").exists()
+        assert len(list(blob_store.root.glob("*/*.png"))) == 1
+
+
+class TestScreenshotCaptureWithBlobStore:
+    """ScreenshotCaptureの重複排除保存テスト"""
+
+    def test_capture_writes_by_hash(self, mocker, mock_screenshot, blob_store, temp_session_dir):
+        """撮影画像がブロブ経由で保存される"""
+        from utils.screenshot import ScreenshotCapture
+        mocker.patch("utils.screenshot.mss.mss", return_value=mock_screenshot)
+
+        capture = ScreenshotCapture(temp_session_dir, blob_store=blob_store)
+        first = capture.capture()
+        second = capture.capture()
+
+        assert first != second
+        assert os.path.samefile(first, second)
+        assert len(list(blob_store.root.glob("*/*.png"))) == 1
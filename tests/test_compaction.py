@@ -0,0 +1,132 @@
+"""
+収録後の画像圧縮のテスト
+"""
+import os
+import threading
+import pytest
+from PIL import Image, ImageDraw
+from utils.compaction import COMPACTION_LOG, CompactionSettings, compact_image, compact_session
+from utils.image_manager import ImageManager
+
+
+def _fast_png(path, shift=0):
+    """収録時のように圧縮なしで保存した画面"""
+    img = Image.new('RGB', (320, 240), color=(255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((20 + shift, 20, 160 + shift, 120), fill=(30, 60, 200))
+    img.save(path, compress_level=0)
+    return path
+
+
+@pytest.fixture
+def session(temp_session_dir):
+    """圧縮なしの画像3枚を登録したセッション"""
+    manager = ImageManager(temp_session_dir, enable_undo=False)
+    for i in range(3):
+        manager.add_image(str(_fast_png(temp_session_dir / f"{i:04d}_screen.png", shift=i * 10)))
+    return temp_session_dir
+
+
+class TestCompactImage:
+    """compact_image のテスト"""
+
+    def test_lossless_keeps_pixels(self, temp_session_dir):
+        """可逆圧縮では画素を変えずに小さくする"""
+        path = _fast_png(temp_session_dir / "screen.png")
+        with Image.open(path) as img:
+            before_pixels = img.tobytes()
+
+        result = compact_image(str(path), CompactionSettings(colors=None, min_saving=0.02))
+
+        assert result.replaced
+        assert result.after == os.path.getsize(path) < result.before
+        with Image.open(path) as img:
+            assert img.tobytes() == before_pixels
+
+    def test_not_replaced_when_saving_is_small(self, temp_session_dir):
+        """削減率が足りない場合は元のファイルを残す"""
+        path = temp_session_dir / "screen.png"
+        Image.new('RGB', (64, 64), color=(255, 0, 0)).save(path, optimize=True)
+        mtime_ns = os.stat(path).st_mtime_ns
+
+        result = compact_image(str(path), CompactionSettings(colors=None, min_saving=0.5))
+
+        assert not result.replaced
+        assert os.stat(path).st_mtime_ns == mtime_ns
+        assert sorted(p.name for p in temp_session_dir.iterdir()) == ["screen.png"]
+
+    def test_lossy_palette(self, temp_session_dir):
+        """色数を指定するとパレット画像にする"""
+        path = _fast_png(temp_session_dir / "screen.png")
+
+        compact_image(str(path), CompactionSettings(colors=16, min_saving=0.0))
+
+        with Image.open(path) as img:
+            assert img.mode == "P"
+            assert img.size == (320, 240)
+
+
+class TestCompactSession:
+    """compact_session のテスト"""
+
+    def test_reports_bytes_saved(self, session):
+        """全画像を圧縮して削減量を報告"""
+        total_before = sum(os.path.getsize(p) for p in session.glob("*.png"))
+
+        report = compact_session(session, max_workers=2)
+
+        assert report.compacted == 3
+        assert report.bytes_before == total_before
+        assert report.bytes_saved == total_before - sum(os.path.getsize(p) for p in session.glob("*.png"))
+        assert report.bytes_saved > 0
+        assert not list(session.glob(".*.tmp"))
+
+    def test_resume_skips_compacted_images(self, session):
+        """圧縮済みとして記録した画像は再処理しない"""
+        compact_session(session, max_workers=2)
+
+        report = compact_session(session, max_workers=2)
+
+        assert report.skipped == 3
+        assert report.compacted == report.unchanged == 0
+
+    def test_changed_image_is_compacted_again(self, session):
+        """記録後に差し替えられた画像は再び圧縮する"""
+        compact_session(session, max_workers=2)
+        _fast_png(session / "0001_screen.png", shift=50)
+
+        report = compact_session(session, max_workers=2)
+
+        assert report.compacted == 1
+        assert report.skipped == 2
+
+    def test_partial_log_line_is_ignored(self, session):
+        """書き込み途中で中断した記録の行は無視する"""
+        (session / COMPACTION_LOG).write_text("0000_screen.png\t12", encoding='utf-8')
+
+        report = compact_session(session, max_workers=2)
+
+        assert report.compacted == 3
+
+    def test_hard_linked_image_is_skipped(self, session, tmp_path):
+        """他と共有しているハードリンクの画像は圧縮しない"""
+        os.link(session / "0000_screen.png", tmp_path / "shared.png")
+
+        report = compact_session(session, max_workers=2)
+
+        assert report.skipped == 1
+        assert report.compacted == 2
+        assert os.path.samefile(session / "0000_screen.png", tmp_path / "shared.png")
+
+    def test_cancel_leaves_rest_for_next_run(self, session):
+        """中断すると残りは次回に圧縮する"""
+        cancel = threading.Event()
+
+        def on_progress(done, total):
+            cancel.set()
+
+        first = compact_session(session, max_workers=1, progress_callback=on_progress, cancel_event=cancel)
+        second = compact_session(session, max_workers=1)
+
+        assert first.compacted + second.compacted == 3
+        assert second.skipped == first.compacted
@@ -0,0 +1,91 @@
+"""
+重複した手順の検出のテスト
+"""
+import time
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+from utils.duplicate_finder import (
+    DuplicateRun, PerceptualHashCache, dhash, find_duplicate_runs, find_duplicates, hamming_distances
+)
+
+
+def _screen(path, box, caret=0):
+    """白地に四角形を描いた画面（caret はカーソル程度の小さな違い）"""
+    img = Image.new('RGB', (320, 240), color=(255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle(box, fill=(30, 60, 200))
+    draw.line((10 + caret, 200, 10 + caret, 210), fill=(0, 0, 0))
+    img.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def screens(temp_session_dir):
+    """画面A・A'・A''・B・C・C' の順の画像（A系とC系がほぼ同じ）"""
+    return [
+        _screen(temp_session_dir / "0000.png", (20, 20, 160, 120)),
+        _screen(temp_session_dir / "0001.png", (20, 20, 160, 120), caret=2),
+        _screen(temp_session_dir / "0002.png", (20, 20, 160, 120), caret=4),
+        _screen(temp_session_dir / "0003.png", (150, 100, 300, 230)),
+        _screen(temp_session_dir / "0004.png", (0, 150, 100, 240)),
+        _screen(temp_session_dir / "0005.png", (0, 150, 100, 240), caret=3),
+    ]
+
+
+@pytest.fixture
+def hash_cache(tmp_path):
+    """一時ディレクトリ上のPerceptualHashCache"""
+    return PerceptualHashCache(tmp_path / "hashes.json")
+
+
+class TestDuplicateFinder:
+    """重複検出のテスト"""
+
+    def test_hamming_distances(self):
+        """隣り合うハッシュのビットの違いを数える"""
+        hashes = np.array([0, 0b1011, 0b1011, 2 ** 64 - 1], dtype=np.uint64)
+        assert hamming_distances(hashes).tolist() == [3, 0, 61]
+        assert hamming_distances(hashes[:1]).tolist() == []
+
+    def test_find_duplicate_runs(self):
+        """距離が閾値以下で続く区間を検出"""
+        hashes = np.array([0, 1, 3, 2 ** 40 - 1, 2 ** 63, 2 ** 63 + 1], dtype=np.uint64)
+        assert find_duplicate_runs(hashes, max_distance=2) == [DuplicateRun(0, 2), DuplicateRun(4, 5)]
+        assert find_duplicate_runs(hashes, max_distance=0) == []
+
+    def test_near_identical_screens_are_grouped(self, screens, hash_cache):
+        """小さな違いしかない画面の区間だけを検出"""
+        runs = find_duplicates(screens, hash_cache)
+        assert runs == [DuplicateRun(0, 2), DuplicateRun(4, 5)]
+        assert [run.duplicates for run in runs] == [[1, 2], [5]]
+
+    def test_hashes_are_cached(self, screens, tmp_path, mocker):
+        """計算済みのハッシュは別インスタンスでも再計算しない"""
+        first = PerceptualHashCache(tmp_path / "hashes.json").hashes(screens)
+        spy = mocker.patch("utils.duplicate_finder.dhash")
+
+        second = PerceptualHashCache(tmp_path / "hashes.json").hashes(screens)
+        assert np.array_equal(first, second)
+        spy.assert_not_called()
+
+    def test_changed_image_is_rehashed(self, screens, hash_cache, temp_session_dir):
+        """画像が差し替えられると再計算"""
+        before = hash_cache.hashes(screens)
+        _screen(temp_session_dir / "0001.png", (150, 100, 300, 230))
+
+        after = hash_cache.hashes(screens)
+        assert after[1] == dhash(screens[1])
+        assert after[1] != before[1]
+
+    def test_vectorized_comparison_is_fast(self):
+        """1万枚分のハッシュの比較は一瞬で終わる"""
+        rng = np.random.default_rng(0)
+        hashes = rng.integers(0, 2 ** 63, size=10_000, dtype=np.uint64)
+        hashes[5000:5010] = hashes[5000]
+
+        start = time.perf_counter()
+        runs = find_duplicate_runs(hashes, max_distance=4)
+        assert time.perf_counter() - start < 1.0
+        assert DuplicateRun(5000, 5009) in runs
+
@@ -0,0 +1,94 @@
+"""
+出力ジョブ管理のテスト
+"""
+import threading
+import pytest
+from pptx import Presentation
+from exporter.pptx_generator import PPTXGenerator
+from exporter.pdf_generator import PDFGenerator
+from exporter.export_jobs import (
+    ExportJobManager,
+    STATUS_DONE,
+    STATUS_CANCELLED,
+)
+
+
+@pytest.fixture
+def job_manager():
+    """テスト終了時に停止するExportJobManager"""
+    manager = ExportJobManager()
+    yield manager
+    manager.shutdown()
+
+
+class TestExportJobManager:
+    """ExportJobManagerクラスのテスト"""
+
+    def test_job_completes(self, job_manager, temp_session_dir, sample_image_data):
+        """ジョブがバックグラウンドで完了する"""
+        output_path = temp_session_dir / "manual.pptx"
+        job = job_manager.submit(PPTXGenerator(max_workers=1), sample_image_data, output_path, title="T")
+
+        assert job.wait(timeout=30)
+        assert job.status == STATUS_DONE
+        assert job.progress == 1.0
+        assert job.result_valid
+        assert len(Presentation(str(output_path)).slides) == 4
+        assert job_manager.latest(output_path) is job
+
+    def test_unchanged_deck_returns_same_job(self, job_manager, temp_session_dir, sample_image_data):
+        """内容が変わっていなければ前回のジョブを返す"""
+        output_path = temp_session_dir / "manual.pptx"
+        first = job_manager.submit(PPTXGenerator(max_workers=1), sample_image_data, output_path)
+        first.wait(timeout=30)
+
+        second = job_manager.submit(PPTXGenerator(max_workers=1), sample_image_data, output_path)
+        assert second is first
+
+    def test_changed_deck_starts_new_job(self, job_manager, temp_session_dir, sample_image_data):
+        """説明文やタイトルが変われば新しいジョブになる"""
+        output_path = temp_session_dir / "manual.pptx"
+        first = job_manager.submit(PPTXGenerator(max_workers=1), sample_image_data, output_path)
+        first.wait(timeout=30)
+
+        sample_image_data[0].description = "変更後"
+        second = job_manager.submit(PPTXGenerator(max_workers=1), sample_image_data, output_path)
+        assert second is not first
+        assert second.wait(timeout=30)
+        assert job_manager.get(first.key) is None
+
+    def test_overwritten_output_is_regenerated(self, job_manager, temp_session_dir, sample_image_data):
+        """出力ファイルが削除されていれば同じ内容でも再生成する"""
+        output_path = temp_session_dir / "manual.pptx"
+        first = job_manager.submit(PPTXGenerator(max_workers=1), sample_image_data, output_path)
+        first.wait(timeout=30)
+        output_path.unlink()
+
+        assert not first.result_valid
+        second = job_manager.submit(PPTXGenerator(max_workers=1), sample_image_data, output_path)
+        assert second is not first
+        assert second.wait(timeout=30)
+        assert output_path.exists()
+
+    def test_cancel_queued_job(self, job_manager, temp_session_dir, sample_image_data):
+        """待機中にキャンセルされたジョブは実行されない"""
+        output_path = temp_session_dir / "manual.pptx"
+        release = threading.Event()
+        job_manager._executor.submit(release.wait)  # ワーカーを塞いでジョブを待機させる
+
+        job = job_manager.submit(PPTXGenerator(max_workers=1), sample_image_data, output_path)
+        job.cancel()
+        release.set()
+
+        assert job.wait(timeout=30)
+        assert job.status == STATUS_CANCELLED
+        assert not output_path.exists()
+
+    def test_pdf_job(self, job_manager, temp_session_dir, sample_image_data):
+        """PDFGeneratorも同じジョブ管理で実行できる"""
+        output_path = temp_session_dir / "manual.pdf"
+        job = job_manager.submit(PDFGenerator(max_workers=1), sample_image_data, output_path)
+
+        assert job.wait(timeout=30)
+        assert job.status == STATUS_DONE
+        assert output_path.read_bytes().startswith(b"%PDF")
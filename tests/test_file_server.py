@@ -0,0 +1,113 @@
+"""
+ダウンロードサーバーのテスト
+"""
+import os
+import pytest
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from utils.file_server import FileServer
+
+
+@pytest.fixture
+def server():
+    """ローカルの空きポートで起動したFileServer"""
+    server = FileServer(host="127.0.0.1", port=0, public_url=None, ttl=60).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def deck(tmp_path):
+    """配信するファイル"""
+    path = tmp_path / "session_manual.pptx"
+    path.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+    return path
+
+
+class TestFileServer:
+    """FileServerクラスのテスト"""
+
+    def test_download_registered_file(self, server, deck):
+        """登録したファイルを添付ファイルとして配信"""
+        url = server.register(deck, filename="手順書.pptx")
+
+        with urlopen(url) as response:
+            body = response.read()
+            headers = response.headers
+
+        assert body == deck.read_bytes()
+        assert headers["Content-Length"] == str(deck.stat().st_size)
+        assert "filename*=UTF-8''%E6%89%8B%E9%A0%86%E6%9B%B8.pptx" in headers["Content-Disposition"]
+        assert headers["Content-Type"] == "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+    def test_head_sends_no_body(self, server, deck):
+        """HEADはヘッダーのみ"""
+        with urlopen(Request(server.register(deck), method="HEAD")) as response:
+            assert response.headers["Content-Length"] == str(deck.stat().st_size)
+            assert response.read() == b""
+
+    def test_same_file_reuses_url(self, server, deck):
+        """同じ内容のファイルの再登録は同じURL"""
+        assert server.register(deck) == server.register(deck)
+
+    def test_unknown_token_is_rejected(self, server, deck):
+        """登録されていないトークンは404"""
+        url = server.register(deck)
+        with pytest.raises(HTTPError) as exc_info:
+            urlopen(url[:-4] + "xxxx")
+        assert exc_info.value.code == 404
+
+    def test_overwritten_file_is_not_served(self, server, deck):
+        """登録後に上書きされたファイルは410、再登録で新しいURLになる"""
+        url = server.register(deck)
+        deck.write_bytes(b"regenerated")
+
+        with pytest.raises(HTTPError) as exc_info:
+            urlopen(url)
+        assert exc_info.value.code == 410
+
+        new_url = server.register(deck)
+        assert new_url != url
+        with urlopen(new_url) as response:
+            assert response.read() == b"regenerated"
+
+    def test_expired_token_is_rejected(self, deck):
+        """有効期間を過ぎたURLは404"""
+        server = FileServer(host="127.0.0.1", port=0, ttl=-1).start()
+        try:
+            with pytest.raises(HTTPError) as exc_info:
+                urlopen(server.register(deck))
+            assert exc_info.value.code == 404
+        finally:
+            server.stop()
+
+    def test_public_url(self, deck):
+        """公開URLを指定した場合はそのURLでリンクを作成"""
+        server = FileServer(host="127.0.0.1", port=0, public_url="http://manual-pc:8600/").start()
+        try:
+            assert server.register(deck).startswith("http://manual-pc:8600/download/")
+        finally:
+            server.stop()
+
+    def test_url_uses_request_host(self, deck):
+        """公開URL未設定時はブラウザが編集UIに使ったホスト名とサーバーのポートでリンクを作成"""
+        server = FileServer(host="0.0.0.0", port=0, public_url=None).start()
+        try:
+            port = server._server.server_address[1]
+            assert server.register(deck, request_host="manual-pc:8501").startswith(f"http://manual-pc:{port}/download/")
+            assert server.register(deck, request_host="[fe80::1]:8501").startswith(f"http://[fe80::1]:{port}/download/")
+        finally:
+            server.stop()
+
+    @pytest.mark.parametrize("host, public_url, request_host, expected", [
+        ("127.0.0.1", None, "localhost:8501", True),
+        ("127.0.0.1", None, "[::1]:8501", True),
+        ("127.0.0.1", None, None, True),
+        ("127.0.0.1", None, "manual-pc:8501", False),
+        ("127.0.0.1", "https://manual.example.com/files", "manual-pc:8501", True),
+        ("0.0.0.0", None, "manual-pc:8501", True),
+    ])
+    def test_reachable_from(self, host, public_url, request_host, expected):
+        """ループバックで待ち受けている場合、他のPCのブラウザからは接続できない"""
+        server = FileServer(host=host, port=0, public_url=public_url)
+        assert server.reachable_from(request_host) is expected
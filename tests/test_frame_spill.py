@@ -0,0 +1,177 @@
+"""
+スピルファイルと後からのエンコードのテスト
+"""
+import pytest
+from PIL import Image
+from utils.frame_spill import FrameSpill, encode_spill, pending_filenames, read_frames, spill_path
+from utils.image_manager import ImageManager
+from utils.screenshot import ScreenshotCapture
+from utils.session_recovery import recover_session
+
+
+def _bgra(color, size=(8, 6)):
+    """単色のBGRA生データ"""
+    r, g, b = color
+    return bytes([b, g, r, 255]) * (size[0] * size[1])
+
+
+@pytest.fixture
+def spill(temp_session_dir):
+    """小さく確保したスピルファイル（拡張を伴う）"""
+    writer = FrameSpill(spill_path(temp_session_dir), initial_bytes=256)
+    yield writer
+    if not writer._file.closed:
+        writer.close()
+
+
+def _append_frames(spill, count=3):
+    """赤・緑・青…のフレームを追記"""
+    colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0)]
+    for i in range(count):
+        spill.append(
+            f"{i:04d}_20240101_12000{i}.png",
+            f"2024-01-01T12:00:0{i}",
+            (8, 6),
+            _bgra(colors[i]),
+            click=(i, i + 1) if i % 2 == 0 else None
+        )
+
+
+class TestFrameSpill:
+    """FrameSpill と read_frames のテスト"""
+
+    def test_round_trip(self, spill):
+        """追記したフレームを順に読み込める（確保サイズを超えた分は拡張）"""
+        _append_frames(spill)
+
+        frames = list(read_frames(spill.path))
+
+        assert [frame.filename for frame in frames] == [
+            "0000_20240101_120000.png", "0001_20240101_120001.png", "0002_20240101_120002.png"
+        ]
+        assert [frame.click for frame in frames] == [(0, 1), None, (2, 3)]
+        assert frames[1].timestamp == "2024-01-01T12:00:01"
+        assert (frames[0].width, frames[0].height, frames[0].length) == (8, 6, 8 * 6 * 4)
+        assert spill.path.stat().st_size >= spill.position
+
+    def test_uncommitted_record_is_dropped(self, spill):
+        """コミットマーカーのないレコード（書き込み中のクラッシュ）は読み込まない"""
+        _append_frames(spill, 2)
+        frames = list(read_frames(spill.path))
+        marker = frames[1].offset + frames[1].length
+        spill._map[marker:marker + 4] = b"\0\0\0\0"
+
+        assert [frame.filename for frame in read_frames(spill.path)] == [frames[0].filename]
+
+    def test_reopen_appends_after_last_committed(self, spill):
+        """開き直すと最後にコミットされたフレームの後ろに追記する"""
+        _append_frames(spill, 2)
+        frames = list(read_frames(spill.path))
+        marker = frames[1].offset + frames[1].length
+        spill._map[marker:marker + 4] = b"\0\0\0\0"
+        spill.close()
+
+        reopened = FrameSpill(spill.path, initial_bytes=256)
+        reopened.append("0001_again.png", "2024-01-01T12:01:00", (8, 6), _bgra((1, 2, 3)))
+        reopened.close()
+
+        assert [frame.filename for frame in read_frames(spill.path)] == [frames[0].filename, "0001_again.png"]
+
+    def test_second_writer_is_rejected(self, spill):
+        """同じスピルファイルに2つの収録が書き込むことはできない"""
+        with pytest.raises(TimeoutError):
+            FrameSpill(spill.path)
+
+
+class TestEncodeSpill:
+    """encode_spill のテスト"""
+
+    def test_encodes_and_registers_in_order(self, spill, temp_session_dir):
+        """エンコードして撮影順・クリック位置・撮影日時つきで登録し、スピルファイルを削除"""
+        _append_frames(spill)
+        spill.close()
+
+        report = encode_spill(temp_session_dir, max_workers=2)
+
+        assert (report.frames, report.encoded, report.registered, report.removed) == (3, 3, 3, True)
+        assert not spill.path.exists()
+        images = ImageManager(temp_session_dir, enable_undo=False).get_images()
+        assert [img.filepath for img in images] == [
+            str(temp_session_dir / f"{i:04d}_20240101_12000{i}.png") for i in range(3)
+        ]
+        assert (images[0].click_x, images[0].click_y) == (0, 1)
+        assert images[1].click_x is None
+        assert images[2].timestamp == "2024-01-01T12:00:02"
+        with Image.open(images[1].filepath) as img:
+            assert img.size == (8, 6)
+            assert img.convert("RGB").getpixel((0, 0)) == (0, 255, 0)
+
+    def test_while_recording(self, spill, temp_session_dir):
+        """収録中はスピルファイルを残したまま登録し、削除を伴う変換はロックで拒否"""
+        _append_frames(spill, 2)
+
+        with pytest.raises(TimeoutError):
+            encode_spill(temp_session_dir)
+        report = encode_spill(temp_session_dir, max_workers=1, remove=False)
+
+        assert report.registered == 2
+        assert not report.removed
+        assert spill.path.exists()
+
+        # 続きを撮影して停止後に変換すると、追加分だけをエンコード・登録
+        _append_frames(spill, 3)
+        spill.close()
+        report = encode_spill(temp_session_dir, max_workers=1)
+
+        assert (report.encoded, report.registered, report.removed) == (1, 1, True)
+        assert len(ImageManager(temp_session_dir, enable_undo=False).get_images()) == 3
+
+    def test_deleted_frame_is_not_registered_again(self, spill, temp_session_dir):
+        """収録中に編集UIで削除したフレームは、次のエンコードで再登録しない"""
+        _append_frames(spill, 2)
+        encode_spill(temp_session_dir, max_workers=1, remove=False)
+        ImageManager(temp_session_dir).delete_image(0)
+
+        _append_frames(spill, 3)
+        report = encode_spill(temp_session_dir, max_workers=1, remove=False)
+
+        assert report.registered == 1
+        assert pending_filenames(temp_session_dir) == set()
+        spill.close()
+        encode_spill(temp_session_dir, max_workers=1)
+        recover_session(temp_session_dir)
+
+        images = ImageManager(temp_session_dir, enable_undo=False).get_images()
+        assert [img.filepath for img in images] == [
+            str(temp_session_dir / f"{i:04d}_20240101_12000{i}.png") for i in (1, 2)
+        ]
+        assert not list(temp_session_dir.glob("*.registered"))
+
+    def test_recover_session_after_crash(self, spill, temp_session_dir):
+        """クラッシュで残ったスピルファイルは復旧処理で画像になる（重複登録しない）"""
+        _append_frames(spill)
+        spill.close()
+        # 1枚目だけエンコード済み・登録済みの状態
+        encode_spill(temp_session_dir, max_workers=1, remove=False)
+        (temp_session_dir / "0002_20240101_120002.png").unlink()
+
+        recover_session(temp_session_dir)
+
+        images = ImageManager(temp_session_dir, enable_undo=False).get_images()
+        assert len(images) == 3
+        assert not any(img.missing for img in images)
+        assert not spill.path.exists()
+        assert pending_filenames(temp_session_dir) == set()
+
+
+def test_screenshot_capture_spills_without_encoding(mocker, mock_screenshot, temp_session_dir):
+    """スピル時は画像ファイルを作らずに生データを追記する"""
+    mocker.patch("utils.screenshot.mss.mss", return_value=mock_screenshot)
+    writer = FrameSpill(spill_path(temp_session_dir), initial_bytes=4096)
+
+    filepath = ScreenshotCapture(temp_session_dir, spill=writer).capture(click=(5, 6))
+    writer.close()
+
+    assert not filepath.exists()
+    frames = list(read_frames(writer.path))
+    assert [(frame.filename, frame.click, frame.width) for frame in frames] == [(filepath.name, (5, 6), 100)]
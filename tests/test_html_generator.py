@@ -0,0 +1,114 @@
+"""
+HTMLGeneratorのテスト
+"""
+import re
+import pytest
+from PIL import Image
+from utils.image_manager import ImageData
+import exporter.html_generator as html_generator
+from exporter.html_generator import HTMLGenerator, INDEX_FILE, STYLE_FILE, IMAGES_DIR
+import exporter.render_cache as render_cache
+from exporter.render_cache import RenderCache
+
+
+@pytest.fixture
+def wide_images(temp_session_dir):
+    """複数サイズを生成する横長画像3枚"""
+    paths = []
+    for i in range(3):
+        path = temp_session_dir / f"{i:04d}_wide.png"
+        Image.new('RGB', (1600, 900), color=(i * 60, 0, 0)).save(path)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    """HTMLの出力先"""
+    return tmp_path / "html"
+
+
+class TestHTMLGenerator:
+    """HTMLGeneratorクラスのテスト"""
+
+    def test_writes_index_css_and_images(self, wide_images, output_dir):
+        """index.html・style.css・画像を出力する"""
+        images = [ImageData(filepath=str(path), description=f"手順{i}") for i, path in enumerate(wide_images)]
+        index = HTMLGenerator(max_workers=1).generate(images, output_dir, title="テスト")
+
+        assert index == output_dir / INDEX_FILE
+        assert (output_dir / STYLE_FILE).exists()
+        # 幅 320 / 640 / 1280 の3サイズ × 3枚
+        assert len(list((output_dir / IMAGES_DIR).iterdir())) == 9
+        text = index.read_text(encoding='utf-8')
+        assert "<title>テスト</title>" in text
+        assert text.count('<section class="step"') == 3
+
+    def test_srcset_matches_generated_sizes(self, wide_images, output_dir):
+        """srcsetの幅指定が実際の画像の幅と一致する"""
+        images = [ImageData(filepath=str(wide_images[0]))]
+        index = HTMLGenerator(max_workers=1).generate(images, output_dir)
+
+        srcset = re.search(r'srcset="([^"]+)"', index.read_text(encoding='utf-8')).group(1)
+        for candidate in srcset.split(", "):
+            url, descriptor = candidate.split(" ")
+            with Image.open(output_dir / url) as img:
+                assert f"{img.width}w" == descriptor
+                assert img.format == "WEBP"
+
+    def test_lazy_loading_after_first_step(self, wide_images, output_dir):
+        """2枚目以降の画像だけを遅延読み込みにする"""
+        images = [ImageData(filepath=str(path)) for path in wide_images]
+        text = HTMLGenerator(max_workers=1).generate(images, output_dir).read_text(encoding='utf-8')
+
+        tags = re.findall(r"<img [^>]+>", text)
+        assert 'loading="lazy"' not in tags[0]
+        assert all('loading="lazy"' in tag for tag in tags[1:])
+
+    def test_small_image_is_not_upscaled(self, sample_images, output_dir):
+        """元画像より大きいサイズは生成しない"""
+        images = [ImageData(filepath=str(sample_images[0]))]
+        text = HTMLGenerator(max_workers=1).generate(images, output_dir).read_text(encoding='utf-8')
+
+        assert re.search(r'srcset="[^" ]+ 100w"', text)
+        assert len(list((output_dir / IMAGES_DIR).iterdir())) == 1
+
+    def test_description_is_escaped(self, sample_images, output_dir):
+        """説明文はHTMLエスケープされる"""
+        images = [ImageData(filepath=str(sample_images[0]), description="<b>太字</b> & 改行\n2行目")]
+        text = HTMLGenerator(max_workers=1).generate(images, output_dir).read_text(encoding='utf-8')
+
+        assert "&lt;b&gt;太字&lt;/b&gt; &amp; 改行\n2行目" in text
+
+    def test_reexport_processes_only_new_images(self, wide_images, output_dir, mocker):
+        """再出力時は新しい画像だけを処理し、不要になった画像は削除する"""
+        generator = HTMLGenerator(max_workers=1)
+        generator.generate([ImageData(filepath=str(p)) for p in wide_images[:2]], output_dir)
+        first_files = set((output_dir / IMAGES_DIR).iterdir())
+
+        spy = mocker.spy(html_generator, "process_images")
+        generator.generate([ImageData(filepath=str(p)) for p in wide_images[1:]], output_dir)
+
+        assert len(spy.call_args.args[0]) == 3  # 3枚目の3サイズのみ
+        files = set((output_dir / IMAGES_DIR).iterdir())
+        assert len(files) == 6
+        assert len(files & first_files) == 3
+
+    def test_content_hashes_are_saved_to_cache(self, wide_images, output_dir, tmp_path, mocker):
+        """内容ハッシュの記録が保存され、次回の出力では再計算しない"""
+        images = [ImageData(filepath=str(p)) for p in wide_images]
+        HTMLGenerator(max_workers=1, cache=RenderCache(tmp_path / "render")).generate(images, output_dir)
+
+        spy = mocker.spy(render_cache, "file_digest")
+        HTMLGenerator(max_workers=1, cache=RenderCache(tmp_path / "render")).generate(images, output_dir)
+
+        assert spy.call_count == 0
+
+    def test_missing_images_are_skipped(self, sample_images, temp_session_dir, output_dir):
+        """存在しない画像はスキップ"""
+        images = [
+            ImageData(filepath=str(sample_images[0])),
+            ImageData(filepath=str(temp_session_dir / "nonexistent.png")),
+        ]
+        text = HTMLGenerator(max_workers=1).generate(images, output_dir).read_text(encoding='utf-8')
+        assert text.count('<section class="step"') == 1
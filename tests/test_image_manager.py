@@ -4,7 +4,7 @@ ImageManagerのテスト
 import pytest
 import json
 from pathlib import Path
-from utils.image_manager import ImageManager, ImageData
+from utils.image_manager import ImageManager, ImageData, order_from_positions
 
 
 class TestImageManager:
@@ -98,6 +98,25 @@ class TestImageManager:
         assert len(manager.images) == initial_count
         assert len(manager.undo_stack) == initial_stack_size
 
+    def test_delete_images_is_one_undo_step(self, temp_session_dir, sample_images):
+        """まとめて削除しても保存・Undoの記録は1回（範囲外・重複は無視）"""
+        manager = ImageManager(temp_session_dir)
+        original_paths = [img.filepath for img in manager.images]
+
+        assert manager.delete_images([2, 0, 0, 99]) == 2
+        assert [img.filepath for img in ImageManager(temp_session_dir).images] == [original_paths[1]]
+        assert manager.images[0].order == 0
+        assert len(manager.undo_stack) == 1
+
+        manager.undo()
+        assert [img.filepath for img in manager.images] == original_paths
+
+    def test_delete_images_nothing_to_delete(self, temp_session_dir, sample_images):
+        """削除対象がない場合は何もしない"""
+        manager = ImageManager(temp_session_dir)
+        assert manager.delete_images([]) == 0
+        assert manager.undo_stack == []
+
     def test_reorder_images(self, temp_session_dir, sample_images):
         """画像順序変更のテスト"""
         manager = ImageManager(temp_session_dir)
@@ -119,6 +138,45 @@ class TestImageManager:
 
         assert len(manager.undo_stack) == 1
 
+    def test_reorder_bulk_move_is_one_undo_step(self, temp_session_dir, sample_images):
+        """一覧での並び替えは何枚動かしても保存・Undoの記録が1回"""
+        manager = ImageManager(temp_session_dir)
+        original_paths = [img.filepath for img in manager.images]
+
+        # 3番目の画像を先頭へ（1番目の前）
+        new_order = order_from_positions([1, 2, 0.5])
+        assert new_order == [2, 0, 1]
+        manager.reorder_images(new_order)
+
+        assert [img.filepath for img in ImageManager(temp_session_dir).images] == [
+            original_paths[2], original_paths[0], original_paths[1]
+        ]
+        assert len(manager.undo_stack) == 1
+        manager.undo()
+        assert [img.filepath for img in manager.images] == original_paths
+
+    def test_order_from_positions_keeps_ties_stable(self):
+        """同じ番号の画像は元の順を保つ"""
+        assert order_from_positions([3, 1, 3, 2]) == [1, 3, 0, 2]
+        assert order_from_positions([]) == []
+
+    @pytest.mark.parametrize("new_order", [[0, 1], [0, 1, 1], [0, 1, 3], [2, 1, 0, 3]])
+    def test_reorder_rejects_non_permutation(self, temp_session_dir, sample_images, new_order):
+        """並べ替えになっていない順序は ValueError（何も変更しない）"""
+        manager = ImageManager(temp_session_dir)
+        original_paths = [img.filepath for img in manager.images]
+
+        with pytest.raises(ValueError):
+            manager.reorder_images(new_order)
+        assert [img.filepath for img in manager.images] == original_paths
+        assert manager.undo_stack == []
+
+    def test_reorder_same_order_is_noop(self, temp_session_dir, sample_images):
+        """順序が変わらない場合は保存もUndoの記録もしない"""
+        manager = ImageManager(temp_session_dir)
+        manager.reorder_images([0, 1, 2])
+        assert manager.undo_stack == []
+
     def test_undo(self, temp_session_dir, sample_images):
         """Undo機能のテスト"""
         manager = ImageManager(temp_session_dir)
@@ -244,3 +302,184 @@ class TestImageManager:
         # Undo2回目: 説明文更新を取り消し
         manager.undo()
         assert manager.images[0].description != state1_desc
+
+
+class TestImageManagerConcurrency:
+    """収録プロセスと編集UIの同時編集テスト"""
+
+    def _new_image(self, session_dir, name, color=(0, 0, 255)):
+        from PIL import Image
+        path = session_dir / name
+        Image.new('RGB', (10, 10), color=color).save(path)
+        return path
+
+    def test_add_image_appends_to_journal(self, temp_session_dir, sample_images):
+        """スナップショット作成後の追加はジャーナルへの追記のみ"""
+        manager = ImageManager(temp_session_dir)
+        manager.save_metadata()
+        snapshot_before = manager.metadata_file.read_bytes()
+
+        manager.add_image(self._new_image(temp_session_dir, "0003_new.png"))
+
+        assert manager.metadata_file.read_bytes() == snapshot_before
+        assert len(manager.journal_file.read_text(encoding='utf-8').splitlines()) == 1
+        assert len(ImageManager(temp_session_dir).images) == 4
+
+    def test_refresh_picks_up_new_captures(self, temp_session_dir, sample_images):
+        """編集側が収録側の追加分を差分で取り込む"""
+        editor = ImageManager(temp_session_dir)
+        editor.save_metadata()
+        recorder = ImageManager(temp_session_dir)
+
+        assert editor.refresh() == []
+        recorder.add_image(self._new_image(temp_session_dir, "0003_new.png"))
+
+        new_images = editor.refresh()
+        assert [Path(img.filepath).name for img in new_images] == ["0003_new.png"]
+        assert len(editor.images) == 4
+        assert editor.images[3].order == 3
+
+    def test_save_does_not_lose_concurrent_captures(self, temp_session_dir, sample_images):
+        """編集の保存が収録側の追加を上書きしない"""
+        editor = ImageManager(temp_session_dir)
+        editor.save_metadata()
+        recorder = ImageManager(temp_session_dir)
+
+        recorder.add_image(self._new_image(temp_session_dir, "0003_new.png"))
+        editor.update_description(0, "Edited while recording")
+        recorder.add_image(self._new_image(temp_session_dir, "0004_new.png"))
+
+        reloaded = ImageManager(temp_session_dir)
+        assert len(reloaded.images) == 5
+        assert reloaded.images[0].description == "Edited while recording"
+
+    def test_undo_keeps_external_captures(self, temp_session_dir, sample_images):
+        """Undoしても他プロセスの追加は取り消されない"""
+        editor = ImageManager(temp_session_dir)
+        editor.save_metadata()
+        recorder = ImageManager(temp_session_dir)
+
+        editor.delete_image(0)
+        recorder.add_image(self._new_image(temp_session_dir, "0003_new.png"))
+        editor.refresh()
+        editor.undo()
+
+        assert len(editor.images) == 4
+        assert len(ImageManager(temp_session_dir).images) == 4
+
+    def test_concurrent_edits_are_merged_per_image(self, temp_session_dir, sample_images):
+        """他の編集UIが保存した説明文・削除・並び替えを、古い状態からの編集で上書きしない"""
+        first = ImageManager(temp_session_dir)
+        first.save_metadata()
+        second = ImageManager(temp_session_dir)
+        paths = [img.filepath for img in first.images]
+
+        first.update_description(0, "From first")
+        first.delete_image(2)
+        first.reorder_images([1, 0])
+        # second は first の編集を読み込んでいない（画像3枚・元の順のまま）
+        second.update_description(1, "From second")
+
+        images = ImageManager(temp_session_dir).images
+        assert [img.filepath for img in images] == [paths[1], paths[0]]
+        assert [img.description for img in images] == ["From second", "From first"]
+        assert [img.order for img in images] == [0, 1]
+        assert second.images == images
+
+    def test_stale_delete_targets_the_same_image(self, temp_session_dir, sample_images):
+        """並び替え後の古いインデックスでの削除も、そのとき表示していた画像を削除する"""
+        first = ImageManager(temp_session_dir)
+        first.save_metadata()
+        second = ImageManager(temp_session_dir)
+        paths = [img.filepath for img in first.images]
+
+        first.reorder_images([2, 1, 0])
+        second.delete_image(0)
+
+        assert [img.filepath for img in ImageManager(temp_session_dir).images] == [paths[2], paths[1]]
+
+    def test_foreign_change_discards_undo_history(self, temp_session_dir, sample_images):
+        """他の編集UIの保存を読み込んだらUndoの履歴を破棄する（他の編集を戻さない）"""
+        first = ImageManager(temp_session_dir)
+        first.update_description(0, "Mine")
+        second = ImageManager(temp_session_dir)
+        second.delete_image(1)
+
+        first.refresh()
+
+        assert first.undo_stack == []
+        assert first.undo() is False
+        assert len(ImageManager(temp_session_dir).images) == 2
+
+    def test_managers_in_one_process_share_the_lock(self, temp_session_dir, sample_images):
+        """同じプロセス内の ImageManager は同じセッションのロックを共有する"""
+        first = ImageManager(temp_session_dir)
+        second = ImageManager(temp_session_dir)
+        assert first.lock is second.lock
+
+        with first.lock:
+            second.update_description(0, "Inside first's lock")
+
+        assert ImageManager(temp_session_dir).images[0].description == "Inside first's lock"
+
+    def test_incomplete_journal_line_is_ignored(self, temp_session_dir, sample_images):
+        """クラッシュで途中まで書かれた行は無視される"""
+        manager = ImageManager(temp_session_dir)
+        manager.save_metadata()
+        with open(manager.journal_file, 'wb') as f:
+            f.write(b'{"filepath": "broken')
+
+        assert len(ImageManager(temp_session_dir).images) == 3
+
+
+class TestFileLock:
+    """FileLockのテスト"""
+
+    def test_lock_is_exclusive(self, temp_session_dir):
+        """別インスタンスからはロックを取得できない"""
+        from utils.file_lock import FileLock
+        lock_path = temp_session_dir / "test.lock"
+        other = FileLock(lock_path, timeout=0.1)
+
+        with FileLock(lock_path):
+            with pytest.raises(TimeoutError):
+                other.acquire()
+
+        with other:
+            pass
+
+    def test_lock_is_reentrant(self, temp_session_dir):
+        """同一インスタンスは再入できる"""
+        from utils.file_lock import FileLock
+        lock = FileLock(temp_session_dir / "test.lock", timeout=0.1)
+        with lock:
+            with lock:
+                pass
+            assert lock._depth == 1
+        assert lock._depth == 0
+
+
+class TestImageManagerRecording:
+    """収録プロセス用の設定テスト"""
+
+    def test_add_image_without_undo(self, temp_session_dir, sample_images):
+        """Undo無効のマネージャーは状態を保存しない"""
+        manager = ImageManager(temp_session_dir, enable_undo=False)
+        manager.add_image(sample_images[0])
+        manager.update_description(0, "No history")
+
+        assert len(manager.undo_stack) == 0
+        assert manager.undo() is False
+
+    def test_add_image_records_click(self, temp_session_dir, sample_images):
+        """クリック位置がメタデータに保存される"""
+        session_dir = temp_session_dir / "session"
+        session_dir.mkdir()
+        manager = ImageManager(session_dir, enable_undo=False)
+        manager.add_image(sample_images[0], click=(12, 34))
+        manager.add_image(sample_images[1])
+        manager.save_metadata()
+
+        images = ImageManager(session_dir).get_images()
+        assert (images[0].click_x, images[0].click_y) == (12, 34)
+        assert images[1].click_x is None
@@ -0,0 +1,206 @@
+"""
+画像前処理のテスト
+"""
+import io
+import pytest
+from pathlib import Path
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Inches
+from utils.image_manager import ImageData
+from exporter.image_processor import (
+    CropSettings,
+    ImageSettings,
+    ImageTask,
+    build_tasks,
+    focus_box,
+    process_image,
+    process_images,
+    click_change_region,
+    with_click_options,
+)
+from exporter.pptx_generator import PPTXGenerator
+
+
+@pytest.fixture
+def large_image(temp_session_dir):
+    """表示サイズより大きい画像（3840x2160）"""
+    path = temp_session_dir / "0000_large.png"
+    Image.new('RGB', (3840, 2160), color=(10, 20, 30)).save(path)
+    return path
+
+
+class TestImageProcessor:
+    """画像前処理のテスト"""
+
+    def test_max_height_from_box(self):
+        """表示枠の高さとDPIからピクセル数を計算"""
+        assert ImageSettings(dpi=100).max_height_px(Inches(4.5)) == 450
+
+    def test_downscales_to_target_height(self, large_image, temp_session_dir):
+        """表示サイズまで縮小し、縦横比を保つ"""
+        task = ImageTask(str(large_image), str(temp_session_dir / "out.png"), 540, ImageSettings())
+        result = process_image(task)
+
+        with Image.open(result) as img:
+            assert img.size == (960, 540)
+
+    def test_keeps_small_image_untouched(self, sample_images, temp_session_dir):
+        """縮小も形式変換も不要なら元画像を使う"""
+        task = ImageTask(str(sample_images[0]), str(temp_session_dir / "out.png"), 540, ImageSettings())
+        assert process_image(task) == str(sample_images[0])
+
+    def test_reencodes_to_jpeg(self, sample_images, temp_session_dir):
+        """形式変換の指定があれば縮小不要でも再エンコード"""
+        settings = ImageSettings(format="jpeg", quality=70)
+        task = ImageTask(str(sample_images[0]), str(temp_session_dir / "out.jpg"), 540, settings)
+
+        with Image.open(process_image(task)) as img:
+            assert img.format == "JPEG"
+
+    def test_parallel_results_keep_order(self, temp_session_dir):
+        """並列処理でも入力順に結果を返す"""
+        paths = []
+        for i in range(6):
+            path = temp_session_dir / f"{i:04d}.png"
+            Image.new('RGB', (400 + i * 10, 400), color=(i, 0, 0)).save(path)
+            paths.append(path)
+        tasks = build_tasks(paths, temp_session_dir, Inches(2), ImageSettings(dpi=100))
+
+        results = process_images(tasks, max_workers=2)
+
+        for i, result in enumerate(results):
+            with Image.open(result) as img:
+                assert img.size == (round((400 + i * 10) / 2), 200)
+
+    def test_parallel_progress_and_abort(self, temp_session_dir):
+        """並列処理でも1枚ごとに進捗を通知し、通知関数の例外で中断する"""
+        paths = []
+        for i in range(6):
+            path = temp_session_dir / f"{i:04d}.png"
+            Image.new('RGB', (400, 400), color=(i, 0, 0)).save(path)
+            paths.append(path)
+        tasks = build_tasks(paths, temp_session_dir, Inches(2), ImageSettings(dpi=100))
+
+        progress = []
+        process_images(tasks, max_workers=2, progress_callback=lambda done, total: progress.append((done, total)))
+        assert progress == [(i, 6) for i in range(1, 7)]
+
+        def abort(done, total):
+            raise RuntimeError("abort")
+
+        with pytest.raises(RuntimeError):
+            process_images(tasks, max_workers=2, progress_callback=abort)
+
+
+class TestPPTXGeneratorImageStage:
+    """PPTXGeneratorの画像縮小ステージのテスト"""
+
+    def test_embeds_downscaled_image(self, large_image, temp_session_dir):
+        """埋め込み画像が表示サイズに縮小されている"""
+        generator = PPTXGenerator(ImageSettings(dpi=100), max_workers=1)
+        output_path = temp_session_dir / "downscaled.pptx"
+
+        generator.generate([ImageData(filepath=str(large_image))], output_path)
+
+        picture = Presentation(str(output_path)).slides[1].shapes[0]
+        with Image.open(io.BytesIO(picture.image.blob)) as img:
+            assert img.height == 450
+        # 表示サイズ（レイアウト）は変わらない
+        assert picture.height == Inches(4.5)
+
+    def test_rejects_unsupported_format(self):
+        """PowerPointに埋め込めない形式はエラー"""
+        with pytest.raises(ValueError):
+            PPTXGenerator(ImageSettings(format="webp"))
+
+
+@pytest.fixture
+def click_steps(temp_session_dir):
+    """2手順分の画像（2枚目で右下のボタン周辺が変化）"""
+    first = temp_session_dir / "0000_step.png"
+    second = temp_session_dir / "0001_step.png"
+    Image.new('RGB', (1600, 900), color=(255, 255, 255)).save(first)
+    img = Image.new('RGB', (1600, 900), color=(255, 255, 255))
+    img.paste((0, 0, 0), (1000, 500, 1500, 800))  # 変化した領域
+    img.save(second)
+    return first, second
+
+
+class TestFocusCrop:
+    """クリック位置への切り抜きのテスト"""
+
+    def _task(self, src, dest, click, previous=None, crop=None):
+        return ImageTask(
+            src=str(src),
+            dest=str(dest),
+            max_height=10000,
+            settings=ImageSettings(),
+            crop=crop or CropSettings(ratio=0.25, expand_to_changes=True),
+            click=click,
+            previous=str(previous) if previous else None
+        )
+
+    def test_box_centers_on_click_with_original_aspect(self, click_steps):
+        """クリック位置を中心に、元画像と同じ縦横比で切り抜く"""
+        first, _ = click_steps
+        with Image.open(first) as img:
+            box = focus_box(self._task(first, first, (800, 450)), img)
+        assert box == (600, 338, 1000, 562)
+
+    def test_box_is_clamped_to_image(self, click_steps):
+        """画像の端のクリックでははみ出さないようずらす"""
+        first, _ = click_steps
+        with Image.open(first) as img:
+            left, top, right, bottom = focus_box(self._task(first, first, (0, 0)), img)
+        assert (left, top) == (0, 0)
+        assert (right, bottom) == (400, 225)
+
+    def test_box_expands_to_changed_area(self, click_steps):
+        """クリック位置を含む変化領域全体が収まるよう広げる"""
+        first, second = click_steps
+        task = self._task(second, second, (1200, 600), previous=first)
+        with Image.open(second) as img:
+            left, top, right, bottom = focus_box(task, img, click_change_region(task, img))
+        assert left <= 1000 and top <= 500 and right >= 1500 and bottom >= 800
+        assert (right - left) / (bottom - top) == pytest.approx(1600 / 900, rel=0.01)
+
+    def test_unrelated_change_is_ignored(self, click_steps):
+        """クリック位置を含まない変化領域では広げない"""
+        first, second = click_steps
+        task = self._task(second, second, (200, 200), previous=first)
+        with Image.open(second) as img:
+            assert click_change_region(task, img) is None
+            box = focus_box(task, img)
+        assert box == (0, 88, 400, 312)
+
+    def test_process_image_crops(self, click_steps, temp_session_dir):
+        """切り抜き設定があれば縮小不要でも切り抜いた画像を出力する"""
+        first, _ = click_steps
+        dest = temp_session_dir / "cropped.png"
+        result = process_image(self._task(first, dest, (800, 450)))
+        assert result == str(dest)
+        with Image.open(result) as img:
+            assert img.size == (400, 224)
+
+    def test_generator_crops_only_clicked_images(self, click_steps, temp_session_dir):
+        """クリック位置のある画像だけを切り抜いてスライドに配置する"""
+        first, second = click_steps
+        images = [
+            ImageData(filepath=str(first)),
+            ImageData(filepath=str(second), click_x=1200, click_y=600),
+        ]
+        tasks = with_click_options(
+            build_tasks([img.filepath for img in images], temp_session_dir, Inches(4.5), ImageSettings()),
+            images,
+            crop=CropSettings()
+        )
+        assert tasks[0].crop is None
+        assert tasks[1].click == (1200, 600) and tasks[1].previous == str(first)
+
+        output = PPTXGenerator(max_workers=1, crop=CropSettings()).generate(images, temp_session_dir / "crop.pptx")
+        prs = Presentation(str(output))
+        pictures = [shape for slide in list(prs.slides)[1:] for shape in slide.shapes if shape.shape_type == 13]
+        assert pictures[0].image.size == (1200, 675)  # 全体を縮小
+        assert pictures[1].image.size == (800, 450)   # クリック周辺を切り抜き（拡大はしない）
+        assert pictures[0].width == pictures[1].width  # 縦横比が同じためスライド上の大きさは同じ
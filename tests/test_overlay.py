@@ -0,0 +1,92 @@
+"""
+クリック位置のオーバーレイのテスト
+"""
+import pytest
+from PIL import Image
+from pptx.util import Inches
+from utils.image_manager import ImageData
+from exporter.overlay import OverlaySettings, draw_overlay
+from exporter.image_processor import ImageSettings, build_tasks, process_image, with_click_options
+from exporter.render_cache import RenderCache
+
+
+WHITE = (255, 255, 255)
+
+
+@pytest.fixture
+def clicked_steps(temp_session_dir):
+    """クリック位置を記録した2手順分の画像（2枚目で中央付近が変化）"""
+    first = temp_session_dir / "0000_step.png"
+    second = temp_session_dir / "0001_step.png"
+    Image.new('RGB', (800, 600), color=WHITE).save(first)
+    img = Image.new('RGB', (800, 600), color=WHITE)
+    img.paste((0, 0, 255), (300, 200, 500, 400))
+    img.save(second)
+    return [
+        ImageData(filepath=str(first), click_x=100, click_y=100),
+        ImageData(filepath=str(second), click_x=400, click_y=300),
+    ]
+
+
+class TestDrawOverlay:
+    """draw_overlay のテスト"""
+
+    def test_marker_is_drawn_at_click(self):
+        """クリック位置にマーカーを描画し、元画像は変更しない"""
+        original = Image.new('RGB', (200, 200), color=WHITE)
+        result = draw_overlay(original, (100, 100), OverlaySettings(highlight_changes=False))
+
+        assert original.getpixel((100, 100)) == WHITE
+        assert result.getpixel((100, 100)) != WHITE  # 半透明の塗り
+        assert result.getpixel((10, 10)) == WHITE
+
+    def test_highlight_box_around_changes(self):
+        """変化領域の外側に枠を描画する"""
+        settings = OverlaySettings(line_width=4)
+        result = draw_overlay(Image.new('RGB', (200, 200), color=WHITE), (100, 100), settings, (50, 50, 150, 150))
+
+        assert result.getpixel((46, 100)) == settings.color
+        assert result.getpixel((60, 100)) == WHITE
+
+
+class TestOverlayExport:
+    """出力時のオーバーレイ描画のテスト"""
+
+    def test_originals_are_untouched(self, clicked_steps, temp_session_dir):
+        """元画像は変更せず、出力用の画像にだけ描画する"""
+        src = clicked_steps[1].filepath
+        before = open(src, 'rb').read()
+        tasks = with_click_options(
+            build_tasks([img.filepath for img in clicked_steps], temp_session_dir / "out", Inches(4.5), ImageSettings()),
+            clicked_steps,
+            overlay=OverlaySettings()
+        )
+        (temp_session_dir / "out").mkdir()
+
+        result = process_image(tasks[1])
+
+        assert result != src
+        assert open(src, 'rb').read() == before
+        with Image.open(result) as img:
+            assert img.getpixel((400, 300)) != (0, 0, 255)
+
+    def test_cached_by_overlay_params(self, clicked_steps, temp_session_dir, tmp_path):
+        """内容ハッシュ + 描画設定ごとにキャッシュされ、再出力では処理しない"""
+        cache = RenderCache(tmp_path / "render")
+
+        def prepare(overlay):
+            tasks = with_click_options(
+                build_tasks([img.filepath for img in clicked_steps], temp_session_dir, Inches(4.5), ImageSettings()),
+                clicked_steps,
+                overlay=overlay
+            )
+            return cache.prepare(tasks, max_workers=1)
+
+        plain = prepare(None)
+        marked = prepare(OverlaySettings())
+        assert set(plain).isdisjoint(marked)
+        misses = cache.misses
+
+        assert prepare(OverlaySettings()) == marked
+        assert cache.misses == misses
+        assert prepare(OverlaySettings(color=(0, 128, 0))) != marked
@@ -0,0 +1,119 @@
+"""
+PDFGeneratorのテスト
+"""
+import re
+import zlib
+import threading
+import pytest
+from PIL import Image
+from utils.image_manager import ImageData
+from exporter.pptx_generator import ExportCancelled, STAGE_SLIDES
+from exporter.pdf_generator import PDFGenerator, wrap_text, text_width
+
+
+def _objects(data: bytes) -> dict:
+    """相互参照表からオブジェクト番号 → 本体を取得（オフセットの正しさも確認）"""
+    xref_offset = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", data).group(1))
+    assert data[xref_offset:].startswith(b"xref\n")
+    count = int(re.match(rb"xref\n0 (\d+)\n", data[xref_offset:]).group(1))
+    entries = re.findall(rb"(\d{10}) 00000 n \n", data[xref_offset:])
+    assert len(entries) == count - 1
+
+    objects = {}
+    for number, offset in enumerate(entries, 1):
+        start = int(offset)
+        assert data[start:].startswith(f"{number} 0 obj\n".encode())
+        objects[number] = data[start:data.index(b"\nendobj\n", start)]
+    return objects
+
+
+def _page_texts(data: bytes) -> list:
+    """ページごとの描画テキスト（UCS-2の16進文字列を復号）"""
+    texts = []
+    for body in _objects(data).values():
+        if b"/Filter /FlateDecode" in body:
+            stream = body[body.index(b"stream\n") + 7:body.rindex(b"\nendstream")]
+            content = zlib.decompress(stream).decode('ascii')
+            texts.append([bytes.fromhex(h).decode('utf-16-be') for h in re.findall(r"<([0-9A-F]*)> Tj", content)])
+    return texts
+
+
+class TestPDFGenerator:
+    """PDFGeneratorクラスのテスト"""
+
+    def test_generates_valid_structure(self, temp_session_dir, sample_image_data):
+        """タイトルページ + 画像ページのPDFを生成し、相互参照表が正しい"""
+        output = PDFGenerator(max_workers=1).generate(sample_image_data, temp_session_dir / "out.pdf")
+
+        data = output.read_bytes()
+        assert data.startswith(b"%PDF-1.4")
+        objects = _objects(data)
+        pages = [body for body in objects.values() if b"/Type /Page " in body]
+        assert len(pages) == 4
+        assert all(b"/MediaBox [0 0 720 540]" in page for page in pages)
+        assert b"/Count 4" in objects[2]
+
+    def test_japanese_text(self, temp_session_dir, sample_images):
+        """タイトルと説明文（日本語・複数行）を描画する"""
+        images = [ImageData(filepath=str(sample_images[0]), description="ログイン画面\nIDを入力 (必須)")]
+        output = PDFGenerator(max_workers=1).generate(images, temp_session_dir / "out.pdf", title="操作マニュアル")
+
+        assert _page_texts(output.read_bytes()) == [["操作マニュアル"], ["ログイン画面", "IDを入力 (必須)"]]
+
+    def test_images_are_downscaled_jpeg(self, temp_session_dir):
+        """画像は表示サイズまで縮小したJPEGとして埋め込む"""
+        path = temp_session_dir / "0001_large.png"
+        Image.new('RGB', (2000, 1500)).save(path)
+        output = PDFGenerator(max_workers=1).generate([ImageData(filepath=str(path))], temp_session_dir / "out.pdf")
+
+        images = [body for body in _objects(output.read_bytes()).values() if b"/Subtype /Image" in body]
+        assert len(images) == 1
+        assert b"/Filter /DCTDecode" in images[0]
+        # 高さ4.5インチ × 150dpi
+        assert b"/Width 900 /Height 675" in images[0]
+
+    def test_empty_document(self, temp_session_dir):
+        """画像もタイトルもなければページのないPDF"""
+        output = PDFGenerator().generate([], temp_session_dir / "empty.pdf")
+        assert b"/Count 0" in _objects(output.read_bytes())[2]
+
+    def test_missing_images_are_skipped(self, temp_session_dir, sample_image_data):
+        """存在しない画像はスキップ"""
+        images = sample_image_data + [ImageData(filepath=str(temp_session_dir / "nonexistent.png"))]
+        output = PDFGenerator(max_workers=1).generate(images, temp_session_dir / "out.pdf")
+        assert b"/Count 4" in _objects(output.read_bytes())[2]
+
+    def test_cancel_leaves_no_output(self, temp_session_dir, sample_image_data):
+        """キャンセル時は出力ファイルを残さない"""
+        cancel_event = threading.Event()
+        output_path = temp_session_dir / "cancelled.pdf"
+
+        def on_progress(stage, done, total):
+            if stage == STAGE_SLIDES and done == 1:
+                cancel_event.set()
+
+        with pytest.raises(ExportCancelled):
+            PDFGenerator(max_workers=1).generate(
+                sample_image_data, output_path, progress_callback=on_progress, cancel_event=cancel_event
+            )
+        assert not output_path.exists()
+
+
+class TestWrapText:
+    """折り返しのテスト"""
+
+    def test_half_width_characters(self):
+        """半角文字は全角の半分の幅"""
+        assert text_width("ab", 10) == text_width("あ", 10) == 10
+
+    def test_wraps_japanese_by_character(self):
+        """日本語は文字単位で折り返す"""
+        assert wrap_text("あいうえお", 30, 10) == ["あいう", "えお"]
+
+    def test_wraps_english_at_space(self):
+        """英単語は空白で折り返す"""
+        assert wrap_text("hello world", 40, 10) == ["hello", "world"]
+
+    def test_keeps_newlines(self):
+        """改行は段落として保持"""
+        assert wrap_text("a\n\nb", 100, 10) == ["a", "", "b"]
@@ -1,11 +1,17 @@
 """
 PPTXGeneratorのテスト（TDD: Red phase）
 """
+import os
+import threading
 import pytest
 from pathlib import Path
 from pptx import Presentation
+from pptx.util import Inches
 from utils.image_manager import ImageData
-from exporter.pptx_generator import PPTXGenerator
+from exporter import pptx_generator
+from exporter.pptx_generator import (
+    PPTXGenerator, ExportCancelled, STAGE_IMAGES, STAGE_SLIDES, SLIDE_LAYOUT_BLANK, resolve_layouts
+)
 
 
 class TestPPTXGenerator:
@@ -204,3 +210,123 @@ class TestPPTXGenerator:
         except FileNotFoundError:
             # または、FileNotFoundErrorを投げる想定
             pass
+
+
+class TestPPTXGeneratorProgress:
+    """進捗通知とキャンセルのテスト"""
+
+    @pytest.mark.parametrize("streaming", [False, True])
+    def test_progress_reports_each_stage(self, temp_session_dir, sample_image_data, streaming):
+        """画像準備とスライド作成の進捗が1枚ごとに通知される"""
+        events = []
+        PPTXGenerator(max_workers=1, streaming=streaming).generate(
+            sample_image_data,
+            temp_session_dir / "progress.pptx",
+            progress_callback=lambda stage, done, total: events.append((stage, done, total))
+        )
+
+        assert [e for e in events if e[0] == STAGE_IMAGES] == [(STAGE_IMAGES, i, 3) for i in (1, 2, 3)]
+        assert [e for e in events if e[0] == STAGE_SLIDES] == [(STAGE_SLIDES, i, 3) for i in (0, 1, 2, 3)]
+
+    @pytest.mark.parametrize("streaming", [False, True])
+    def test_cancel_leaves_no_output(self, temp_session_dir, sample_image_data, streaming):
+        """キャンセル時は ExportCancelled を送出し、出力ファイルを作らない"""
+        cancel_event = threading.Event()
+        output_path = temp_session_dir / "cancelled.pptx"
+
+        def on_progress(stage, done, total):
+            if stage == STAGE_SLIDES and done == 1:
+                cancel_event.set()
+
+        with pytest.raises(ExportCancelled):
+            PPTXGenerator(max_workers=1, streaming=streaming).generate(
+                sample_image_data, output_path, progress_callback=on_progress, cancel_event=cancel_event
+            )
+        assert not output_path.exists()
+
+
+class TestPPTXGeneratorTemplate:
+    """テンプレートからの出力のテスト"""
+
+    @pytest.fixture
+    def template_path(self, tmp_path):
+        """サンプルスライド2枚を含み、白紙レイアウトが既定の位置にないワイド画面のテンプレート"""
+        prs = Presentation()
+        prs.slide_width = Inches(13.333)
+        for _ in range(2):
+            prs.slides.add_slide(prs.slide_layouts[1])
+
+        master = prs.slide_masters[0]
+        layout_id_lst = master._element.get_or_add_sldLayoutIdLst()
+        layout_id = layout_id_lst[2]
+        layout_id_lst.remove(layout_id)
+        master.part.drop_rel(layout_id.rId)
+
+        path = tmp_path / "template.pptx"
+        prs.save(str(path))
+        return path
+
+    @pytest.fixture
+    def open_calls(self, monkeypatch):
+        """テンプレートの解析回数を記録（プロセス内キャッシュは空にする）"""
+        calls = []
+        original = pptx_generator.Package.open
+
+        def spy(path):
+            calls.append(path)
+            return original(path)
+
+        monkeypatch.setattr(pptx_generator, "_template_cache", {})
+        monkeypatch.setattr(pptx_generator.Package, "open", spy)
+        return calls
+
+    @pytest.mark.parametrize("streaming", [False, True])
+    def test_template_slides_are_replaced(self, temp_session_dir, sample_image_data, template_path, streaming):
+        """テンプレートのスライドは含めず、スライドサイズとマスターを引き継ぐ"""
+        output_path = temp_session_dir / "template.pptx"
+        PPTXGenerator(max_workers=1, streaming=streaming, template_path=template_path).generate(
+            sample_image_data, output_path, title="テンプレート"
+        )
+
+        prs = Presentation(str(output_path))
+        assert prs.slide_width == Inches(13.333)
+        assert len(prs.slides) == 1 + len(sample_image_data)
+        assert prs.slides[0].shapes.title.text == "テンプレート"
+        for slide in list(prs.slides)[1:]:
+            assert len(slide.placeholders) == 0
+            assert len([shape for shape in slide.shapes if shape.shape_type == 13]) == 1
+
+    def test_template_parsed_once(self, temp_session_dir, sample_image_data, template_path, open_calls):
+        """テンプレートはファイルが変わるまで再解析しない"""
+        generator = PPTXGenerator(max_workers=1, template_path=template_path)
+        for i in range(3):
+            generator.generate(sample_image_data[:1], temp_session_dir / f"deck_{i}.pptx")
+        assert len(open_calls) == 1
+
+        stat = template_path.stat()
+        os.utime(template_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        generator.generate(sample_image_data[:1], temp_session_dir / "deck_changed.pptx")
+        assert len(open_calls) == 2
+
+    def test_exports_do_not_share_slides(self, temp_session_dir, sample_image_data, template_path):
+        """複製したプレゼンテーションへの変更は次の出力に残らない"""
+        generator = PPTXGenerator(max_workers=1, template_path=template_path)
+        first = generator.generate(sample_image_data, temp_session_dir / "first.pptx")
+        second = generator.generate(sample_image_data[:1], temp_session_dir / "second.pptx")
+
+        assert len(Presentation(str(first)).slides) == 1 + len(sample_image_data)
+        assert len(Presentation(str(second)).slides) == 2
+
+    def test_resolve_layouts_falls_back(self, template_path):
+        """既定の位置のレイアウトにプレースホルダーがある場合はプレースホルダーの最も少ないレイアウトを使う"""
+        prs = pptx_generator.load_template(template_path)
+        title_layout, blank_layout = resolve_layouts(prs)
+
+        assert title_layout == prs.slide_layouts[0]
+        assert blank_layout.name == "Blank"
+        assert blank_layout != prs.slide_layouts[SLIDE_LAYOUT_BLANK]
+
+    def test_resolve_layouts_default_template(self):
+        """既定のテンプレートでは既定のインデックスを使う"""
+        prs = pptx_generator.load_template()
+        assert resolve_layouts(prs) == (prs.slide_layouts[0], prs.slide_layouts[SLIDE_LAYOUT_BLANK])
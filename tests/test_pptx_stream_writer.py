@@ -0,0 +1,73 @@
+"""
+ストリーミングPPTX書き出しのテスト
+"""
+import zipfile
+import pytest
+from pptx import Presentation
+from utils.image_manager import ImageData
+from exporter.pptx_generator import PPTXGenerator
+
+
+def _shapes(path):
+    """スライドごとの図形の種類・位置・テキスト"""
+    return [
+        [
+            (shape.shape_type, shape.left, shape.top, shape.width, shape.height,
+             shape.text_frame.text if shape.has_text_frame else None)
+            for shape in slide.shapes
+        ]
+        for slide in Presentation(str(path)).slides
+    ]
+
+
+class TestStreamingExport:
+    """PPTXGenerator(streaming=True) のテスト"""
+
+    def test_matches_regular_layout(self, temp_session_dir, sample_images):
+        """通常モードと同じスライド構成・レイアウトになる"""
+        images = [
+            ImageData(filepath=str(sample_images[0]), description="1行目\n2行目 & <記号>"),
+            ImageData(filepath=str(sample_images[1])),
+            ImageData(filepath=str(sample_images[2]), description="最後"),
+        ]
+        regular = PPTXGenerator(max_workers=1).generate(images, temp_session_dir / "regular.pptx", title="T")
+        streamed = PPTXGenerator(max_workers=1, streaming=True).generate(
+            images, temp_session_dir / "streamed.pptx", title="T"
+        )
+
+        assert _shapes(streamed) == _shapes(regular)
+
+    def test_package_structure(self, temp_session_dir, sample_image_data):
+        """Content-Typesが先頭にあり、画像は無圧縮で格納される"""
+        output = PPTXGenerator(max_workers=1, streaming=True).generate(
+            sample_image_data, temp_session_dir / "streamed.pptx"
+        )
+
+        with zipfile.ZipFile(output) as package:
+            infos = package.infolist()
+            assert infos[0].filename == "[Content_Types].xml"
+            media = [info for info in infos if info.filename.startswith("ppt/media/")]
+            assert len(media) == 3
+            assert all(info.compress_type == zipfile.ZIP_STORED for info in media)
+            assert package.testzip() is None
+
+    def test_empty_presentation(self, temp_session_dir):
+        """画像がなくても有効なファイルになる"""
+        output = PPTXGenerator(streaming=True).generate([], temp_session_dir / "empty.pptx")
+        assert len(Presentation(str(output)).slides) == 0
+
+    def test_missing_images_are_skipped(self, temp_session_dir, sample_image_data):
+        """存在しない画像は通常モードと同様にスキップ"""
+        images = sample_image_data + [ImageData(filepath=str(temp_session_dir / "nonexistent.png"))]
+        output = PPTXGenerator(max_workers=1, streaming=True).generate(images, temp_session_dir / "out.pptx")
+        assert len(Presentation(str(output)).slides) == 4
+
+    def test_failed_export_removes_partial_file(self, temp_session_dir, sample_image_data, mocker):
+        """書き出し途中のエラーでは不完全なファイルを残さない"""
+        from exporter.pptx_stream_writer import StreamingPPTXWriter
+        mocker.patch.object(StreamingPPTXWriter, "_slide_xml", side_effect=RuntimeError("boom"))
+        output = temp_session_dir / "broken.pptx"
+
+        with pytest.raises(RuntimeError):
+            PPTXGenerator(max_workers=1, streaming=True).generate(sample_image_data, output)
+        assert not output.exists()
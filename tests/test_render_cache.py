@@ -0,0 +1,126 @@
+"""
+レンダーキャッシュのテスト
+"""
+import os
+import pytest
+from PIL import Image
+from utils.image_manager import ImageData
+from exporter.image_processor import ImageSettings, build_tasks, with_click_options
+from exporter.overlay import OverlaySettings
+from exporter.render_cache import RenderCache
+from exporter.pptx_generator import PPTXGenerator, IMAGE_HEIGHT
+
+
+@pytest.fixture
+def render_cache(tmp_path):
+    """一時ディレクトリ上のRenderCache"""
+    return RenderCache(tmp_path / "render")
+
+
+@pytest.fixture
+def large_images(temp_session_dir):
+    """縮小が必要な画像3枚"""
+    paths = []
+    for i in range(3):
+        path = temp_session_dir / f"{i:04d}_large.png"
+        Image.new('RGB', (2000, 1500), color=(i * 60, 0, 0)).save(path)
+        paths.append(path)
+    return paths
+
+
+class TestRenderCache:
+    """RenderCacheクラスのテスト"""
+
+    def test_second_prepare_hits_cache(self, render_cache, large_images, tmp_path):
+        """2回目は処理せずキャッシュを再利用"""
+        settings = ImageSettings(dpi=100)
+        tasks = build_tasks(large_images, tmp_path, IMAGE_HEIGHT, settings)
+
+        first = render_cache.prepare(tasks, max_workers=1)
+        assert render_cache.misses == 3
+        second = render_cache.prepare(tasks, max_workers=1)
+
+        assert second == first
+        assert render_cache.hits == 3
+
+    def test_changed_settings_miss(self, render_cache, large_images, tmp_path):
+        """設定が変われば別のキャッシュになる"""
+        render_cache.prepare(build_tasks(large_images, tmp_path, IMAGE_HEIGHT, ImageSettings(dpi=100)), 1)
+        render_cache.prepare(build_tasks(large_images, tmp_path, IMAGE_HEIGHT, ImageSettings(dpi=50)), 1)
+        assert render_cache.misses == 6
+
+    def test_changed_content_misses(self, render_cache, large_images, tmp_path):
+        """画像の内容が変わったスライドだけ再処理"""
+        tasks = build_tasks(large_images, tmp_path, IMAGE_HEIGHT, ImageSettings(dpi=100))
+        render_cache.prepare(tasks, 1)
+
+        Image.new('RGB', (2000, 1500), color=(0, 0, 255)).save(large_images[1])
+        os.utime(large_images[1], ns=(1, 1))
+        render_cache.prepare(tasks, 1)
+
+        assert render_cache.misses == 4
+        assert render_cache.hits == 2
+
+    def test_identical_content_shares_entry(self, render_cache, large_images, temp_session_dir, tmp_path):
+        """別パスでも同じ内容ならキャッシュを共有"""
+        copy_path = temp_session_dir / "copy.png"
+        copy_path.write_bytes(large_images[0].read_bytes())
+        tasks = build_tasks([large_images[0], copy_path], tmp_path, IMAGE_HEIGHT, ImageSettings(dpi=100))
+
+        first, second = render_cache.prepare(tasks, 1)
+        assert first == second
+
+    def test_previous_image_is_keyed_by_content(self, render_cache, large_images, temp_session_dir, tmp_path):
+        """変化領域の比較に使う前の手順の画像は、パスではなく内容で識別する"""
+        renamed = temp_session_dir / "renamed.png"
+        renamed.write_bytes(large_images[0].read_bytes())
+        overlay = OverlaySettings(highlight_changes=True)
+
+        def _tasks(previous):
+            images = [ImageData(filepath=str(previous)), ImageData(filepath=str(large_images[1]), click_x=10, click_y=10)]
+            tasks = build_tasks([previous, large_images[1]], tmp_path, IMAGE_HEIGHT, ImageSettings(dpi=100))
+            return with_click_options(tasks, images, overlay=overlay)[1:]
+
+        first = render_cache.prepare(_tasks(large_images[0]), 1)
+        # 前の手順の画像の名前変更・並び替えでは再処理しない
+        assert render_cache.prepare(_tasks(renamed), 1) == first
+        assert (render_cache.misses, render_cache.hits) == (1, 1)
+
+        # 同じパスのまま内容が差し替えられたら再処理する
+        Image.new('RGB', (2000, 1500), color=(0, 255, 0)).save(renamed)
+        os.utime(renamed, ns=(1, 1))
+        assert render_cache.prepare(_tasks(renamed), 1) != first
+        assert render_cache.misses == 2
+
+    def test_passthrough_images_hit_cache(self, render_cache, sample_images, tmp_path, mocker):
+        """処理不要だった画像も2回目はキャッシュヒットになり、画像を開き直さない"""
+        tasks = build_tasks(sample_images, tmp_path, IMAGE_HEIGHT, ImageSettings(dpi=100, format="png"))
+        first = render_cache.prepare(tasks, 1)
+        assert first == [str(path) for path in sample_images]
+
+        spy = mocker.spy(Image, "open")
+        assert render_cache.prepare(tasks, 1) == first
+        assert (render_cache.misses, render_cache.hits) == (3, 3)
+        assert spy.call_count == 0
+
+    def test_prune_keeps_current_images(self, tmp_path, large_images):
+        """上限超過時も出力中の画像は削除しない"""
+        cache = RenderCache(tmp_path / "render", max_bytes=0)
+        results = cache.prepare(build_tasks(large_images, tmp_path, IMAGE_HEIGHT, ImageSettings(dpi=100)), 1)
+        assert all(os.path.exists(path) for path in results)
+
+
+class TestPPTXGeneratorCache:
+    """PPTXGeneratorのキャッシュ利用テスト"""
+
+    def test_description_edit_reuses_images(self, render_cache, large_images, temp_session_dir):
+        """説明文だけの変更では画像を再処理しない"""
+        generator = PPTXGenerator(ImageSettings(dpi=100), max_workers=1, cache=render_cache)
+        images = [ImageData(filepath=str(path), description=f"Step {i}") for i, path in enumerate(large_images)]
+        generator.generate(images, temp_session_dir / "first.pptx")
+
+        images[1].description = "Edited"
+        generator.generate(images, temp_session_dir / "second.pptx")
+
+        assert render_cache.misses == 3
+        assert render_cache.hits == 3
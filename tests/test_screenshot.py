@@ -0,0 +1,47 @@
+"""
+ScreenshotCaptureのテスト
+"""
+import pytest
+from utils.screenshot import ScreenshotCapture, next_capture_counter
+
+
+class TestScreenshotCapture:
+    """ScreenshotCaptureクラスのテスト"""
+
+    def test_counter_starts_at_zero_for_new_session(self, mocker, mock_screenshot, temp_session_dir):
+        """新規セッションは0番から撮影"""
+        mocker.patch("utils.screenshot.mss.mss", return_value=mock_screenshot)
+
+        capture = ScreenshotCapture(temp_session_dir)
+        filepath = capture.capture()
+
+        assert filepath.name.startswith("0000_")
+        assert capture.counter == 1
+
+    def test_counter_resumes_after_existing_captures(self, mocker, mock_screenshot, temp_session_dir):
+        """再開時は既存の最大連番の次から撮影"""
+        mocker.patch("utils.screenshot.mss.mss", return_value=mock_screenshot)
+        for name in ("0000_20240101_120000.png", "0011_20240101_120011.png", "metadata.json"):
+            (temp_session_dir / name).write_bytes(b"")
+
+        capture = ScreenshotCapture(temp_session_dir)
+
+        assert capture.counter == 12
+        assert capture.capture().name.startswith("0012_")
+
+
+def test_next_capture_counter_ignores_other_files(temp_session_dir):
+    """連番形式でないファイルは無視する"""
+    (temp_session_dir / "image_0005.png").write_bytes(b"")
+    (temp_session_dir / "metadata.journal").write_bytes(b"")
+    assert next_capture_counter(temp_session_dir) == 0
+
+
+def test_to_image_position_uses_virtual_screen_origin(mocker, mock_screenshot, temp_session_dir):
+    """画面座標は全モニタの左上を原点とする画像座標に変換される"""
+    mock_screenshot.monitors[0] = {'left': -1920, 'top': -200, 'width': 3840, 'height': 1280}
+    mocker.patch("utils.screenshot.mss.mss", return_value=mock_screenshot)
+
+    capture = ScreenshotCapture(temp_session_dir)
+
+    assert capture.to_image_position(-1900, 0) == (20, 200)
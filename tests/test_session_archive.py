@@ -0,0 +1,181 @@
+"""
+セッションアーカイブのテスト
+"""
+import zipfile
+import pytest
+from pathlib import Path
+from PIL import Image
+from pptx import Presentation
+from utils.image_manager import ImageData, ImageManager, write_image_entries
+from utils.session_archive import (
+    ARCHIVE_METADATA, MemberReader, SessionArchive, export_session, image_source, import_archive,
+    member_path, open_archive, source_exists, source_stamp, split_member_path
+)
+import utils.session_archive as session_archive
+from exporter.pptx_generator import PPTXGenerator
+from exporter.render_cache import RenderCache
+from batch_export import export_session as export_pptx, output_path_for
+
+
+@pytest.fixture
+def session(temp_session_dir, sample_image_data):
+    """説明文つきの画像3枚と、ファイルのない画像1枚を持つセッション"""
+    sample_image_data[1].click_x, sample_image_data[1].click_y = 10, 20
+    missing = ImageData(filepath=str(temp_session_dir / "gone.png"), description="消えた画像")
+    write_image_entries(temp_session_dir / "metadata.json", sample_image_data + [missing])
+    return temp_session_dir
+
+
+@pytest.fixture
+def archive_path(session, tmp_path):
+    """セッションを書き出したアーカイブ"""
+    path = tmp_path / "archives" / "session.zip"
+    export_session(session, path)
+    return path
+
+
+class TestExportSession:
+    """export_session のテスト"""
+
+    def test_images_are_stored_uncompressed(self, session, tmp_path):
+        """画像は無圧縮で格納し、メタデータは最後に置く"""
+        path = tmp_path / "session.zip"
+        assert export_session(session, path) == 3
+
+        with zipfile.ZipFile(path) as zf:
+            infos = zf.infolist()
+        assert [info.filename for info in infos] == ["test_0000.png", "test_0001.png", "test_0002.png", ARCHIVE_METADATA]
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in infos)
+        assert not list(tmp_path.glob("*.tmp"))
+
+    def test_view_matches_file_contents(self, session, archive_path):
+        """索引から求めた位置の内容が元のファイルと一致"""
+        with SessionArchive(archive_path) as archive:
+            for name in ("test_0000.png", "test_0002.png"):
+                with archive.view(name) as data:
+                    assert bytes(data) == (session / name).read_bytes()
+
+    def test_images_keep_metadata(self, archive_path):
+        """説明文・クリック位置を保ち、ファイルのない画像は missing"""
+        with SessionArchive(archive_path) as archive:
+            images = archive.images()
+
+        assert [img.description for img in images] == ["Test image 0", "Test image 1", "Test image 2", "消えた画像"]
+        assert (images[1].click_x, images[1].click_y) == (10, 20)
+        assert images[0].filepath == member_path(archive_path, "test_0000.png")
+        assert [img.missing for img in images] == [False, False, False, True]
+
+
+class TestMemberPath:
+    """アーカイブ内の画像を表すパスのテスト"""
+
+    def test_split(self, tmp_path):
+        path = member_path(tmp_path / "a.zip", "0001.png")
+        assert split_member_path(path) == (tmp_path / "a.zip", "0001.png")
+
+    def test_regular_path(self, sample_images):
+        assert split_member_path(str(sample_images[0])) is None
+        assert image_source(str(sample_images[0])) == str(sample_images[0])
+
+    def test_image_source_opens_member(self, archive_path):
+        with Image.open(image_source(member_path(archive_path, "test_0001.png"))) as img:
+            assert img.size == (100, 100)
+
+    def test_source_stamp(self, session, archive_path):
+        """サイズは画像、更新時刻はアーカイブのもの"""
+        stamp = source_stamp(member_path(archive_path, "test_0000.png"))
+        assert stamp == ((session / "test_0000.png").stat().st_size, archive_path.stat().st_mtime_ns)
+        assert not source_exists(member_path(archive_path, "gone.png"))
+
+    def test_reopens_replaced_archive(self, session, archive_path):
+        """書き出し直したアーカイブは開き直す"""
+        first = open_archive(archive_path)
+        assert open_archive(archive_path) is first
+
+        Image.new('RGB', (50, 50)).save(session / "test_0000.png")
+        export_session(session, archive_path)
+
+        with Image.open(image_source(member_path(archive_path, "test_0000.png"))) as img:
+            assert img.size == (50, 50)
+        # 差し替え前のアーカイブは閉じる（Windowsで書き出し直し・削除できるよう）
+        assert first._file.closed
+
+    def test_image_source_reads_mapped_member(self, session, archive_path):
+        """アーカイブ内の画像はメモリマップ上の内容を読み込む（BytesIOへのコピーなし）"""
+        source = image_source(member_path(archive_path, "test_0001.png"))
+        assert isinstance(source, MemberReader)
+        expected = (session / "test_0001.png").read_bytes()
+        assert source.read(8) == expected[:8]
+        source.seek(-4, 2)
+        assert source.read() == expected[-4:]
+        assert bytes(source.getbuffer()) == expected
+        source.close()
+
+    def test_close_waits_for_open_readers(self, archive_path):
+        """開いている読み込み元がある間はメモリマップを閉じない"""
+        archive = SessionArchive(archive_path)
+        reader = archive.open_member("test_0000.png")
+        archive.close()
+
+        assert not archive._file.closed
+        assert reader.read(4) == b"\x89PNG"
+        reader.close()
+        assert archive._file.closed
+
+    def test_least_recently_used_archive_is_closed(self, session, tmp_path, monkeypatch):
+        """開いておく数の上限を超えたアーカイブは閉じる"""
+        monkeypatch.setattr(session_archive, "MAX_OPEN_ARCHIVES", 2)
+        paths = [tmp_path / f"session_{i}.zip" for i in range(3)]
+        for path in paths:
+            export_session(session, path)
+
+        archives = [open_archive(path) for path in paths]
+
+        assert [archive._file.closed for archive in archives] == [True, False, False]
+
+
+class TestImportArchive:
+    """import_archive のテスト"""
+
+    def test_round_trip(self, session, archive_path, tmp_path):
+        """展開したセッションは元と同じ画像・メタデータを持つ"""
+        dest = tmp_path / "restored"
+        assert import_archive(archive_path, dest) == 3
+
+        images = ImageManager(dest, enable_undo=False).get_images()
+        assert [Path(img.filepath).parent for img in images] == [dest] * 4
+        assert [img.description for img in images][:3] == ["Test image 0", "Test image 1", "Test image 2"]
+        assert images[3].missing
+        assert (dest / "test_0001.png").read_bytes() == (session / "test_0001.png").read_bytes()
+
+    def test_existing_destination(self, archive_path, session):
+        with pytest.raises(FileExistsError):
+            import_archive(archive_path, session)
+
+
+class TestGenerateFromArchive:
+    """アーカイブから展開せずにPowerPointを生成"""
+
+    @pytest.mark.parametrize("streaming", [False, True])
+    def test_pptx_generator(self, archive_path, tmp_path, streaming):
+        images = open_archive(archive_path).images()
+        output_path = tmp_path / "from_archive.pptx"
+
+        PPTXGenerator(max_workers=1, streaming=streaming).generate(images, output_path, title="アーカイブ")
+
+        prs = Presentation(str(output_path))
+        assert len(prs.slides) == 4  # タイトル + ファイルのある画像3枚
+
+    def test_render_cache_hashes_member(self, archive_path, session, tmp_path):
+        """内容ハッシュは元のファイルと同じ"""
+        cache = RenderCache(tmp_path / "cache")
+        assert cache.content_hash(member_path(archive_path, "test_0000.png")) == \
+            cache.content_hash(str(session / "test_0000.png"))
+
+    def test_batch_export(self, archive_path):
+        """一括出力にアーカイブを指定できる"""
+        result = export_pptx(archive_path, output_path_for(archive_path), use_cache=False)
+
+        assert result.error == ""
+        assert result.output_path == archive_path.parent / "session_manual.pptx"
+        assert result.slides == 3  # ファイルのある画像3枚
@@ -0,0 +1,144 @@
+"""
+セッション一覧インデックスのテスト
+"""
+import os
+import shutil
+import pytest
+from PIL import Image
+from utils import session_index
+from utils.image_manager import ImageManager
+from utils.session_index import SessionIndex, scan_session
+
+
+def _session(sessions_dir, name, count):
+    """画像を count 枚持つセッションを作成"""
+    session_dir = sessions_dir / name
+    session_dir.mkdir(parents=True)
+    manager = ImageManager(session_dir, enable_undo=False)
+    for i in range(count):
+        path = session_dir / f"{i:04d}_20240101_120000.png"
+        Image.new('RGB', (10, 10), color=(i, 0, 0)).save(path)
+        manager.add_image(path)
+    return session_dir
+
+
+@pytest.fixture
+def sessions_dir(tmp_path):
+    """セッション2つを持つ親ディレクトリ"""
+    sessions_dir = tmp_path / "sessions"
+    _session(sessions_dir, "session_a", 2)
+    _session(sessions_dir, "session_b", 3)
+    return sessions_dir
+
+
+@pytest.fixture
+def index(sessions_dir, tmp_path):
+    """一時ディレクトリ上のSessionIndex"""
+    return SessionIndex(sessions_dir, tmp_path / "index.json")
+
+
+class TestSessionIndex:
+    """SessionIndexクラスのテスト"""
+
+    def test_scan_session_summary(self, sessions_dir):
+        """画像数・合計サイズ・先頭画像を集計"""
+        entry = scan_session(sessions_dir / "session_b")
+
+        paths = sorted((sessions_dir / "session_b").glob("*.png"))
+        assert entry.name == "session_b"
+        assert entry.image_count == 3
+        assert entry.total_bytes == sum(path.stat().st_size for path in paths)
+        assert entry.first_image == str(paths[0])
+
+    def test_refresh_builds_and_persists(self, index, sessions_dir, tmp_path):
+        """初回の refresh で全セッションを登録し、別インスタンスからも読める"""
+        assert index.refresh()
+        assert set(index.sessions) == {"session_a", "session_b"}
+
+        reloaded = SessionIndex(sessions_dir, tmp_path / "index.json")
+        assert reloaded.get("session_b").image_count == 3
+
+    def test_refresh_without_changes_skips_scan(self, index, mocker):
+        """セッションの追加・削除がなければ走査しない"""
+        index.refresh()
+        scan = mocker.spy(session_index, "scan_session")
+
+        assert not index.refresh()
+        scan.assert_not_called()
+
+    def test_refresh_scans_only_new_sessions(self, index, sessions_dir, mocker):
+        """追加されたセッションだけを走査し、削除されたセッションは除く"""
+        index.refresh()
+        _session(sessions_dir, "session_c", 1)
+        shutil.rmtree(sessions_dir / "session_a")
+        scan = mocker.spy(session_index, "scan_session")
+
+        assert index.refresh()
+        assert set(index.sessions) == {"session_b", "session_c"}
+        assert [call.args[0].name for call in scan.call_args_list] == ["session_c"]
+
+    def test_record_capture_is_incremental(self, index, sessions_dir, tmp_path):
+        """撮影1枚分を走査なしで加え、他プロセスのインデックスにも反映される"""
+        index.refresh()
+        path = sessions_dir / "session_a" / "0002_20240101_120002.png"
+        Image.new('RGB', (10, 10)).save(path)
+        os.utime(path, (index.get("session_a").mtime + 1,) * 2)
+
+        index.record_capture(sessions_dir / "session_a", path)
+
+        other = SessionIndex(sessions_dir, tmp_path / "index.json")
+        entry = other.get("session_a")
+        assert entry.image_count == 3
+        assert entry.mtime == path.stat().st_mtime
+
+    def test_record_capture_appends_to_journal(self, index, sessions_dir, tmp_path):
+        """撮影ごとにインデックス本体は書き直さず、次の refresh / update でジャーナルを統合する"""
+        index.refresh()
+        index_file = tmp_path / "index.json"
+        before = index_file.stat().st_mtime_ns
+        other = SessionIndex(sessions_dir, index_file)
+        base = index.get("session_b").mtime
+        for i in range(3, 6):
+            path = sessions_dir / "session_b" / f"{i:04d}_20240101_12000{i}.png"
+            Image.new('RGB', (10, 10)).save(path)
+            os.utime(path, (base + i,) * 2)
+            index.record_capture(sessions_dir / "session_b", path)
+
+        assert index_file.stat().st_mtime_ns == before
+        assert index.journal_file.exists()
+        assert not other.refresh()
+        assert other.get("session_b").image_count == 6
+
+        index.update(sessions_dir / "session_a")
+        assert not index.journal_file.exists()
+        assert SessionIndex(sessions_dir, index_file).get("session_b").image_count == 6
+
+    def test_record_capture_skips_already_scanned(self, index, sessions_dir):
+        """撮影後に走査された画像は二重に数えない"""
+        path = sessions_dir / "session_a" / "0002_20240101_120002.png"
+        Image.new('RGB', (10, 10)).save(path)
+        ImageManager(sessions_dir / "session_a", enable_undo=False).add_image(path)
+        index.refresh()
+
+        index.record_capture(sessions_dir / "session_a", path)
+        assert index.get("session_a").image_count == 3
+
+    def test_search_filters_and_sorts_newest_first(self, index, sessions_dir):
+        """名前の部分一致（大文字・小文字を区別しない）と画像数で絞り込み、新しい順に並べる"""
+        _session(sessions_dir, "Other_empty", 0)
+        index.refresh()
+        index.sessions["session_a"].mtime = 100.0
+        index.sessions["session_b"].mtime = 200.0
+
+        assert [e.name for e in index.search("SESSION")] == ["session_b", "session_a"]
+        assert "Other_empty" in [e.name for e in index.search()]
+        assert "Other_empty" not in [e.name for e in index.search(min_images=1)]
+
+    def test_corrupt_index_is_rebuilt(self, sessions_dir, tmp_path):
+        """壊れたインデックスファイルは作り直す"""
+        index_file = tmp_path / "index.json"
+        index_file.write_text("{broken", encoding='utf-8')
+
+        index = SessionIndex(sessions_dir, index_file)
+        assert index.refresh()
+        assert index.get("session_a").image_count == 2
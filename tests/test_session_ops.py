@@ -0,0 +1,100 @@
+"""
+セッション結合・分割のテスト
+"""
+import os
+import pytest
+from pathlib import Path
+from PIL import Image
+from utils.image_manager import ImageManager, iter_image_entries
+from utils.session_ops import merge_sessions, split_session, resolve_session, MODE_LINK, MODE_MOVE
+
+
+def _make_session(session_dir, count, label):
+    """説明文付きのセッションを作成"""
+    session_dir.mkdir(parents=True)
+    for i in range(count):
+        Image.new('RGB', (10, 10), color=(i * 40, 0, 0)).save(session_dir / f"{i:04d}_20240101_12000{i}.png")
+    manager = ImageManager(session_dir)
+    for i in range(count):
+        manager.update_description(i, f"{label}-{i}")
+    return session_dir
+
+
+class TestMergeSessions:
+    """merge_sessions()のテスト"""
+
+    def test_merge_links_and_keeps_order(self, tmp_path):
+        """ハードリンクで結合し、順序と説明文を保持"""
+        first = _make_session(tmp_path / "first", 2, "A")
+        second = _make_session(tmp_path / "second", 3, "B")
+        dest = tmp_path / "merged"
+
+        assert merge_sessions([first, second], dest, mode=MODE_LINK) == 5
+
+        images = ImageManager(dest).images
+        assert [img.description for img in images] == ["A-0", "A-1", "B-0", "B-1", "B-2"]
+        assert [Path(img.filepath).name[:4] for img in images] == ["0000", "0001", "0002", "0003", "0004"]
+        assert [img.order for img in images] == list(range(5))
+        assert os.path.samefile(images[2].filepath, second / "0000_20240101_120000.png")
+        # 元のセッションはそのまま
+        assert len(ImageManager(first).images) == 2
+
+    def test_merge_move_empties_sources(self, tmp_path):
+        """移動モードでは元のセッションが空になる"""
+        first = _make_session(tmp_path / "first", 2, "A")
+        second = _make_session(tmp_path / "second", 1, "B")
+
+        merge_sessions([first, second], tmp_path / "merged", mode=MODE_MOVE)
+
+        assert ImageManager(first).images == []
+        assert list(first.glob("*.png")) == []
+        assert len(ImageManager(tmp_path / "merged").images) == 3
+
+    def test_merge_includes_journal_entries(self, tmp_path):
+        """ジャーナルに追記された画像も結合される"""
+        first = _make_session(tmp_path / "first", 1, "A")
+        extra = first / "0001_20240101_120001.png"
+        Image.new('RGB', (10, 10)).save(extra)
+        ImageManager(first).add_image(extra)
+
+        assert merge_sessions([first], tmp_path / "merged") == 2
+
+    def test_merge_refuses_existing_destination(self, tmp_path):
+        """既存のディレクトリには結合しない"""
+        first = _make_session(tmp_path / "first", 1, "A")
+        with pytest.raises(FileExistsError):
+            merge_sessions([first], first)
+
+
+class TestSplitSession:
+    """split_session()のテスト"""
+
+    def test_split_moves_tail(self, tmp_path):
+        """指定位置以降を新しいセッションへ移動"""
+        source = _make_session(tmp_path / "source", 5, "S")
+        dest = tmp_path / "tail"
+
+        assert split_session(source, 3, dest) == 2
+
+        head = ImageManager(source).images
+        tail = ImageManager(dest).images
+        assert [img.description for img in head] == ["S-0", "S-1", "S-2"]
+        assert [img.description for img in tail] == ["S-3", "S-4"]
+        assert [Path(img.filepath).name[:4] for img in tail] == ["0000", "0001"]
+        assert all(Path(img.filepath).exists() for img in tail)
+        assert len(list(source.glob("*.png"))) == 3
+
+    def test_split_streams_entries(self, tmp_path):
+        """分割後のメタデータは逐次読み込みでも同じ内容"""
+        source = _make_session(tmp_path / "source", 4, "S")
+        split_session(source, 1, tmp_path / "tail")
+
+        streamed = [img.description for img in iter_image_entries(tmp_path / "tail")]
+        assert streamed == ["S-1", "S-2", "S-3"]
+
+
+def test_resolve_session(tmp_path):
+    """パス指定と存在しないセッションの扱い"""
+    assert resolve_session(str(tmp_path)) == tmp_path
+    with pytest.raises(FileNotFoundError):
+        resolve_session("no_such_session_for_test")
@@ -0,0 +1,151 @@
+"""
+セッション復旧のテスト
+"""
+import pytest
+from pathlib import Path
+from PIL import Image
+from utils.image_manager import ImageManager
+from utils.session_recovery import recover_session, recover_all_sessions
+
+
+def _capture(session_dir, counter, color=(255, 0, 0)):
+    """撮影ファイル名形式の画像を作成"""
+    path = session_dir / f"{counter:04d}_20240101_1200{counter % 60:02d}.png"
+    Image.new('RGB', (10, 10), color=color).save(path)
+    return path
+
+
+class TestRecoverSession:
+    """recover_session()のテスト"""
+
+    def test_restores_orphans_in_capture_order(self, temp_session_dir):
+        """メタデータにない画像を連番順の位置に復元"""
+        for counter in (0, 2, 4):
+            _capture(temp_session_dir, counter)
+        manager = ImageManager(temp_session_dir)
+        manager.update_description(0, "Kept")
+
+        # クラッシュ中に書かれた画像（メタデータ未登録）
+        for counter in (10, 3, 1):
+            _capture(temp_session_dir, counter)
+
+        report = recover_session(temp_session_dir)
+
+        assert report.restored == [
+            "0001_20240101_120001.png",
+            "0003_20240101_120003.png",
+            "0010_20240101_120010.png",
+        ]
+        images = ImageManager(temp_session_dir).images
+        assert [Path(img.filepath).name[:4] for img in images] == ["0000", "0001", "0002", "0003", "0004", "0010"]
+        assert [img.order for img in images] == list(range(6))
+        assert images[0].description == "Kept"
+        assert images[1].timestamp == "2024-01-01T12:00:01"
+
+    def test_flags_missing_files_once(self, temp_session_dir):
+        """存在しない画像にmissingフラグを1回だけ立てる"""
+        paths = [_capture(temp_session_dir, counter) for counter in range(3)]
+        ImageManager(temp_session_dir).save_metadata()
+        paths[1].unlink()
+
+        first = recover_session(temp_session_dir)
+        second = recover_session(temp_session_dir)
+
+        assert first.missing == [paths[1].name]
+        assert not second.changed
+        images = ImageManager(temp_session_dir).images
+        assert [img.missing for img in images] == [False, True, False]
+
+        # ファイルが戻ればフラグは解除される
+        _capture(temp_session_dir, 1)
+        recover_session(temp_session_dir)
+        assert not any(img.missing for img in ImageManager(temp_session_dir).images)
+
+    def test_unchanged_session_is_not_rewritten(self, temp_session_dir, sample_images):
+        """変更がなければメタデータを書き換えない"""
+        ImageManager(temp_session_dir).save_metadata()
+        metadata_file = temp_session_dir / "metadata.json"
+        before = metadata_file.stat().st_mtime_ns
+
+        report = recover_session(temp_session_dir)
+
+        assert not report.changed
+        assert metadata_file.stat().st_mtime_ns == before
+
+
+    def test_deleted_images_are_not_restored(self, temp_session_dir):
+        """編集UIで削除した画像はファイルが残っていても復元しない"""
+        for counter in range(4):
+            _capture(temp_session_dir, counter)
+        manager = ImageManager(temp_session_dir)
+        manager.delete_image(1)
+        manager.delete_images([1])
+
+        report = recover_session(temp_session_dir)
+
+        assert not report.changed
+        assert [Path(img.filepath).name[:4] for img in ImageManager(temp_session_dir).images] == ["0000", "0003"]
+
+    def test_undone_delete_is_kept(self, temp_session_dir):
+        """削除を取り消した画像は通常どおり扱う"""
+        for counter in range(3):
+            _capture(temp_session_dir, counter)
+        manager = ImageManager(temp_session_dir)
+        manager.delete_image(1)
+        manager.undo()
+
+        report = recover_session(temp_session_dir)
+
+        assert not report.changed
+        assert len(ImageManager(temp_session_dir).images) == 3
+
+    def test_moved_session_is_matched_by_name(self, tmp_path):
+        """移動したセッションは重複させずにパスを付け替える"""
+        original = tmp_path / "original"
+        original.mkdir()
+        for counter in range(3):
+            _capture(original, counter)
+        ImageManager(original).update_description(1, "Kept")
+        moved = original.rename(tmp_path / "renamed")
+
+        report = recover_session(moved)
+
+        assert (report.restored, report.missing) == ([], [])
+        assert len(report.relocated) == 3
+        images = ImageManager(moved).images
+        assert [Path(img.filepath).parent for img in images] == [moved] * 3
+        assert images[1].description == "Kept"
+        assert not recover_session(moved).changed
+
+    def test_orphans_follow_reordered_images(self, temp_session_dir):
+        """並び替え後も、連番が小さい画像のうちリスト上で最も後ろの画像の直後に復元"""
+        for counter in (0, 2, 4):
+            _capture(temp_session_dir, counter)
+        manager = ImageManager(temp_session_dir)
+        manager.reorder_images([2, 0, 1])  # 0004, 0000, 0002
+        for counter in (1, 3, 5):
+            _capture(temp_session_dir, counter)
+
+        recover_session(temp_session_dir)
+
+        names = [Path(img.filepath).name[:4] for img in ImageManager(temp_session_dir).images]
+        assert names == ["0004", "0000", "0001", "0002", "0003", "0005"]
+
+
+class TestRecoverAllSessions:
+    """recover_all_sessions()のテスト"""
+
+    def test_recovers_every_session(self, tmp_path):
+        """全セッションを並列に処理"""
+        for i in range(4):
+            session = tmp_path / f"session_{i}"
+            session.mkdir()
+            _capture(session, 0)
+            ImageManager(session).save_metadata()
+            _capture(session, 1)
+
+        reports = recover_all_sessions(tmp_path, max_workers=2)
+
+        assert len(reports) == 4
+        assert all(report.restored == ["0001_20240101_120001.png"] for report in reports)
+        assert all(not report.error for report in reports)
@@ -0,0 +1,97 @@
+"""
+サムネイルキャッシュのテスト
+"""
+import os
+import pytest
+from PIL import Image
+from utils.thumbnail import ThumbnailCache
+
+
+@pytest.fixture
+def thumbnails(tmp_path):
+    """一時ディレクトリ上のThumbnailCache"""
+    cache = ThumbnailCache(tmp_path / "thumbnails", width=200, max_workers=2)
+    yield cache
+    cache.shutdown()
+
+
+@pytest.fixture
+def large_images(temp_session_dir):
+    """縮小が必要な画像3枚"""
+    paths = []
+    for i in range(3):
+        path = temp_session_dir / f"{i:04d}_large.png"
+        Image.new('RGB', (1600, 900), color=(i * 60, 0, 0)).save(path)
+        paths.append(str(path))
+    return paths
+
+
+class TestThumbnailCache:
+    """ThumbnailCacheクラスのテスト"""
+
+    def test_ensure_creates_small_webp(self, thumbnails, large_images):
+        """縦横比を保ったまま最大幅まで縮小したWebPを作成"""
+        thumbs = thumbnails.ensure(large_images)
+
+        assert len(thumbs) == 3
+        for thumb in thumbs:
+            with Image.open(thumb) as img:
+                assert img.format == "WEBP"
+                assert img.size == (200, 113)
+
+    def test_small_image_is_not_enlarged(self, thumbnails, sample_images):
+        """最大幅より小さい画像は拡大しない"""
+        thumb = thumbnails.ensure([str(sample_images[0])])[0]
+        with Image.open(thumb) as img:
+            assert img.size == (100, 100)
+
+    def test_existing_thumbnail_is_reused(self, thumbnails, large_images):
+        """作成済みのサムネイルは作り直さない"""
+        first = thumbnails.ensure(large_images)
+        inodes = [os.stat(thumb).st_ino for thumb in first]
+
+        assert thumbnails.ensure(large_images) == first
+        # 作り直すと一時ファイルからの置き換えでinodeが変わる（更新時刻は使うたびに進む）
+        assert [os.stat(thumb).st_ino for thumb in first] == inodes
+
+    def test_changed_image_gets_new_thumbnail(self, thumbnails, large_images):
+        """画像が差し替えられると別のサムネイルになる"""
+        before = thumbnails.ensure(large_images[:1])[0]
+
+        Image.new('RGB', (800, 800), color=(0, 0, 255)).save(large_images[0])
+        os.utime(large_images[0], ns=(1, 1))
+        after = thumbnails.ensure(large_images[:1])[0]
+
+        assert after != before
+        with Image.open(after) as img:
+            assert img.size == (200, 200)
+
+    def test_get_does_not_create(self, thumbnails, large_images):
+        """get は作成済みのサムネイルだけを返す"""
+        assert thumbnails.get(large_images[0]) is None
+        for future in thumbnails.prefetch(large_images):
+            future.result()
+        assert thumbnails.get(large_images[0]) == thumbnails.thumbnail_path(large_images[0])
+
+    def test_missing_image_raises(self, thumbnails, temp_session_dir):
+        """存在しない画像は FileNotFoundError"""
+        with pytest.raises(FileNotFoundError):
+            thumbnails.ensure([str(temp_session_dir / "missing.png")])
+
+    def test_prune_removes_least_recently_used(self, tmp_path, large_images):
+        """上限サイズを超えた分を最後に使った時刻の古い順に削除"""
+        cache = ThumbnailCache(tmp_path / "thumbnails", width=200, max_workers=1, max_bytes=0)
+        try:
+            thumbs = cache.ensure(large_images)
+            sizes = [thumb.stat().st_size for thumb in thumbs]
+            for i, thumb in enumerate(thumbs):
+                os.utime(thumb, (1000 + i, 1000 + i))
+            # 最も古い1枚目を使うと最後に使ったものになる
+            assert cache.get(large_images[0]) == thumbs[0]
+            cache.max_bytes = sizes[0] + sizes[2]
+
+            assert cache.prune() == 1
+            assert [thumb.exists() for thumb in thumbs] == [True, False, True]
+            assert cache.prune() == 0
+        finally:
+            cache.shutdown()
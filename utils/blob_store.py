@@ -0,0 +1,278 @@
+"""
+コンテンツアドレス型画像ストアモジュール（セッション間の重複排除）
+"""
+import os
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Optional
+from dataclasses import replace
+import config
+from utils.image_manager import ImageManager, ImageData, read_deleted_names
+
+
+# ハッシュ計算時の読み込みサイズ
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class BlobStore:
+    """
+    コンテンツアドレス型ブロブストアクラス
+
+    画像はSHA-256ハッシュをキーに ``<root>/ab/abcdef....png`` として1度だけ保存し、
+    セッションディレクトリにはそのハードリンクを置いて参照する。
+    ブロブの参照数はファイルシステムのリンク数（st_nlink）で数えるため、
+    セッションのコピーはリンクの作成だけで済む。
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        """
+        Args:
+            root: ブロブ保存先ディレクトリ（省略時は config.BLOBS_DIR）
+        """
+        self.root = Path(root) if root else config.BLOBS_DIR
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def blob_path(self, digest: str, suffix: str) -> Path:
+        """
+        ハッシュ値に対応するブロブのパスを取得
+
+        Args:
+            digest: SHA-256ハッシュ（16進文字列）
+            suffix: 拡張子（例: ".png"）
+
+        Returns:
+            ブロブファイルのパス
+        """
+        return self.root / digest[:2] / f"{digest}{suffix}"
+
+    def put_bytes(self, data: bytes, suffix: str) -> Path:
+        """
+        バイト列をブロブとして保存（既に存在する場合は書き込まない）
+
+        Args:
+            data: 画像のバイト列
+            suffix: 拡張子
+
+        Returns:
+            ブロブファイルのパス
+        """
+        blob = self.blob_path(hashlib.sha256(data).hexdigest(), suffix)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            # 書きかけのファイルが見えないよう一時ファイル経由で配置
+            fd, tmp_name = tempfile.mkstemp(dir=blob.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_name, blob)
+            except BaseException:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+        return blob
+
+    def put_file(self, src: Path) -> Path:
+        """
+        既存ファイルをブロブとして登録（内容はハードリンクで共有）
+
+        Args:
+            src: 登録するファイル
+
+        Returns:
+            ブロブファイルのパス
+        """
+        src = Path(src)
+        blob = self.blob_path(file_digest(src), src.suffix)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            _link_or_copy(src, blob)
+        return blob
+
+    def store(self, data: bytes, dest: Path) -> Path:
+        """
+        バイト列をブロブに保存し、セッション側にハードリンクを作成
+
+        Args:
+            data: 画像のバイト列
+            dest: セッションディレクトリ内の保存先パス
+
+        Returns:
+            保存先パス
+        """
+        dest = Path(dest)
+        blob = self.put_bytes(data, dest.suffix)
+        try:
+            _link_or_copy(blob, dest)
+        except FileNotFoundError:
+            # 保存からリンク作成までの間に他プロセスのgc()で回収された場合は保存し直す
+            blob = self.put_bytes(data, dest.suffix)
+            _link_or_copy(blob, dest)
+        return dest
+
+    def import_file(self, path: Path) -> bool:
+        """
+        セッション内の通常ファイルをブロブへのハードリンクに置き換え
+
+        Args:
+            path: セッションディレクトリ内の画像ファイル
+
+        Returns:
+            置き換えた場合True（既にブロブと同一の場合False）
+        """
+        path = Path(path)
+        blob = self.put_file(path)
+        if os.path.samefile(blob, path):
+            return False
+        tmp = path.with_name(path.name + ".tmp")
+        _link_or_copy(blob, tmp)
+        os.replace(tmp, path)
+        return True
+
+    def refcount(self, blob: Path) -> int:
+        """
+        ブロブを参照しているセッションファイルの数を取得
+
+        Args:
+            blob: ブロブファイルのパス
+
+        Returns:
+            参照数（ストア自身のリンクを除く）
+        """
+        return os.stat(blob).st_nlink - 1
+
+    def copy_session(self, src_dir: Path, dest_dir: Path) -> Path:
+        """
+        セッションをコピー（画像はハードリンクで共有するためほぼ瞬時に完了）
+
+        Args:
+            src_dir: コピー元セッションディレクトリ
+            dest_dir: コピー先セッションディレクトリ（未作成であること）
+
+        Returns:
+            コピー先ディレクトリ
+        """
+        src_dir = Path(src_dir)
+        dest_dir = Path(dest_dir)
+        dest_dir.mkdir(parents=True, exist_ok=False)
+
+        source = ImageManager(src_dir)
+        for entry in os.scandir(src_dir):
+            if entry.is_file() and entry.name.endswith(f".{config.SCREENSHOT_FORMAT}"):
+                blob = self.put_file(Path(entry.path))
+                _link_or_copy(blob, dest_dir / entry.name)
+
+        # 画像パスをコピー先に書き換えてメタデータを保存
+        copied = ImageManager(dest_dir)
+        copied.images = [
+            _rebase(img, src_dir, dest_dir) for img in source.get_images()
+        ]
+        copied.save_metadata()
+        return dest_dir
+
+    def delete_session(self, session_dir: Path) -> int:
+        """
+        セッションを削除し、参照されなくなったブロブを回収
+
+        Args:
+            session_dir: 削除するセッションディレクトリ
+
+        Returns:
+            削除したブロブの数
+        """
+        shutil.rmtree(session_dir)
+        return self.gc()
+
+    def gc(self, sessions_dir: Optional[Path] = None) -> int:
+        """
+        参照されていないブロブを削除（ガベージコレクション）
+
+        sessions_dir を指定した場合は、各セッションで編集UIから削除した画像
+        （ブロブへのリンクのみ）も先に取り除く。
+
+        Args:
+            sessions_dir: メタデータと照合するセッションの親ディレクトリ
+
+        Returns:
+            削除したブロブの数
+        """
+        if sessions_dir is not None:
+            for session in Path(sessions_dir).iterdir():
+                if session.is_dir():
+                    self.prune_session(session)
+
+        removed = 0
+        for bucket in list(self.root.iterdir()):
+            if not bucket.is_dir():
+                continue
+            for blob in list(bucket.iterdir()):
+                if blob.suffix == ".tmp":
+                    continue
+                if self.refcount(blob) <= 0:
+                    blob.unlink()
+                    removed += 1
+            if not any(bucket.iterdir()):
+                bucket.rmdir()
+        return removed
+
+    def prune_session(self, session_dir: Path) -> int:
+        """
+        編集UIで削除した画像のうち、ブロブと共有しているリンクをセッションから削除
+
+        削除した画像のファイルはUndoのために残しているため、Undoできなくなる
+        起動時・セッション操作の後に呼び出す。
+
+        Args:
+            session_dir: セッションディレクトリ
+
+        Returns:
+            削除したリンクの数
+        """
+        deleted = read_deleted_names(session_dir)
+        if not deleted:
+            return 0
+        # Undoなどで戻した画像はメタデータから参照されているため残す
+        deleted -= {Path(img.filepath).name for img in ImageManager(session_dir, enable_undo=False).get_images()}
+        removed = 0
+        for name in deleted:
+            path = Path(session_dir) / name
+            try:
+                # 通常ファイルは対象外（ブロブと共有しているリンクのみ削除）
+                if os.stat(path).st_nlink > 1:
+                    os.unlink(path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+
+def file_digest(path: Path) -> str:
+    """
+    ファイル内容のSHA-256ハッシュを計算
+
+    Args:
+        path: ファイルパス
+
+    Returns:
+        16進文字列のハッシュ値
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _link_or_copy(src: Path, dest: Path) -> None:
+    """ハードリンクを作成（別ファイルシステム等で作成できない場合はコピー）"""
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+def _rebase(img: ImageData, src_dir: Path, dest_dir: Path) -> ImageData:
+    """画像データのパスをコピー先ディレクトリに付け替え"""
+    if Path(img.filepath).parent.resolve() == Path(src_dir).resolve():
+        return replace(img, filepath=str(dest_dir / Path(img.filepath).name))
+    return replace(img)
@@ -0,0 +1,201 @@
+"""
+収録後の画像圧縮（コンパクション）モジュール
+
+収録中は撮影を止めないよう速度優先の設定で保存した画像を、長期保存用に最大圧縮で再エンコードする。
+処理は優先度を下げたプロセスプールで行い、小さくなった画像だけを一時ファイル経由で置き換える。
+圧縮済みの画像はセッション内の記録ファイルに1行ずつ追記するため、中断しても続きから再開できる。
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+import config
+from utils.image_manager import ImageManager
+
+
+# 圧縮済みの画像の記録ファイル（1行1画像: ファイル名・サイズ・更新時刻）
+COMPACTION_LOG = "compaction.log"
+
+# Windowsのプロセス優先度（通常以下）
+BELOW_NORMAL_PRIORITY_CLASS = 0x4000
+
+
+@dataclass(frozen=True)
+class CompactionSettings:
+    """画像圧縮の設定"""
+    colors: Optional[int] = config.COMPACTION_COLORS  # 減色する色数（Noneで可逆圧縮のみ）
+    min_saving: float = config.COMPACTION_MIN_SAVING  # 置き換える最小の削減率
+
+
+@dataclass(frozen=True)
+class CompactionResult:
+    """1枚分の圧縮結果"""
+    path: str
+    before: int
+    after: int  # 置き換えなかった場合は before と同じ
+
+    @property
+    def replaced(self) -> bool:
+        """画像を置き換えたかどうか"""
+        return self.after < self.before
+
+
+@dataclass
+class CompactionReport:
+    """セッションの圧縮結果データクラス"""
+    session_dir: Path
+    compacted: int = 0       # 置き換えた画像数
+    unchanged: int = 0       # 小さくならなかった画像数
+    skipped: int = 0         # 圧縮済み・共有中（ハードリンク）・ファイルなしの画像数
+    bytes_before: int = 0
+    bytes_after: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def bytes_saved(self) -> int:
+        """削減したバイト数"""
+        return self.bytes_before - self.bytes_after
+
+
+def lower_process_priority():
+    """ワーカープロセスの優先度を下げる（収録・編集の操作を妨げないため）"""
+    if os.name == 'nt':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), BELOW_NORMAL_PRIORITY_CLASS)
+    else:
+        os.nice(config.COMPACTION_NICE)
+
+
+def compact_image(path: str, settings: CompactionSettings) -> CompactionResult:
+    """
+    画像を最大圧縮で再エンコードし、小さくなった場合だけ置き換える
+
+    Args:
+        path: 画像ファイルパス（PNG）
+        settings: 圧縮設定
+
+    Returns:
+        圧縮結果
+    """
+    before = os.path.getsize(path)
+    dest = Path(path)
+    tmp_path = dest.with_name(f".{dest.name}.{os.getpid()}.compact.tmp")
+
+    try:
+        with Image.open(path) as img:
+            img.load()
+            if settings.colors:
+                # パレットへの減色（スクリーンショットは色数が少ないため劣化が目立ちにくい）
+                img = img.convert("RGB").quantize(colors=settings.colors, method=Image.Quantize.MEDIANCUT)
+            img.save(tmp_path, format="PNG", optimize=True, compress_level=9)
+        after = os.path.getsize(tmp_path)
+        if after > before * (1 - settings.min_saving):
+            return CompactionResult(path=path, before=before, after=before)
+        os.replace(tmp_path, dest)
+        return CompactionResult(path=path, before=before, after=after)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _read_log(session_dir: Path) -> Dict[str, Tuple[int, int]]:
+    """圧縮済みの画像の記録を読み込み（書き込み途中の行は無視）"""
+    done = {}
+    try:
+        with open(session_dir / COMPACTION_LOG, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if line.endswith("\n") and len(parts) == 3:
+                    done[parts[0]] = (int(parts[1]), int(parts[2]))
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def _stamp(st: os.stat_result) -> Tuple[int, int]:
+    """ファイルのサイズと更新時刻"""
+    return st.st_size, st.st_mtime_ns
+
+
+def compact_session(
+    session_dir: Path,
+    settings: Optional[CompactionSettings] = None,
+    max_workers: Optional[int] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    cancel_event: Optional[threading.Event] = None
+) -> CompactionReport:
+    """
+    セッションの画像を圧縮
+
+    圧縮済みとして記録され、その後変更されていない画像は再処理しない。
+    ハードリンクで他のセッション・ブロブストアと共有している画像は、共有が解けないよう対象外とする。
+
+    Args:
+        session_dir: セッションディレクトリ
+        settings: 圧縮設定（省略時は config の値）
+        max_workers: 並列数（省略時は config.COMPACTION_WORKERS）
+        progress_callback: 1枚処理するごとに (処理済み数, 総数) で呼ばれる関数
+        cancel_event: セットされると未着手の画像を残して中断する（次回は続きから再開）
+
+    Returns:
+        圧縮結果
+    """
+    session_dir = Path(session_dir)
+    settings = settings or CompactionSettings()
+    report = CompactionReport(session_dir=session_dir)
+    done = _read_log(session_dir)
+
+    paths = []
+    for img in ImageManager(session_dir, enable_undo=False).get_images():
+        try:
+            st = os.stat(img.filepath)
+        except FileNotFoundError:
+            report.skipped += 1
+            continue
+        if st.st_nlink > 1 or done.get(Path(img.filepath).name) == _stamp(st):
+            report.skipped += 1
+            continue
+        paths.append(img.filepath)
+
+    total = len(paths)
+    if total == 0:
+        return report
+
+    executor = ProcessPoolExecutor(
+        max_workers=max_workers or config.COMPACTION_WORKERS,
+        initializer=lower_process_priority
+    )
+    try:
+        futures = {executor.submit(compact_image, path, settings): path for path in paths}
+        with open(session_dir / COMPACTION_LOG, 'a', encoding='utf-8') as log:
+            for count, future in enumerate(as_completed(futures), 1):
+                path = futures[future]
+                if future.cancelled():
+                    continue
+                try:
+                    result = future.result()
+                except Exception as e:
+                    report.errors.append(f"{Path(path).name}: {e}")
+                else:
+                    report.bytes_before += result.before
+                    report.bytes_after += result.after
+                    if result.replaced:
+                        report.compacted += 1
+                    else:
+                        report.unchanged += 1
+                    size, mtime_ns = _stamp(os.stat(path))
+                    log.write(f"{Path(path).name}\t{size}\t{mtime_ns}\n")
+                    log.flush()
+                if progress_callback:
+                    progress_callback(count, total)
+                if cancel_event is not None and cancel_event.is_set():
+                    # 未着手の画像だけを取り消し、処理中の画像は結果を記録してから終える
+                    for pending in futures:
+                        pending.cancel()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return report
+
@@ -0,0 +1,172 @@
+"""
+ほぼ同じ画像（重複した手順）の検出モジュール
+
+画像ごとの知覚ハッシュ（dHash）をディスクにキャッシュし、隣り合う画像のハッシュの
+ハミング距離をNumPyでまとめて計算して、ほぼ同じ画像が続く区間を見つける。
+"""
+import os
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+import config
+
+
+def dhash(path: str, hash_size: int = 8) -> int:
+    """
+    画像の差分ハッシュ（dHash）を計算
+
+    グレースケールで (hash_size + 1) x hash_size に縮小し、横に隣り合う画素の明暗をビットにする。
+
+    Args:
+        path: 画像ファイルパス
+        hash_size: ハッシュの一辺のビット数（8で64ビット、最大8）
+
+    Returns:
+        hash_size ** 2 ビットのハッシュ
+    """
+    with Image.open(path) as img:
+        img.draft("L", (hash_size * 8, hash_size * 8))
+        small = img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distances(hashes: np.ndarray) -> np.ndarray:
+    """
+    隣り合うハッシュ同士のハミング距離をまとめて計算
+
+    Args:
+        hashes: 64ビットハッシュの配列（uint64）
+
+    Returns:
+        長さ len(hashes) - 1 の距離の配列（i番目は hashes[i] と hashes[i + 1] の距離）
+    """
+    if len(hashes) < 2:
+        return np.zeros(0, dtype=np.int64)
+    xor = np.ascontiguousarray(hashes[1:] ^ hashes[:-1])
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1, dtype=np.int64)
+
+
+@dataclass(frozen=True)
+class DuplicateRun:
+    """ほぼ同じ画像が続く区間データクラス"""
+    start: int  # 区間の最初の画像のインデックス（残す画像）
+    end: int    # 区間の最後の画像のインデックス
+
+    @property
+    def duplicates(self) -> List[int]:
+        """削除候補（区間の2枚目以降）のインデックス"""
+        return list(range(self.start + 1, self.end + 1))
+
+
+def find_duplicate_runs(hashes: np.ndarray, max_distance: int) -> List[DuplicateRun]:
+    """
+    隣り合う画像のハッシュの距離が max_distance 以下で続く区間を検出
+
+    Args:
+        hashes: 並び順の64ビットハッシュの配列（uint64）
+        max_distance: ほぼ同じとみなすハミング距離の上限
+
+    Returns:
+        区間のリスト（並び順）
+    """
+    similar = hamming_distances(hashes) <= max_distance
+    if not similar.any():
+        return []
+    # similar[i] が True の区間の始まりと終わり（画像インデックスでは start 〜 end + 1）
+    edges = np.diff(np.concatenate(([0], similar.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return [DuplicateRun(int(start), int(end)) for start, end in zip(starts, ends)]
+
+
+class PerceptualHashCache:
+    """知覚ハッシュのキャッシュクラス（パス・サイズ・更新時刻が同じなら再計算しない）"""
+
+    def __init__(
+        self,
+        cache_file: Optional[Path] = None,
+        hash_size: Optional[int] = None,
+        max_workers: Optional[int] = None
+    ):
+        """
+        Args:
+            cache_file: キャッシュファイル（省略時は config.PERCEPTUAL_HASH_CACHE_FILE）
+            hash_size: ハッシュの一辺のビット数（省略時は config.DUPLICATE_HASH_SIZE、最大8）
+            max_workers: ハッシュ計算の並列数（省略時は ThreadPoolExecutor の既定値）
+        """
+        self.cache_file = Path(cache_file) if cache_file else config.PERCEPTUAL_HASH_CACHE_FILE
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        self.hash_size = hash_size or config.DUPLICATE_HASH_SIZE
+        self.max_workers = max_workers
+        self._hashes: Dict[str, Tuple[int, int, int]] = self._load()
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Tuple[int, int, int]]:
+        """キャッシュを読み込み（ハッシュの大きさが異なる場合は破棄）"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        if data.get("hash_size") != self.hash_size:
+            return {}
+        return {path: tuple(value) for path, value in data.get("hashes", {}).items()}
+
+    def _save(self):
+        """キャッシュを保存（一時ファイル経由）"""
+        tmp_file = self.cache_file.with_name(f"{self.cache_file.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({"hash_size": self.hash_size, "hashes": self._hashes}, f)
+        os.replace(tmp_file, self.cache_file)
+
+    def hashes(self, paths: List[str]) -> np.ndarray:
+        """
+        画像のハッシュを取得（未計算・変更された画像だけを並列に計算）
+
+        Args:
+            paths: 画像ファイルパスのリスト
+
+        Returns:
+            paths と同じ順のハッシュの配列（uint64）
+        """
+        stats = [os.stat(path) for path in paths]
+        with self._lock:
+            pending = [
+                (path, st) for path, st in zip(paths, stats)
+                if self._hashes.get(path, (None, None))[:2] != (st.st_size, st.st_mtime_ns)
+            ]
+            if pending:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    values = executor.map(lambda item: dhash(item[0], self.hash_size), pending)
+                    for (path, st), value in zip(pending, values):
+                        self._hashes[path] = (st.st_size, st.st_mtime_ns, value)
+                self._save()
+            return np.array([self._hashes[path][2] for path in paths], dtype=np.uint64)
+
+
+def find_duplicates(
+    paths: List[str],
+    cache: Optional[PerceptualHashCache] = None,
+    max_distance: Optional[int] = None
+) -> List[DuplicateRun]:
+    """
+    並び順で隣り合うほぼ同じ画像の区間を検出
+
+    Args:
+        paths: 並び順の画像ファイルパスのリスト
+        cache: ハッシュのキャッシュ（省略時は既定のキャッシュファイルを使う）
+        max_distance: ほぼ同じとみなすハミング距離の上限（省略時は config.DUPLICATE_MAX_DISTANCE）
+
+    Returns:
+        区間のリスト
+    """
+    cache = cache or PerceptualHashCache()
+    max_distance = config.DUPLICATE_MAX_DISTANCE if max_distance is None else max_distance
+    return find_duplicate_runs(cache.hashes(paths), max_distance)
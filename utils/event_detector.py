@@ -14,6 +14,7 @@ class EventDetector:
         """
         Args:
             on_event: イベント発生時に呼び出すコールバック関数
+                （クリック時は画面上の座標 (x, y)、キー入力時は None を受け取る）
         """
         self.on_event = on_event
         self.last_event_time = 0
@@ -37,7 +38,7 @@ class EventDetector:
         """マウスクリック時のハンドラ"""
         if pressed and config.DETECT_MOUSE_CLICK and self._should_trigger():
             print(f"🖱️  Mouse click detected at ({x}, {y})")
-            self.on_event()
+            self.on_event((int(x), int(y)))
 
     def _on_key_press(self, key):
         """キー押下時のハンドラ"""
@@ -45,7 +46,7 @@ class EventDetector:
             try:
                 key_name = key.char if hasattr(key, 'char') else str(key)
                 print(f"⌨️  Key press detected: {key_name}")
-                self.on_event()
+                self.on_event(None)
             except AttributeError:
                 pass
 
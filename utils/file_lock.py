@@ -0,0 +1,106 @@
+"""
+プロセス間ファイルロックモジュール
+"""
+import os
+import time
+import threading
+from pathlib import Path
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+class FileLock:
+    """
+    プロセス間排他ロッククラス
+
+    ロックファイルに対してOSの排他ロック（POSIX: flock / Windows: msvcrt.locking）を取得する。
+    同一インスタンス内では再入可能。
+    """
+
+    def __init__(self, path: Path, timeout: float = 10.0, poll_interval: float = 0.05):
+        """
+        Args:
+            path: ロックファイルのパス
+            timeout: ロック取得の最大待機時間（秒）
+            poll_interval: ロック再試行の間隔（秒）
+        """
+        self.path = Path(path)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._file = None
+        self._depth = 0
+        self._thread_lock = threading.RLock()
+
+    def acquire(self):
+        """
+        ロックを取得
+
+        Raises:
+            TimeoutError: タイムアウトまでにロックを取得できなかった場合
+        """
+        # 同じインスタンスを共有する他スレッドが保持している場合もタイムアウトまで待つ
+        if self.timeout > 0:
+            acquired = self._thread_lock.acquire(timeout=self.timeout)
+        else:
+            acquired = self._thread_lock.acquire(blocking=False)
+        if not acquired:
+            raise TimeoutError(f"ロックを取得できませんでした: {self.path}")
+        if self._depth > 0:
+            self._depth += 1
+            return
+
+        try:
+            self._file = open(self.path, 'a+b')
+            deadline = time.monotonic() + self.timeout
+            while not self._try_lock():
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"ロックを取得できませんでした: {self.path}")
+                time.sleep(self.poll_interval)
+        except BaseException:
+            if self._file:
+                self._file.close()
+                self._file = None
+            self._thread_lock.release()
+            raise
+        self._depth = 1
+
+    def release(self):
+        """ロックを解放"""
+        if self._depth == 0:
+            return
+        self._depth -= 1
+        if self._depth == 0:
+            self._unlock()
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def _try_lock(self) -> bool:
+        """ノンブロッキングでOSロックを試行"""
+        try:
+            if os.name == 'nt':
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(self):
+        """OSロックを解放"""
+        if os.name == 'nt':
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
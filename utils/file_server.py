@@ -0,0 +1,265 @@
+"""
+出力ファイルのダウンロードサーバーモジュール
+
+生成したPowerPoint・PDFをディスクから直接配信する軽量HTTPサーバー。
+Streamlitのダウンロードボタンのようにファイル全体をメモリへ読み込まず、sendfileで送信する。
+URLには推測できないトークンを含め、登録したファイル以外は配信しない。
+"""
+import os
+import time
+import socket
+import secrets
+import threading
+import mimetypes
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from dataclasses import dataclass, replace
+from urllib.parse import quote, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import config
+
+
+# ダウンロードURLのパス
+DOWNLOAD_PREFIX = "/download/"
+
+# ループバックアドレスとみなすホスト名
+LOOPBACK_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+
+def request_hostname(host_header: Optional[str]) -> Optional[str]:
+    """
+    HTTPのHostヘッダーからホスト名を取得（ポート・IPv6の角括弧を除く）
+
+    Args:
+        host_header: Hostヘッダーの値（例: "manual-pc:8501"、"[::1]:8501"）
+
+    Returns:
+        ホスト名（取得できない場合はNone）
+    """
+    if not host_header:
+        return None
+    try:
+        return urlsplit(f"//{host_header}").hostname
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True)
+class RegisteredFile:
+    """配信を許可したファイルデータクラス"""
+    path: Path
+    filename: str
+    mime: str
+    stamp: Tuple[int, int]  # 登録時のサイズと更新時刻（変更後のファイルは配信しない）
+    expires: float
+
+
+class _DownloadHandler(BaseHTTPRequestHandler):
+    """ダウンロード要求のハンドラ"""
+
+    server: "_Server"
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body: bool):
+        """トークンに対応するファイルを送信"""
+        token = self.path[len(DOWNLOAD_PREFIX):] if self.path.startswith(DOWNLOAD_PREFIX) else ""
+        entry = self.server.owner.lookup(token)
+        if entry is None:
+            self.send_error(404)
+            return
+        try:
+            f = open(entry.path, 'rb')
+        except FileNotFoundError:
+            self.send_error(404)
+            return
+
+        with f:
+            st = os.fstat(f.fileno())
+            if (st.st_size, st.st_mtime_ns) != entry.stamp:
+                # 登録後に上書きされたファイルは配信しない（再生成後のURLを使う）
+                self.send_error(410)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", entry.mime)
+            self.send_header("Content-Length", str(st.st_size))
+            self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(entry.filename)}")
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            if send_body:
+                self.wfile.flush()
+                try:
+                    self.connection.sendfile(f)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # ダウンロードの中断
+
+    def log_message(self, format, *args):
+        """アクセスログは出力しない"""
+
+
+class _Server(ThreadingHTTPServer):
+    """FileServer への参照を持つHTTPサーバー"""
+    daemon_threads = True
+    owner: "FileServer"
+
+
+class FileServer:
+    """ダウンロードサーバークラス"""
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        public_url: Optional[str] = None,
+        ttl: Optional[float] = None
+    ):
+        """
+        Args:
+            host: 待ち受けるアドレス（省略時は config.FILE_SERVER_HOST）
+            port: 待ち受けるポート（省略時は config.FILE_SERVER_PORT、0で空いているポート）
+            public_url: ブラウザから見たサーバーのURL（省略時は config.FILE_SERVER_PUBLIC_URL、
+                未設定ならブラウザが編集UIに使ったホスト名とポートから作成）
+            ttl: ダウンロードURLの有効期間（秒、省略時は config.FILE_SERVER_TOKEN_TTL）
+        """
+        self.host = host if host is not None else config.FILE_SERVER_HOST
+        self.port = port if port is not None else config.FILE_SERVER_PORT
+        self.public_url = public_url or config.FILE_SERVER_PUBLIC_URL
+        self.ttl = ttl if ttl is not None else config.FILE_SERVER_TOKEN_TTL
+        self._files: Dict[str, RegisteredFile] = {}
+        self._tokens: Dict[Tuple[str, Tuple[int, int]], str] = {}  # (パス, サイズと更新時刻) → トークン
+        self._lock = threading.Lock()
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def base_url(self, request_host: Optional[str] = None) -> str:
+        """
+        ダウンロードURLの先頭部分
+
+        Args:
+            request_host: ブラウザが編集UIへのアクセスに使ったHostヘッダー
+                （public_url 未設定時はこのホスト名とサーバーのポートでURLを作る）
+
+        Returns:
+            URLの先頭部分（末尾の / なし）
+        """
+        if self.public_url:
+            return self.public_url.rstrip("/")
+        host = request_hostname(request_host)
+        if host is None:
+            host = self.host if self.host not in ("", "0.0.0.0", "::") else socket.gethostname()
+        if ":" in host:
+            host = f"[{host}]"
+        return f"http://{host}:{self._server.server_address[1]}"
+
+    def reachable_from(self, request_host: Optional[str]) -> bool:
+        """
+        ブラウザからダウンロードURLに接続できるかどうか
+
+        ループバックアドレスで待ち受けている場合、他のPCのブラウザからは接続できない。
+
+        Args:
+            request_host: ブラウザが編集UIへのアクセスに使ったHostヘッダー
+
+        Returns:
+            public_url が設定されている、ループバック以外で待ち受けている、
+            またはブラウザが同じPC上にある場合True
+        """
+        if self.public_url or self.host not in LOOPBACK_HOSTS:
+            return True
+        return request_hostname(request_host) in (None,) + LOOPBACK_HOSTS
+
+    def start(self) -> "FileServer":
+        """
+        バックグラウンドスレッドでサーバーを起動
+
+        Returns:
+            自身（起動済みの場合は何もしない）
+        """
+        if self._server is None:
+            self._server = _Server((self.host, self.port), _DownloadHandler)
+            self._server.owner = self
+            self._thread = threading.Thread(
+                target=self._server.serve_forever, name="file-server", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """サーバーを停止"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def register(
+        self,
+        path: Path,
+        filename: Optional[str] = None,
+        mime: Optional[str] = None,
+        request_host: Optional[str] = None
+    ) -> str:
+        """
+        ファイルの配信を許可してダウンロードURLを取得
+
+        同じ内容（サイズと更新時刻）のファイルを有効期間内に再登録した場合は、期限を延ばして同じURLを返す。
+
+        Args:
+            path: 配信するファイル
+            filename: ダウンロード時のファイル名（省略時は path のファイル名）
+            mime: MIMEタイプ（省略時は拡張子から推定）
+            request_host: ブラウザが編集UIへのアクセスに使ったHostヘッダー（URLのホスト名に使う）
+
+        Returns:
+            ダウンロードURL
+
+        Raises:
+            FileNotFoundError: ファイルが存在しない場合
+        """
+        path = Path(path).resolve()
+        st = os.stat(path)
+        stamp = (st.st_size, st.st_mtime_ns)
+        now = time.time()
+
+        with self._lock:
+            self._prune(now)
+            token = self._tokens.get((str(path), stamp))
+            if token is not None:
+                self._files[token] = replace(self._files[token], expires=now + self.ttl)
+            else:
+                token = secrets.token_urlsafe(32)
+                self._files[token] = RegisteredFile(
+                    path=path,
+                    filename=filename or path.name,
+                    mime=mime or mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+                    stamp=stamp,
+                    expires=now + self.ttl
+                )
+                self._tokens[(str(path), stamp)] = token
+        return f"{self.base_url(request_host)}{DOWNLOAD_PREFIX}{token}"
+
+    def lookup(self, token: str) -> Optional[RegisteredFile]:
+        """
+        トークンに対応する登録を取得
+
+        Args:
+            token: ダウンロードURLのトークン
+
+        Returns:
+            登録内容（未登録・期限切れの場合はNone）
+        """
+        with self._lock:
+            entry = self._files.get(token)
+            if entry is None or entry.expires < time.time():
+                return None
+            return entry
+
+    def _prune(self, now: float):
+        """期限切れの登録を削除"""
+        expired = [token for token, entry in self._files.items() if entry.expires < now]
+        for token in expired:
+            entry = self._files.pop(token)
+            self._tokens.pop((str(entry.path), entry.stamp), None)
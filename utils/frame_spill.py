@@ -0,0 +1,408 @@
+"""
+撮影フレームの一時保存（スピル）と後からのエンコードモジュール
+
+収録中はPNGへのエンコードを行わず、画面の生データをあらかじめ確保したメモリマップファイルへ
+順に追記する（書き込みはメモリコピーのみ）。エンコードは収録停止後やアイドル時にプロセスプールで並列に行う。
+
+レコードは「ヘッダー・メタデータ(JSON)・生データ・コミットマーカー」の順に書き、マーカーを最後に書くため、
+クラッシュ時に書きかけだったフレームは読み込み時に捨てられ、それ以前のフレームはすべて復元できる。
+"""
+import os
+import io
+import json
+import mmap
+import zlib
+import struct
+import threading
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+import config
+from utils.blob_store import BlobStore
+from utils.file_lock import FileLock
+from utils.image_manager import ImageManager
+from utils.compaction import lower_process_priority
+
+
+# セッション内のスピルファイル名
+SPILL_FILE = "frames.spill"
+
+# メタデータに登録済みのフレームの記録（1行1ファイル名、スピルファイルと一緒に削除）
+REGISTERED_SUFFIX = ".registered"
+
+# ファイルヘッダー
+SPILL_MAGIC = b"MMSPILL1"
+_FILE_HEADER_SIZE = 16
+
+# レコードヘッダー（マジック・メタデータ長・幅・高さ・生データ長）とコミットマーカー（マジック・メタデータのCRC32）
+_RECORD_HEADER = struct.Struct("<4sIIIQ")
+_RECORD_MAGIC = b"FRM0"
+_COMMIT = struct.Struct("<4sI")
+_COMMIT_MAGIC = b"DONE"
+
+# 生データの画素形式（mss の BGRA）
+RAW_MODE = "BGRX"
+
+
+@dataclass(frozen=True)
+class SpilledFrame:
+    """スピルファイル内のフレームデータクラス"""
+    filename: str
+    timestamp: str
+    click: Optional[Tuple[int, int]]
+    width: int
+    height: int
+    offset: int  # 生データの開始位置
+    length: int
+
+
+@dataclass
+class EncodeReport:
+    """エンコード結果データクラス"""
+    frames: int = 0      # スピルファイル内のフレーム数
+    encoded: int = 0     # 今回エンコードした画像数
+    registered: int = 0  # 今回メタデータに登録した画像数
+    removed: bool = False  # すべて登録し終えてスピルファイルを削除したかどうか
+    errors: List[str] = field(default_factory=list)
+
+
+def spill_path(session_dir: Path) -> Path:
+    """セッションのスピルファイルのパス"""
+    return Path(session_dir) / SPILL_FILE
+
+
+def spill_lock(path: Path, timeout: float = 10.0) -> FileLock:
+    """
+    スピルファイルのロックを取得（書き込み中の収録プロセスが保持する）
+
+    Args:
+        path: スピルファイル
+        timeout: ロック取得の最大待機時間（秒）
+
+    Returns:
+        FileLockインスタンス
+    """
+    return FileLock(Path(path).with_name(Path(path).name + ".lock"), timeout=timeout)
+
+
+def _registered_path(path: Path) -> Path:
+    """スピルファイルの登録済みフレームの記録のパス"""
+    return Path(path).with_name(Path(path).name + REGISTERED_SUFFIX)
+
+
+def read_registered(path: Path) -> Set[str]:
+    """
+    スピルファイルのうちメタデータに登録済みのフレームのファイル名
+
+    登録後に編集UIで削除されたフレームも含むため、これに含まれるフレームは二度と登録しない。
+
+    Args:
+        path: スピルファイル
+
+    Returns:
+        ファイル名の集合
+    """
+    try:
+        with open(_registered_path(path), 'r', encoding='utf-8') as f:
+            return {line.rstrip("\n") for line in f if line.endswith("\n")}
+    except FileNotFoundError:
+        return set()
+
+
+def pending_filenames(session_dir: Path) -> Set[str]:
+    """
+    スピルファイルに残っている、まだメタデータに登録されていないフレームのファイル名
+
+    Args:
+        session_dir: セッションディレクトリ
+
+    Returns:
+        ファイル名の集合（スピルファイルがない場合は空）
+    """
+    path = spill_path(session_dir)
+    try:
+        return {frame.filename for frame in read_frames(path)} - read_registered(path)
+    except FileNotFoundError:
+        return set()
+
+
+class FrameSpill:
+    """スピルファイルへの書き込みクラス（収録プロセス専用）"""
+
+    def __init__(self, path: Path, initial_bytes: Optional[int] = None):
+        """
+        既存のスピルファイルがあれば、最後にコミットされたフレームの後ろから追記する。
+        書き込み中はロックを保持し、他プロセスがエンコード後にファイルを削除しないようにする。
+
+        Args:
+            path: スピルファイル
+            initial_bytes: 最初に確保するサイズ（省略時は config.SPILL_FILE_BYTES、不足時は同じ量ずつ拡張）
+
+        Raises:
+            TimeoutError: 他のプロセスが同じスピルファイルを使用中の場合
+        """
+        self.path = Path(path)
+        self.grow_bytes = initial_bytes or config.SPILL_FILE_BYTES
+        self.lock = spill_lock(self.path, timeout=0)
+        self.lock.acquire()
+        try:
+            if not self.path.exists():
+                # 削除し損ねた前回の収録の記録を引き継がない
+                _registered_path(self.path).unlink(missing_ok=True)
+            frames = list(read_frames(self.path)) if self.path.exists() else []
+            self._file = open(self.path, 'r+b' if self.path.exists() else 'w+b')
+            if frames:
+                self.position = frames[-1].offset + frames[-1].length + _COMMIT.size
+            else:
+                self._file.write(SPILL_MAGIC.ljust(_FILE_HEADER_SIZE, b"\0"))
+                self.position = _FILE_HEADER_SIZE
+            size = max(os.fstat(self._file.fileno()).st_size, self.grow_bytes)
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+        except BaseException:
+            self.lock.release()
+            raise
+        self._lock = threading.Lock()
+
+    def append(
+        self,
+        filename: str,
+        timestamp: str,
+        size: Tuple[int, int],
+        data: bytes,
+        click: Optional[Tuple[int, int]] = None
+    ) -> None:
+        """
+        フレームを1枚追記
+
+        Args:
+            filename: エンコード後の画像ファイル名
+            timestamp: 撮影日時（ISO形式）
+            size: 画像の (幅, 高さ)
+            data: BGRA形式の生データ
+            click: クリック位置（画像上のピクセル座標）
+        """
+        meta = json.dumps(
+            {"filename": filename, "timestamp": timestamp, "click": list(click) if click else None},
+            ensure_ascii=False
+        ).encode('utf-8')
+        record_size = _RECORD_HEADER.size + len(meta) + len(data) + _COMMIT.size
+
+        with self._lock:
+            # 次のレコードヘッダーの位置（終端の目印）まで収まるよう拡張
+            if self.position + record_size + _RECORD_HEADER.size > len(self._map):
+                self._grow(self.position + record_size + _RECORD_HEADER.size)
+            pos = self.position
+            _RECORD_HEADER.pack_into(self._map, pos, _RECORD_MAGIC, len(meta), size[0], size[1], len(data))
+            pos += _RECORD_HEADER.size
+            self._map[pos:pos + len(meta)] = meta
+            pos += len(meta)
+            self._map[pos:pos + len(data)] = data
+            pos += len(data)
+            # 再開時に上書きした書きかけのレコードの残りを終端と誤認しないよう、次のヘッダーを消しておく
+            self._map[pos + _COMMIT.size:pos + _COMMIT.size + _RECORD_HEADER.size] = bytes(_RECORD_HEADER.size)
+            # コミットマーカーは最後に書く
+            _COMMIT.pack_into(self._map, pos, _COMMIT_MAGIC, zlib.crc32(meta))
+            self.position = pos + _COMMIT.size
+
+    def _grow(self, required: int):
+        """ファイルを拡張してマップし直す（Windowsではマップ中のファイルを拡張できないため閉じてから）"""
+        size = len(self._map)
+        while size < required:
+            size += self.grow_bytes
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def close(self):
+        """マップを書き出して閉じる"""
+        with self._lock:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+        self.lock.release()
+
+
+def read_frames(path: Path) -> Iterator[SpilledFrame]:
+    """
+    スピルファイルからコミット済みのフレームを順に読み込み（生データは読まない）
+
+    書きかけのレコード（コミットマーカーがない・壊れている）に達したらそこで終わる。
+
+    Args:
+        path: スピルファイル
+
+    Yields:
+        SpilledFrame
+    """
+    with open(path, 'rb') as f:
+        if f.read(_FILE_HEADER_SIZE)[:len(SPILL_MAGIC)] != SPILL_MAGIC:
+            return
+        size = os.fstat(f.fileno()).st_size
+        pos = _FILE_HEADER_SIZE
+        while pos + _RECORD_HEADER.size <= size:
+            f.seek(pos)
+            magic, meta_length, width, height, length = _RECORD_HEADER.unpack(f.read(_RECORD_HEADER.size))
+            end = pos + _RECORD_HEADER.size + meta_length + length + _COMMIT.size
+            if magic != _RECORD_MAGIC or end > size:
+                return
+            meta = f.read(meta_length)
+            f.seek(end - _COMMIT.size)
+            commit_magic, crc = _COMMIT.unpack(f.read(_COMMIT.size))
+            if commit_magic != _COMMIT_MAGIC or crc != zlib.crc32(meta):
+                return
+            try:
+                item = json.loads(meta)
+            except ValueError:
+                return
+            yield SpilledFrame(
+                filename=item["filename"],
+                timestamp=item["timestamp"],
+                click=tuple(item["click"]) if item["click"] else None,
+                width=width,
+                height=height,
+                offset=pos + _RECORD_HEADER.size + meta_length,
+                length=length
+            )
+            pos = end
+
+
+def encode_frame(path: str, frame: SpilledFrame, dest: str) -> str:
+    """
+    フレームの生データを画像ファイルにエンコード（ワーカープロセスで実行）
+
+    Args:
+        path: スピルファイル
+        frame: エンコードするフレーム
+        dest: 保存先の画像ファイル
+
+    Returns:
+        保存先の画像ファイル
+    """
+    with open(path, 'rb') as f:
+        f.seek(frame.offset)
+        data = f.read(frame.length)
+    img = Image.frombytes("RGB", (frame.width, frame.height), data, "raw", RAW_MODE)
+    if config.BLOB_STORE_ENABLED:
+        buffer = io.BytesIO()
+        img.save(buffer, format=config.SCREENSHOT_FORMAT, quality=config.SCREENSHOT_QUALITY)
+        BlobStore().store(buffer.getvalue(), Path(dest))
+    else:
+        # 書きかけの画像が残らないよう一時ファイル経由で保存
+        tmp_dest = f"{dest}.{os.getpid()}.tmp"
+        img.save(tmp_dest, format=config.SCREENSHOT_FORMAT, quality=config.SCREENSHOT_QUALITY)
+        os.replace(tmp_dest, dest)
+    return dest
+
+
+def encode_spill(
+    session_dir: Path,
+    max_workers: Optional[int] = None,
+    remove: bool = True,
+    low_priority: bool = False,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    cancel_event: Optional[threading.Event] = None
+) -> EncodeReport:
+    """
+    スピルファイルのフレームを並列にエンコードしてメタデータに登録
+
+    エンコード済み（画像ファイルが存在する）のフレームは飛ばすため、中断・クラッシュ後に再実行できる。
+    メタデータへの登録は撮影順を保つため、先頭から途切れずにエンコード済みのフレームまでとする。
+    登録したフレームはスピルファイルの横に記録し、その後に削除されたフレームを再び登録しない。
+    remove=True の場合は収録プロセスが書き込み中でないことをロックで確かめてから処理する。
+
+    Args:
+        session_dir: セッションディレクトリ
+        max_workers: 並列数（省略時は config.ENCODE_WORKERS）
+        remove: すべて登録し終えたらスピルファイルを削除するかどうか（収録中は False）
+        low_priority: ワーカープロセスの優先度を下げるかどうか（収録中のアイドル時用）
+        progress_callback: 1枚エンコードするごとに (エンコード済み数, 総数) で呼ばれる関数
+        cancel_event: セットされると未着手のフレームを残して中断する
+
+    Returns:
+        エンコード結果
+
+    Raises:
+        TimeoutError: remove=True で、収録プロセスがスピルファイルに書き込み中の場合
+    """
+    session_dir = Path(session_dir)
+    path = spill_path(session_dir)
+    if not path.exists():
+        return EncodeReport()
+    if not remove:
+        return _encode(session_dir, path, max_workers, False, low_priority, progress_callback, cancel_event)
+    with spill_lock(path, timeout=0):
+        return _encode(session_dir, path, max_workers, True, low_priority, progress_callback, cancel_event)
+
+
+def _encode(
+    session_dir: Path,
+    path: Path,
+    max_workers: Optional[int],
+    remove: bool,
+    low_priority: bool,
+    progress_callback: Optional[Callable[[int, int], None]],
+    cancel_event: Optional[threading.Event]
+) -> EncodeReport:
+    """encode_spill() の本体"""
+    report = EncodeReport()
+    if not path.exists():
+        return report
+
+    # メタデータのないセッションはディレクトリ内の画像が自動検出されるため、エンコード前に読み込む
+    manager = ImageManager(session_dir, enable_undo=False)
+    frames = list(read_frames(path))
+    report.frames = len(frames)
+    done = read_registered(path)
+    pending = [frame for frame in frames if not (session_dir / frame.filename).exists()]
+
+    if pending:
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers or config.ENCODE_WORKERS,
+            initializer=lower_process_priority if low_priority else None
+        )
+        try:
+            futures = {
+                executor.submit(encode_frame, str(path), frame, str(session_dir / frame.filename)): frame
+                for frame in pending
+            }
+            for count, future in enumerate(as_completed(futures), 1):
+                if future.cancelled():
+                    continue
+                try:
+                    future.result()
+                    report.encoded += 1
+                except Exception as e:
+                    report.errors.append(f"{futures[future].filename}: {e}")
+                if progress_callback:
+                    progress_callback(count, len(pending))
+                if cancel_event is not None and cancel_event.is_set():
+                    for future_to_cancel in futures:
+                        future_to_cancel.cancel()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    # 撮影順に登録（登録済みのフレームと、復旧処理などで既に登録された画像は飛ばす）
+    manager.refresh()
+    registered = {Path(img.filepath).name for img in manager.get_images()}
+    complete = True
+    with open(_registered_path(path), 'a', encoding='utf-8') as log:
+        for frame in frames:
+            if frame.filename in done:
+                continue
+            if frame.filename not in registered:
+                if not (session_dir / frame.filename).exists():
+                    complete = False
+                    break
+                manager.add_image(str(session_dir / frame.filename), click=frame.click, timestamp=frame.timestamp)
+                report.registered += 1
+            log.write(frame.filename + "\n")
+            log.flush()
+
+    if complete and remove:
+        path.unlink()
+        _registered_path(path).unlink(missing_ok=True)
+        report.removed = True
+    return report
@@ -1,11 +1,17 @@
 """
 画像管理モジュール（編集・Undo機能）
 """
+import os
 import json
+import copy
+import weakref
+import textwrap
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Set, Tuple, Iterable, Iterator
 from dataclasses import dataclass, asdict
 from datetime import datetime
+from utils.file_lock import FileLock
 
 
 @dataclass
@@ -15,39 +21,372 @@ class ImageData:
     description: str = ""
     order: int = 0
     timestamp: str = ""
+    missing: bool = False
+    click_x: Optional[int] = None  # 撮影時のクリック位置（画像上のピクセル座標）
+    click_y: Optional[int] = None
 
     def __post_init__(self):
         if not self.timestamp:
             self.timestamp = datetime.now().isoformat()
 
 
+def parse_capture_counter(filename: str) -> Optional[int]:
+    """
+    撮影ファイル名（``0001_20240101_120000.png``）から連番を取得
+
+    Args:
+        filename: ファイル名
+
+    Returns:
+        連番（連番形式でない場合はNone）
+    """
+    prefix = filename.split("_", 1)[0]
+    return int(prefix) if prefix.isdigit() else None
+
+
+def capture_sort_key(filename: str) -> Tuple[int, int, str]:
+    """
+    撮影順に並べるためのソートキー（連番のないファイルは後ろに名前順）
+
+    Args:
+        filename: ファイル名
+
+    Returns:
+        ソートキー
+    """
+    counter = parse_capture_counter(filename)
+    if counter is None:
+        return (1, 0, filename)
+    return (0, counter, filename)
+
+
+def order_from_positions(positions: List[float]) -> List[int]:
+    """
+    画像ごとの移動先の番号から並び順を作成
+
+    一覧で番号を書き換える並び替え用。番号の小さい順に並べ、同じ番号は元の順を保つ
+    （例: 5番目の画像を 1.5 にすると1番目と2番目の間に入る）。
+
+    Args:
+        positions: 現在の並びの画像ごとの移動先の番号
+
+    Returns:
+        reorder_images() に渡す新しい順序のインデックスリスト
+    """
+    return sorted(range(len(positions)), key=lambda i: (positions[i], i))
+
+
+# プロセス内で共有するセッションごとのロック（使われなくなったものは破棄）
+_session_locks: "weakref.WeakValueDictionary[str, FileLock]" = weakref.WeakValueDictionary()
+_session_locks_guard = threading.Lock()
+
+
+def session_lock(session_dir: Path) -> FileLock:
+    """
+    セッションのメタデータ用ロックを取得
+
+    FileLock は同一インスタンス内でのみ再入可能なため、同じプロセス内では同じセッションに
+    同じインスタンスを返す（同じセッションの ImageManager が複数あっても互いに待たない）。
+
+    Args:
+        session_dir: セッションディレクトリ
+
+    Returns:
+        FileLockインスタンス
+    """
+    key = os.path.realpath(session_dir)
+    with _session_locks_guard:
+        lock = _session_locks.get(key)
+        if lock is None:
+            lock = FileLock(Path(session_dir) / "metadata.lock")
+            _session_locks[key] = lock
+        return lock
+
+
+# 削除した画像のファイル名の記録（1行1ファイル名）
+DELETED_FILE = "metadata.deleted"
+
+
+def read_deleted_names(session_dir: Path) -> Set[str]:
+    """
+    セッションで削除した画像のファイル名を取得
+
+    削除してもファイル自体はUndoのために残すため、復旧処理が孤立ファイルとして戻さないよう記録している。
+
+    Args:
+        session_dir: セッションディレクトリ
+
+    Returns:
+        ファイル名の集合
+    """
+    try:
+        with open(Path(session_dir) / DELETED_FILE, 'r', encoding='utf-8') as f:
+            return {line.rstrip("\n") for line in f if line.endswith("\n")}
+    except FileNotFoundError:
+        return set()
+
+
+def _iter_json_array(path: Path, chunk_size: int = 64 * 1024) -> Iterator[dict]:
+    """JSON配列ファイルを要素ごとに逐次読み込み（ファイル全体をメモリに載せない）"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ""
+        pos = 0
+        started = False
+        eof = False
+        while True:
+            # 区切り文字と空白を読み飛ばす
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,[":
+                started = started or buffer[pos] == "["
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]" and started:
+                return
+            try:
+                if pos < len(buffer):
+                    item, pos = decoder.raw_decode(buffer, pos)
+                    yield item
+                    continue
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            if eof:
+                return
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+
+def iter_image_entries(session_dir: Path) -> Iterator[ImageData]:
+    """
+    セッションの画像データを逐次読み込み（スナップショット → ジャーナルの順）
+
+    メタデータがない場合はディレクトリ内の画像を撮影順に返す。
+
+    Args:
+        session_dir: セッションディレクトリ
+
+    Yields:
+        ImageData
+    """
+    session_dir = Path(session_dir)
+    metadata_file = session_dir / "metadata.json"
+    journal_file = session_dir / "metadata.journal"
+    if metadata_file.exists():
+        for item in _iter_json_array(metadata_file):
+            yield ImageData(**item)
+    else:
+        image_files = sorted(session_dir.glob("*.png"), key=lambda p: capture_sort_key(p.name))
+        for img_path in image_files:
+            yield ImageData(filepath=str(img_path))
+    if journal_file.exists():
+        with open(journal_file, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    yield ImageData(**json.loads(line))
+                except (ValueError, TypeError):
+                    continue
+
+
+class MetadataWriter:
+    """
+    metadata.json と同じ形式で画像データを1件ずつ書き出すクラス
+
+    orderは書き出し順に振り直す。
+    """
+
+    def __init__(self, metadata_file: Path):
+        """
+        Args:
+            metadata_file: 出力ファイル
+        """
+        self.metadata_file = metadata_file
+        self.count = 0
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.metadata_file, 'w', encoding='utf-8')
+        self._file.write("[")
+        return self
+
+    def append(self, img: ImageData):
+        """
+        画像データを1件書き出し
+
+        Args:
+            img: 画像データ
+        """
+        img.order = self.count
+        self._file.write(",\n" if self.count else "\n")
+        self._file.write(textwrap.indent(json.dumps(asdict(img), ensure_ascii=False, indent=2), "  "))
+        self.count += 1
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._file.write("\n]" if self.count else "]")
+        self._file.close()
+
+
+def write_image_entries(metadata_file: Path, entries: Iterable[ImageData]) -> int:
+    """
+    画像データを metadata.json と同じ形式で逐次書き込み
+
+    Args:
+        metadata_file: 出力ファイル
+        entries: 画像データ（イテレータ可）
+
+    Returns:
+        書き込んだ件数
+    """
+    with MetadataWriter(metadata_file) as writer:
+        for img in entries:
+            writer.append(img)
+    return writer.count
+
+
 class ImageManager:
-    """画像管理クラス"""
+    """
+    画像管理クラス
 
-    def __init__(self, session_dir: Path):
+    メタデータは metadata.json（スナップショット）と metadata.journal（追記ログ）で構成する。
+    画像の追加はジャーナルへの1行追記で済ませ、編集時にスナップショットへ統合する。
+    収録プロセスと編集UIが同じセッションを同時に扱えるよう、読み書きはファイルロック下で行う。
+    編集は画像のパスを対象とする操作として記録し、保存時に他のプロセスが先にスナップショットを
+    保存していた場合は、最新のスナップショットに操作を適用し直す（他の編集を上書きしない）。
+    """
+
+    def __init__(self, session_dir: Path, enable_undo: bool = True):
         """
         Args:
             session_dir: セッションディレクトリ
+            enable_undo: Undo用の状態保存を行うか（収録時は不要なためFalse）
         """
         self.session_dir = session_dir
+        self.enable_undo = enable_undo
         self.metadata_file = session_dir / "metadata.json"
+        self.journal_file = session_dir / "metadata.journal"
+        self.deleted_file = session_dir / DELETED_FILE
+        self.lock = session_lock(session_dir)
         self.images: List[ImageData] = []
         self.undo_stack: List[List[ImageData]] = []
+        # 変更検知用の状態（スナップショットの識別子・ジャーナルの読み込み位置・同期済みパス）
+        self._snapshot_stamp: Optional[Tuple[int, int, int]] = None
+        self._journal_offset = 0
+        self._synced_paths = set()
+        # 前回の保存以降の編集操作（保存時に最新のスナップショットへ適用し直す）
+        self._ops: List[Tuple[Any, ...]] = []
         self._load_metadata()
 
     def _load_metadata(self):
         """メタデータの読み込み"""
-        if self.metadata_file.exists():
-            with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.images = [ImageData(**item) for item in data]
-        else:
-            # 既存の画像ファイルを自動検出
-            self._auto_detect_images()
+        with self.lock:
+            self.images = []
+            self._journal_offset = 0
+            if self.metadata_file.exists():
+                with open(self.metadata_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    self.images = [ImageData(**item) for item in data]
+            else:
+                # 既存の画像ファイルを自動検出
+                self._auto_detect_images()
+            self._snapshot_stamp = self._stat_snapshot()
+            self._synced_paths = {img.filepath for img in self.images}
+            # スナップショット保存後に追記された画像を反映
+            self._apply_journal_tail()
+
+    def _stat_snapshot(self) -> Optional[Tuple[int, int, int]]:
+        """スナップショットの識別子（更新時刻・サイズ・inode）を取得"""
+        try:
+            st = os.stat(self.metadata_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _read_journal(self, offset: int) -> Tuple[List[ImageData], int]:
+        """
+        ジャーナルを指定位置から読み込み
+
+        Args:
+            offset: 読み込み開始位置（バイト）
+
+        Returns:
+            (追記された画像データのリスト, 次回の読み込み開始位置)
+        """
+        try:
+            size = os.path.getsize(self.journal_file)
+        except FileNotFoundError:
+            return [], 0
+        if size < offset:
+            # 他プロセスがスナップショットへ統合して切り詰めた
+            offset = 0
+        if size == offset:
+            return [], offset
+
+        entries = []
+        with open(self.journal_file, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                # 書き込み途中（クラッシュ時）の不完全な行は読み飛ばす
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    entries.append(ImageData(**json.loads(line)))
+                except (ValueError, TypeError):
+                    continue
+        return entries, offset
+
+    def _apply_journal_tail(self) -> List[ImageData]:
+        """
+        未読のジャーナル行を画像リストへ反映
+
+        Returns:
+            新たに取り込んだ画像データのリスト
+        """
+        entries, self._journal_offset = self._read_journal(self._journal_offset)
+        return self._merge_external([e for e in entries if e.filepath not in self._synced_paths])
+
+    def _merge_external(self, entries: List[ImageData]) -> List[ImageData]:
+        """
+        他プロセスが追加した画像を末尾に取り込み
+
+        Undoで他プロセスの追加まで消えないよう、Undoスタックの各状態にも追加する。
+
+        Args:
+            entries: 取り込む画像データ
+
+        Returns:
+            取り込んだ画像データのリスト
+        """
+        for img in entries:
+            img.order = len(self.images)
+            self.images.append(img)
+            self._synced_paths.add(img.filepath)
+            for state in self.undo_stack:
+                state.append(copy.deepcopy(img))
+        return entries
+
+    def refresh(self) -> List[ImageData]:
+        """
+        他プロセスによる変更を取り込み（変更がなければstatのみで終了）
+
+        Returns:
+            新たに追加された画像データのリスト
+        """
+        with self.lock:
+            if self._stat_snapshot() != self._snapshot_stamp:
+                # 他プロセスが編集内容を保存したため全体を読み直す
+                # （Undoの各状態は他の編集を含まないため、戻すと上書きしてしまうので破棄する）
+                before = {img.filepath for img in self.images}
+                self._load_metadata()
+                self.undo_stack.clear()
+                return [img for img in self.images if img.filepath not in before]
+            return self._apply_journal_tail()
 
     def _auto_detect_images(self):
         """ディレクトリ内の画像を自動検出"""
-        image_files = sorted(self.session_dir.glob("*.png"))
+        image_files = sorted(self.session_dir.glob("*.png"), key=lambda p: capture_sort_key(p.name))
         for i, img_path in enumerate(image_files):
             self.images.append(ImageData(
                 filepath=str(img_path),
@@ -55,36 +394,152 @@ class ImageManager:
             ))
 
     def save_metadata(self):
-        """メタデータの保存"""
-        data = [asdict(img) for img in self.images]
-        with open(self.metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        """
+        メタデータの保存（ジャーナルはスナップショットへ統合して空にする）
+
+        他のプロセスが先にスナップショットを保存していた場合は、それを読み直して
+        前回の保存以降の編集操作を適用し直してから保存する。
+        """
+        with self.lock:
+            if self._stat_snapshot() != self._snapshot_stamp:
+                ops = self._ops
+                self._load_metadata()
+                for op in ops:
+                    self.images = self._apply_op(self.images, op)
+                for i, img in enumerate(self.images):
+                    img.order = i
+                self.undo_stack.clear()
+            else:
+                # 保存前に他プロセスが追加した画像を取り込む（書き込みの消失を防ぐ）
+                self._apply_journal_tail()
+
+            data = [asdict(img) for img in self.images]
+            tmp_file = self.metadata_file.with_name(self.metadata_file.name + ".tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.metadata_file)
+            if self.journal_file.exists():
+                self.journal_file.unlink()
+
+            self._snapshot_stamp = self._stat_snapshot()
+            self._journal_offset = 0
+            self._synced_paths = {img.filepath for img in self.images}
+            self._ops = []
+
+    @staticmethod
+    def _apply_op(images: List[ImageData], op: Tuple[Any, ...]) -> List[ImageData]:
+        """
+        編集操作を画像リストに適用（画像はパスで特定し、見つからない画像への操作は無視）
+
+        Args:
+            images: 画像リスト
+            op: ("add", 画像データ) / ("describe", パス, 説明文) / ("delete", パスの集合) /
+                ("reorder", 新しい順のパスのリスト) / ("restore", Undoで戻す画像リスト)
+
+        Returns:
+            適用後の画像リスト
+        """
+        kind = op[0]
+        if kind == "add":
+            if all(img.filepath != op[1].filepath for img in images):
+                images = images + [copy.deepcopy(op[1])]
+        elif kind == "describe":
+            for img in images:
+                if img.filepath == op[1]:
+                    img.description = op[2]
+        elif kind == "delete":
+            images = [img for img in images if img.filepath not in op[1]]
+        elif kind == "reorder":
+            # 並び替えに含まれない画像（他プロセスが追加した画像）は直前の画像の後ろに置く
+            rank = {path: i for i, path in enumerate(op[1])}
+            keys = []
+            previous = -1
+            for img in images:
+                previous = rank.get(img.filepath, previous)
+                keys.append((previous, img.filepath not in rank))
+            images = [img for _, img in sorted(zip(keys, images), key=lambda pair: pair[0])]
+        elif kind == "restore":
+            images = copy.deepcopy(op[1])
+        return images
+
+    def _edit(self, op: Tuple[Any, ...]):
+        """
+        編集操作を適用して保存（Undo用の状態も記録）
+
+        Args:
+            op: 編集操作（_apply_op() を参照）
+        """
+        with self.lock:
+            self._save_state()
+            self.images = self._apply_op(self.images, op)
+            for i, img in enumerate(self.images):
+                img.order = i
+            self._ops.append(op)
+            self.save_metadata()
+
+    def _append_journal(self, img_data: ImageData):
+        """
+        画像データをジャーナルに1行追記
+
+        Args:
+            img_data: 追記する画像データ
+        """
+        line = (json.dumps(asdict(img_data), ensure_ascii=False) + "\n").encode('utf-8')
+        with open(self.journal_file, 'ab') as f:
+            f.write(line)
+            self._journal_offset = f.tell()
+        self._synced_paths.add(img_data.filepath)
+
+    def _record_deleted(self, images: List[ImageData]):
+        """
+        削除した画像のファイル名を記録に追記
+
+        Args:
+            images: 削除した画像データ
+        """
+        with self.lock:
+            with open(self.deleted_file, 'a', encoding='utf-8') as f:
+                for img in images:
+                    f.write(Path(img.filepath).name + "\n")
 
     def _save_state(self):
         """現在の状態をUndo スタックに保存"""
-        import copy
+        if not self.enable_undo:
+            return
         self.undo_stack.append(copy.deepcopy(self.images))
         # スタックが大きくなりすぎないよう制限
         if len(self.undo_stack) > 50:
             self.undo_stack.pop(0)
 
-    def add_image(self, filepath: Path) -> ImageData:
+    def add_image(self, filepath: Path, click: Optional[Tuple[int, int]] = None, timestamp: str = "") -> ImageData:
         """
         画像を追加
 
         Args:
             filepath: 画像ファイルパス
+            click: 撮影のきっかけになったクリック位置（画像上のピクセル座標）
+            timestamp: 撮影日時（ISO形式、省略時は現在時刻）
 
         Returns:
             追加された画像データ
         """
-        self._save_state()
-        img_data = ImageData(
-            filepath=str(filepath),
-            order=len(self.images)
-        )
-        self.images.append(img_data)
-        self.save_metadata()
+        with self.lock:
+            # 他プロセスの追加分を先に取り込んでから末尾に追加
+            self.refresh()
+            self._save_state()
+            img_data = ImageData(
+                filepath=str(filepath),
+                order=len(self.images),
+                timestamp=timestamp,
+                click_x=click[0] if click else None,
+                click_y=click[1] if click else None
+            )
+            self.images.append(img_data)
+            if self.metadata_file.exists():
+                self._append_journal(img_data)
+            else:
+                self._ops.append(("add", img_data))
+                self.save_metadata()
         return img_data
 
     def update_description(self, index: int, description: str):
@@ -96,9 +551,7 @@ class ImageManager:
             description: 説明文
         """
         if 0 <= index < len(self.images):
-            self._save_state()
-            self.images[index].description = description
-            self.save_metadata()
+            self._edit(("describe", self.images[index].filepath, description))
 
     def delete_image(self, index: int):
         """
@@ -107,26 +560,42 @@ class ImageManager:
         Args:
             index: 画像インデックス
         """
-        if 0 <= index < len(self.images):
-            self._save_state()
-            self.images.pop(index)
-            # orderを再割り当て
-            for i, img in enumerate(self.images):
-                img.order = i
-            self.save_metadata()
+        self.delete_images([index])
+
+    def delete_images(self, indices: Iterable[int]) -> int:
+        """
+        複数の画像をまとめて削除（保存・Undoの記録は1回）
+
+        Args:
+            indices: 画像インデックス（範囲外・重複は無視）
+
+        Returns:
+            削除した枚数
+        """
+        targets = {i for i in indices if 0 <= i < len(self.images)}
+        if not targets:
+            return 0
+        removed = [self.images[i] for i in sorted(targets)]
+        with self.lock:
+            self._record_deleted(removed)
+            self._edit(("delete", {img.filepath for img in removed}))
+        return len(targets)
 
     def reorder_images(self, new_order: List[int]):
         """
-        画像の順序を変更
+        画像の順序を変更（何枚動かしても保存・Undoの記録は1回）
 
         Args:
             new_order: 新しい順序のインデックスリスト
+
+        Raises:
+            ValueError: new_order が現在の画像インデックスの並べ替えになっていない場合
         """
-        self._save_state()
-        self.images = [self.images[i] for i in new_order]
-        for i, img in enumerate(self.images):
-            img.order = i
-        self.save_metadata()
+        if sorted(new_order) != list(range(len(self.images))):
+            raise ValueError(f"並び順には0〜{len(self.images) - 1}の番号を1つずつ指定してください: {new_order}")
+        if new_order == sorted(new_order):
+            return
+        self._edit(("reorder", [self.images[i].filepath for i in new_order]))
 
     def swap_images(self, idx1: int, idx2: int):
         """
@@ -145,14 +614,20 @@ class ImageManager:
         """
         直前の操作を取り消し
 
+        他のプロセスが編集内容を保存していた場合は、それを読み込んでUndoの履歴を破棄する
+        （戻すと他の編集を上書きしてしまうため）。
+
         Returns:
             Undo成功の場合True
         """
-        if self.undo_stack:
+        with self.lock:
+            self.refresh()
+            if not self.undo_stack:
+                return False
             self.images = self.undo_stack.pop()
+            self._ops.append(("restore", copy.deepcopy(self.images)))
             self.save_metadata()
             return True
-        return False
 
     def get_images(self) -> List[ImageData]:
         """
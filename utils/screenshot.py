@@ -1,50 +1,118 @@
 """
 スクリーンショット撮影モジュール
 """
+import io
+import os
 import mss
 from PIL import Image
 from pathlib import Path
+from typing import Optional, Tuple
 from datetime import datetime
 import config
+from utils.blob_store import BlobStore
+from utils.image_manager import parse_capture_counter
+from utils.frame_spill import FrameSpill
 
 
 class ScreenshotCapture:
     """スクリーンショット撮影クラス"""
 
-    def __init__(self, session_dir: Path):
+    def __init__(
+        self,
+        session_dir: Path,
+        blob_store: Optional[BlobStore] = None,
+        start_counter: Optional[int] = None,
+        spill: Optional[FrameSpill] = None
+    ):
         """
         Args:
             session_dir: セッション保存先ディレクトリ
+            blob_store: 重複排除ストア（省略時は config.BLOB_STORE_ENABLED に従う）
+            start_counter: 連番の開始値（省略時は既存ファイルの最大連番の次から）
+            spill: 指定するとエンコードせずに生データをスピルファイルへ追記する（エンコードは後から行う）
         """
         self.session_dir = session_dir
         self.session_dir.mkdir(parents=True, exist_ok=True)
-        self.counter = 0
+        self.counter = next_capture_counter(session_dir) if start_counter is None else start_counter
         self.sct = mss.mss()
+        if blob_store is None and config.BLOB_STORE_ENABLED:
+            blob_store = BlobStore()
+        self.blob_store = blob_store
+        self.spill = spill
 
-    def capture(self) -> Path:
+    def capture(self, click: Optional[Tuple[int, int]] = None) -> Path:
         """
         画面全体のスクリーンショットを撮影
 
+        Args:
+            click: クリック位置（スピル時にフレームと一緒に記録する）
+
         Returns:
-            保存したファイルのパス
+            保存したファイルのパス（スピル時はエンコード後に作成されるパス）
         """
         # タイムスタンプ付きファイル名
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{self.counter:04d}_{timestamp}.{config.SCREENSHOT_FORMAT}"
+        now = datetime.now()
+        filename = f"{self.counter:04d}_{now.strftime('%Y%m%d_%H%M%S')}.{config.SCREENSHOT_FORMAT}"
         filepath = self.session_dir / filename
 
         # スクリーンショット撮影（全モニタ）
         screenshot = self.sct.grab(self.sct.monitors[0])
 
+        if self.spill:
+            # エンコードせず生データを追記
+            self.spill.append(filename, now.isoformat(), screenshot.size, screenshot.bgra, click)
+            self.counter += 1
+            print(f"📸 Screenshot spilled: {filepath.name}")
+            return filepath
+
         # PIL Imageに変換して保存
         img = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
-        img.save(filepath, quality=config.SCREENSHOT_QUALITY)
+        if self.blob_store:
+            # ハッシュ単位で保存し、セッションにはハードリンクを作成
+            buffer = io.BytesIO()
+            img.save(buffer, format=config.SCREENSHOT_FORMAT, quality=config.SCREENSHOT_QUALITY)
+            self.blob_store.store(buffer.getvalue(), filepath)
+        else:
+            img.save(filepath, quality=config.SCREENSHOT_QUALITY)
 
         self.counter += 1
         print(f"📸 Screenshot saved: {filepath.name}")
 
         return filepath
 
+    def to_image_position(self, x: int, y: int) -> Tuple[int, int]:
+        """
+        画面上の座標を撮影画像上のピクセル座標に変換（全モニタの左上が原点）
+
+        Args:
+            x: 画面上のX座標
+            y: 画面上のY座標
+
+        Returns:
+            画像上の座標
+        """
+        monitor = self.sct.monitors[0]
+        return x - monitor["left"], y - monitor["top"]
+
     def close(self):
         """リソースの解放"""
         self.sct.close()
+
+
+def next_capture_counter(session_dir: Path) -> int:
+    """
+    セッション内の既存ファイルから次の連番を取得（収録の再開用）
+
+    Args:
+        session_dir: セッションディレクトリ
+
+    Returns:
+        既存の最大連番 + 1（ファイルがなければ0）
+    """
+    counters = []
+    with os.scandir(session_dir) as entries:
+        for entry in entries:
+            counter = parse_capture_counter(entry.name)
+            if counter is not None:
+                counters.append(counter)
+    return max(counters) + 1 if counters else 0
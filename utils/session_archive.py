@@ -0,0 +1,535 @@
+"""
+セッションの単一ファイルアーカイブモジュール
+
+セッション（画像ファイル群と metadata.json）を無圧縮のZIPファイル1つにまとめる。
+ZIPの中央ディレクトリを索引として、各画像の格納位置をメモリマップ上で直接参照できるため、
+展開せずに必要な画像だけを読み出せる（ZIP形式なので標準のツールでも開ける）。
+
+アーカイブ内の画像は ``<アーカイブのパス>!/<ファイル名>`` 形式のパスで表し、
+image_source() などを通して通常の画像ファイルと同じように扱う。
+"""
+import io
+import os
+import json
+import mmap
+import struct
+import hashlib
+import zipfile
+import tempfile
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+from dataclasses import replace
+from utils.image_manager import ImageData, MetadataWriter, iter_image_entries, session_lock
+
+
+# アーカイブの拡張子
+ARCHIVE_SUFFIX = ".zip"
+
+# アーカイブのパスとアーカイブ内のファイル名の区切り
+MEMBER_SEPARATOR = "!/"
+
+# アーカイブ内のメタデータファイル名
+ARCHIVE_METADATA = "metadata.json"
+
+# ZIPのローカルファイルヘッダー（固定長部分）
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+
+def member_path(archive_path: Path, name: str) -> str:
+    """
+    アーカイブ内の画像を表すパスを作成
+
+    Args:
+        archive_path: アーカイブファイル
+        name: アーカイブ内のファイル名
+
+    Returns:
+        ``<アーカイブのパス>!/<ファイル名>`` 形式のパス
+    """
+    return f"{archive_path}{MEMBER_SEPARATOR}{name}"
+
+
+def split_member_path(path: str) -> Optional[Tuple[Path, str]]:
+    """
+    アーカイブ内の画像を表すパスを分解
+
+    Args:
+        path: 画像のパス
+
+    Returns:
+        (アーカイブファイル, アーカイブ内のファイル名)（通常のファイルパスの場合はNone）
+    """
+    archive, separator, name = str(path).rpartition(MEMBER_SEPARATOR)
+    if not separator or not archive.endswith(ARCHIVE_SUFFIX):
+        return None
+    return Path(archive), name
+
+
+def is_archive(path: Path) -> bool:
+    """セッションアーカイブのファイルかどうか"""
+    path = Path(path)
+    return path.suffix == ARCHIVE_SUFFIX and path.is_file()
+
+
+class SessionArchive:
+    """セッションアーカイブの読み込みクラス（メモリマップによるランダムアクセス）"""
+
+    def __init__(self, archive_path: Path):
+        """
+        Args:
+            archive_path: アーカイブファイル
+
+        Raises:
+            FileNotFoundError: アーカイブが存在しない場合
+            zipfile.BadZipFile: ZIPファイルでない場合
+        """
+        self.archive_path = Path(archive_path)
+        self._readers = 0  # 開いている MemberReader の数（すべて閉じるまでメモリマップを閉じない）
+        self._closing = False
+        self._state_lock = threading.Lock()
+        self._file = open(self.archive_path, 'rb')
+        try:
+            st = os.fstat(self._file.fileno())
+            self.stamp = (st.st_size, st.st_mtime_ns)
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            with zipfile.ZipFile(self._file) as zf:
+                infos = zf.infolist()
+        except Exception:
+            self._file.close()
+            raise
+        # ファイル名 → (データの開始位置, サイズ)（無圧縮で格納されたもののみ）
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._compressed: Dict[str, zipfile.ZipInfo] = {}
+        for info in infos:
+            if info.is_dir():
+                continue
+            if info.compress_type != zipfile.ZIP_STORED:
+                self._compressed[info.filename] = info
+                continue
+            header = _LOCAL_HEADER.unpack_from(self._map, info.header_offset)
+            if header[0] != _LOCAL_HEADER_SIGNATURE:
+                raise zipfile.BadZipFile(f"ローカルヘッダーが壊れています: {info.filename}")
+            name_length, extra_length = header[-2:]
+            offset = info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+            self._index[info.filename] = (offset, info.file_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        メモリマップとファイルを閉じる
+
+        image_source() が返した読み込み元が開いている場合は、最後の1つが閉じられた時点で閉じる。
+        """
+        with self._state_lock:
+            self._closing = True
+            if self._readers == 0:
+                self._close_map()
+
+    def _close_map(self):
+        """メモリマップとファイルを閉じる（view() の参照が残っている場合はガベージコレクションに任せる）"""
+        try:
+            self._map.close()
+        except BufferError:
+            return
+        self._file.close()
+
+    def open_member(self, name: str) -> "MemberReader":
+        """
+        アーカイブ内のファイルをコピーせずに読み込むファイルオブジェクトを開く（無圧縮で格納されたもののみ）
+
+        Args:
+            name: アーカイブ内のファイル名
+
+        Returns:
+            メモリマップ上の内容を読み込む MemberReader
+
+        Raises:
+            KeyError: 無圧縮で格納されたファイルがない場合
+        """
+        with self._state_lock:
+            if self._closing:
+                raise ValueError(f"閉じたアーカイブです: {self.archive_path}")
+            reader = MemberReader(self, self.view(name))
+            self._readers += 1
+        return reader
+
+    def _release_reader(self):
+        """MemberReader が閉じられたときに呼ばれる"""
+        with self._state_lock:
+            self._readers -= 1
+            if self._closing and self._readers == 0:
+                self._close_map()
+
+    @property
+    def names(self) -> List[str]:
+        """アーカイブ内のファイル名のリスト"""
+        return list(self._index) + list(self._compressed)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index or name in self._compressed
+
+    def is_stored(self, name: str) -> bool:
+        """無圧縮で格納されている（view() で参照できる）かどうか"""
+        return name in self._index
+
+    def size(self, name: str) -> int:
+        """
+        アーカイブ内のファイルのサイズ
+
+        Args:
+            name: アーカイブ内のファイル名
+
+        Returns:
+            展開後のバイト数
+
+        Raises:
+            KeyError: ファイルがない場合
+        """
+        if name in self._index:
+            return self._index[name][1]
+        return self._compressed[name].file_size
+
+    def view(self, name: str) -> memoryview:
+        """
+        アーカイブ内のファイルの内容をコピーせずに参照（無圧縮で格納されたもののみ）
+
+        アーカイブを閉じる前に release() すること（with 文で使う）。
+
+        Args:
+            name: アーカイブ内のファイル名
+
+        Returns:
+            メモリマップ上の内容
+
+        Raises:
+            KeyError: 無圧縮で格納されたファイルがない場合
+        """
+        offset, size = self._index[name]
+        return memoryview(self._map)[offset:offset + size]
+
+    def read(self, name: str) -> bytes:
+        """
+        アーカイブ内のファイルの内容を読み込み（圧縮されたファイルは展開する）
+
+        Args:
+            name: アーカイブ内のファイル名
+
+        Returns:
+            ファイルの内容
+
+        Raises:
+            KeyError: ファイルがない場合
+        """
+        if name in self._index:
+            offset, size = self._index[name]
+            return self._map[offset:offset + size]
+        with zipfile.ZipFile(self._file) as zf:
+            return zf.read(self._compressed[name])
+
+    def images(self) -> List[ImageData]:
+        """
+        アーカイブ内のメタデータから画像データを作成
+
+        Returns:
+            アーカイブ内の画像を表すパスを持つ画像データのリスト
+        """
+        items = json.loads(self.read(ARCHIVE_METADATA)) if ARCHIVE_METADATA in self else []
+        images = []
+        for item in items:
+            img = ImageData(**item)
+            name = img.filepath
+            images.append(replace(
+                img,
+                filepath=member_path(self.archive_path, name),
+                missing=img.missing or name not in self
+            ))
+        return images
+
+
+class MemberReader(io.RawIOBase):
+    """
+    アーカイブ内のファイルをメモリマップ上で直接読み込むファイルオブジェクト
+
+    Image.open() や python-pptx の add_picture() に渡せる（読み込み時のみコピーする）。
+    """
+
+    def __init__(self, archive: SessionArchive, view: memoryview):
+        """
+        Args:
+            archive: 読み込み元のアーカイブ
+            view: メモリマップ上の内容
+        """
+        super().__init__()
+        self._archive = archive
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def read(self, size: int = -1) -> bytes:
+        if self.closed:
+            raise ValueError("閉じたファイルです")
+        end = len(self._view) if size is None or size < 0 else min(self._pos + size, len(self._view))
+        data = self._view[self._pos:end].tobytes()
+        self._pos = max(self._pos, end)
+        return data
+
+    def readall(self) -> bytes:
+        return self.read(-1)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError(f"負の位置には移動できません: {offset}")
+        self._pos = offset
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def getbuffer(self) -> memoryview:
+        """内容全体をコピーせずに参照（ZIPへの書き込み用、このファイルを閉じる前に手放すこと）"""
+        return self._view
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+            self._archive._release_reader()
+        super().close()
+
+
+# プロセスごとに開いたアーカイブ（(パス, サイズ, 更新時刻) → SessionArchive、最近使った順）
+_open_archives: "OrderedDict[Tuple[str, int, int], SessionArchive]" = OrderedDict()
+_open_archives_lock = threading.Lock()
+
+# 同時に開いておくアーカイブの数
+MAX_OPEN_ARCHIVES = 8
+
+
+def open_archive(archive_path: Path) -> SessionArchive:
+    """
+    アーカイブを開く（同じプロセス内では開いたものを再利用）
+
+    差し替えられたアーカイブ（サイズ・更新時刻が変わった）と、開いている数の上限を超えて
+    最も長く使われていないアーカイブは閉じる（Windowsで書き出し直し・削除ができるよう）。
+
+    Args:
+        archive_path: アーカイブファイル
+
+    Returns:
+        SessionArchive（呼び出し側で閉じないこと）
+
+    Raises:
+        FileNotFoundError: アーカイブが存在しない場合
+    """
+    path = str(Path(archive_path).resolve())
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    with _open_archives_lock:
+        archive = _open_archives.get(key)
+        if archive is not None:
+            _open_archives.move_to_end(key)
+            return archive
+        _close_cached(path)
+        archive = SessionArchive(Path(path))
+        _open_archives[key] = archive
+        while len(_open_archives) > MAX_OPEN_ARCHIVES:
+            _open_archives.popitem(last=False)[1].close()
+        return archive
+
+
+def close_archive(archive_path: Path) -> None:
+    """
+    プロセス内で開いているアーカイブを閉じる（アーカイブの書き出し直し・削除の前に呼ぶ）
+
+    Args:
+        archive_path: アーカイブファイル
+    """
+    with _open_archives_lock:
+        _close_cached(str(Path(archive_path).resolve()))
+
+
+def _close_cached(path: str) -> None:
+    """指定したパスのアーカイブをキャッシュから外して閉じる（_open_archives_lock を保持して呼ぶ）"""
+    for key in [key for key in _open_archives if key[0] == path]:
+        _open_archives.pop(key).close()
+
+
+def image_source(path: str) -> Union[str, BinaryIO]:
+    """
+    Image.open() や python-pptx の add_picture() に渡せる画像の読み込み元
+
+    Args:
+        path: 画像ファイルパス、またはアーカイブ内の画像を表すパス
+
+    Returns:
+        通常のファイルはパスそのもの、アーカイブ内の画像はメモリマップ上の内容を読み込むファイルオブジェクト
+        （圧縮されて格納された画像のみ展開した内容）
+
+    Raises:
+        FileNotFoundError: 画像が存在しない場合
+    """
+    member = split_member_path(path)
+    if member is None:
+        return path
+    archive_path, name = member
+    archive = open_archive(archive_path)
+    try:
+        if not archive.is_stored(name):
+            return io.BytesIO(archive.read(name))
+        try:
+            return archive.open_member(name)
+        except ValueError:
+            # 開いた直後に他のスレッドが差し替え・上限超過で閉じた
+            return open_archive(archive_path).open_member(name)
+    except KeyError:
+        raise FileNotFoundError(f"アーカイブ内に画像がありません: {path}") from None
+
+
+def source_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """
+    画像のサイズと更新時刻（キャッシュの無効化判定用）
+
+    アーカイブ内の画像はアーカイブ自体の更新時刻を使う。
+
+    Args:
+        path: 画像ファイルパス、またはアーカイブ内の画像を表すパス
+
+    Returns:
+        (サイズ, 更新時刻ns)（存在しない場合はNone）
+    """
+    member = split_member_path(path)
+    try:
+        if member is None:
+            st = os.stat(path)
+            return st.st_size, st.st_mtime_ns
+        archive = open_archive(member[0])
+        return archive.size(member[1]), archive.stamp[1]
+    except (FileNotFoundError, KeyError):
+        return None
+
+
+def source_exists(path: str) -> bool:
+    """画像（アーカイブ内の画像を含む）が存在するかどうか"""
+    return source_stamp(path) is not None
+
+
+def source_digest(path: str) -> Optional[str]:
+    """
+    アーカイブ内の画像の内容のSHA-256ハッシュ（メモリマップから直接計算）
+
+    Args:
+        path: アーカイブ内の画像を表すパス
+
+    Returns:
+        16進文字列のハッシュ値（通常のファイルパスの場合はNone）
+
+    Raises:
+        FileNotFoundError: アーカイブ内に画像がない場合
+    """
+    member = split_member_path(path)
+    if member is None:
+        return None
+    archive = open_archive(member[0])
+    try:
+        if not archive.is_stored(member[1]):
+            return hashlib.sha256(archive.read(member[1])).hexdigest()
+        with archive.view(member[1]) as data:
+            return hashlib.sha256(data).hexdigest()
+    except KeyError:
+        raise FileNotFoundError(f"アーカイブ内に画像がありません: {path}") from None
+
+
+def export_session(session_dir: Path, archive_path: Path) -> int:
+    """
+    セッションを1つのアーカイブファイルに書き出し
+
+    画像は無圧縮で格納する（PNGは圧縮済みのため容量はほぼ変わらず、メモリマップで直接参照できる）。
+    書き出し中はセッションをロックし、一時ファイル経由で置き換える。
+
+    Args:
+        session_dir: セッションディレクトリ
+        archive_path: 作成するアーカイブファイル
+
+    Returns:
+        格納した画像数
+    """
+    session_dir = Path(session_dir)
+    archive_path = Path(archive_path)
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = archive_path.with_name(f"{archive_path.name}.{os.getpid()}.tmp")
+
+    try:
+        with session_lock(session_dir), tempfile.TemporaryDirectory(prefix="archive_") as work_dir:
+            metadata_file = Path(work_dir) / ARCHIVE_METADATA
+            count = 0
+            with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+                with MetadataWriter(metadata_file) as metadata:
+                    for img in iter_image_entries(session_dir):
+                        src = Path(img.filepath)
+                        if img.missing or not src.exists():
+                            metadata.append(replace(img, filepath=src.name, missing=True))
+                            continue
+                        zf.write(src, src.name)
+                        metadata.append(replace(img, filepath=src.name))
+                        count += 1
+                # メタデータは画像の後ろに格納（画像を逐次書き出しながら作成するため）
+                zf.write(metadata_file, ARCHIVE_METADATA)
+        # 開いたままのアーカイブがあると置き換えられない（Windows）
+        close_archive(archive_path)
+        os.replace(tmp_path, archive_path)
+    finally:
+        Path(tmp_path).unlink(missing_ok=True)
+    return count
+
+
+def import_archive(archive_path: Path, dest_dir: Path) -> int:
+    """
+    アーカイブを展開して編集できるセッションを作成
+
+    Args:
+        archive_path: アーカイブファイル
+        dest_dir: 作成するセッションディレクトリ（未作成であること）
+
+    Returns:
+        展開した画像数
+
+    Raises:
+        FileExistsError: dest_dir が既に存在する場合
+    """
+    dest_dir = Path(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=False)
+    count = 0
+    with SessionArchive(archive_path) as archive, MetadataWriter(dest_dir / "metadata.json") as metadata:
+        for img in archive.images():
+            name = Path(split_member_path(img.filepath)[1]).name  # アーカイブ外への書き込みを防ぐ
+            dest = dest_dir / name
+            if not img.missing:
+                if archive.is_stored(name):
+                    with archive.view(name) as data, open(dest, 'wb') as f:
+                        f.write(data)
+                else:
+                    dest.write_bytes(archive.read(name))
+                count += 1
+            metadata.append(replace(img, filepath=str(dest)))
+    return count
@@ -0,0 +1,274 @@
+"""
+セッション一覧のインデックスモジュール
+
+セッションごとの概要（更新時刻・画像数・合計サイズ・先頭画像）を1つのJSONファイルに保持する。
+収録プロセスは撮影のたびにジャーナル（インデックスの横の追記ログ）へ1行追記するだけで、
+インデックス本体は refresh() / update() で書き直すときにジャーナルを統合する。
+編集UIはセッションディレクトリの更新時刻が変わったとき（セッションの追加・削除時）だけ新しいセッションを走査する。
+"""
+import os
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, asdict
+import config
+from utils.file_lock import FileLock
+from utils.image_manager import iter_image_entries
+
+
+INDEX_VERSION = 1
+
+
+@dataclass
+class SessionEntry:
+    """セッションの概要データクラス"""
+    name: str
+    mtime: float = 0.0  # 最終更新時刻（UNIX時刻）
+    image_count: int = 0
+    total_bytes: int = 0
+    first_image: Optional[str] = None  # 先頭画像のパス（一覧のサムネイル用）
+
+    def matches(self, query: str) -> bool:
+        """セッション名に検索語（大文字・小文字を区別しない）を含むかどうか"""
+        return query.casefold() in self.name.casefold()
+
+
+def _mtime(path: Path) -> float:
+    """ファイルの更新時刻（存在しない場合は0）"""
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+def scan_session(session_dir: Path) -> SessionEntry:
+    """
+    セッションディレクトリを走査して概要を作成
+
+    Args:
+        session_dir: セッションディレクトリ
+
+    Returns:
+        セッションの概要
+    """
+    session_dir = Path(session_dir)
+    entry = SessionEntry(
+        name=session_dir.name,
+        mtime=max(
+            _mtime(session_dir),
+            _mtime(session_dir / "metadata.json"),
+            _mtime(session_dir / "metadata.journal")
+        )
+    )
+    for img in iter_image_entries(session_dir):
+        if entry.first_image is None:
+            entry.first_image = img.filepath
+        entry.image_count += 1
+        try:
+            entry.total_bytes += os.stat(img.filepath).st_size
+        except FileNotFoundError:
+            continue
+    return entry
+
+
+class SessionIndex:
+    """セッション一覧のインデックスクラス"""
+
+    def __init__(self, sessions_dir: Optional[Path] = None, index_file: Optional[Path] = None):
+        """
+        Args:
+            sessions_dir: セッションの親ディレクトリ（省略時は config.SESSIONS_DIR）
+            index_file: インデックスファイル（省略時は config.SESSION_INDEX_FILE）
+        """
+        self.sessions_dir = Path(sessions_dir) if sessions_dir else config.SESSIONS_DIR
+        self.index_file = Path(index_file) if index_file else config.SESSION_INDEX_FILE
+        self.journal_file = self.index_file.with_name(self.index_file.name + ".journal")
+        self.lock = FileLock(self.index_file.with_name(self.index_file.name + ".lock"))
+        self.sessions: Dict[str, SessionEntry] = {}
+        self._sessions_mtime_ns = 0  # 最後に走査したときのセッションディレクトリの更新時刻
+        self._file_stamp: Optional[Tuple[int, int]] = None
+        self._journal_offset = 0  # ジャーナルの統合済みの位置（バイト）
+        self._load()
+
+    def _stat_index(self) -> Optional[Tuple[int, int]]:
+        """インデックスファイルのサイズと更新時刻"""
+        try:
+            st = os.stat(self.index_file)
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _load(self):
+        """インデックスファイルを読み込み、ジャーナルを統合（壊れている場合は空から作り直す）"""
+        self._file_stamp = self._stat_index()
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        if data.get("version") != INDEX_VERSION:
+            data = {}
+        self._sessions_mtime_ns = data.get("sessions_mtime_ns", 0)
+        self.sessions = {
+            name: SessionEntry(**item) for name, item in data.get("sessions", {}).items()
+        }
+        self._journal_offset = 0
+        self._apply_journal_tail()
+
+    def _save(self):
+        """インデックスファイルを保存（一時ファイル経由、統合済みのジャーナルは削除）"""
+        data = {
+            "version": INDEX_VERSION,
+            "sessions_mtime_ns": self._sessions_mtime_ns,
+            "sessions": {name: asdict(entry) for name, entry in self.sessions.items()},
+        }
+        tmp_file = self.index_file.with_name(f"{self.index_file.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_file, self.index_file)
+        self.journal_file.unlink(missing_ok=True)
+        self._journal_offset = 0
+        self._file_stamp = self._stat_index()
+
+    def _apply_journal_tail(self):
+        """ジャーナルの未統合の行を概要に反映"""
+        try:
+            size = os.path.getsize(self.journal_file)
+        except FileNotFoundError:
+            self._journal_offset = 0
+            return
+        if size < self._journal_offset:
+            # 他プロセスがインデックスへ統合して作り直した
+            self._journal_offset = 0
+        if size == self._journal_offset:
+            return
+        with open(self.journal_file, 'rb') as f:
+            f.seek(self._journal_offset)
+            for line in f:
+                # 書き込み途中（クラッシュ時）の不完全な行は読み飛ばす
+                if not line.endswith(b"\n"):
+                    break
+                self._journal_offset += len(line)
+                try:
+                    item = json.loads(line)
+                    self._apply_capture(item["session"], item["filepath"], item["size"], item["mtime"])
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+    def _apply_capture(self, name: str, filepath: str, size: int, mtime: float):
+        """撮影した画像1枚分を概要に加える"""
+        entry = self.sessions.get(name)
+        if entry is None:
+            self.sessions[name] = scan_session(self.sessions_dir / name)
+        # 項目の更新時刻が画像より新しい場合は、撮影後に走査して数え済み
+        elif mtime > entry.mtime:
+            entry.image_count += 1
+            entry.total_bytes += size
+            entry.first_image = entry.first_image or filepath
+            entry.mtime = mtime
+
+    def _reload_if_changed(self):
+        """他プロセスによるインデックスの保存・ジャーナルへの追記を取り込む（変更がなければstatのみ）"""
+        if self._stat_index() != self._file_stamp:
+            self._load()
+        else:
+            self._apply_journal_tail()
+
+    def refresh(self, full: bool = False) -> bool:
+        """
+        インデックスを最新の状態にする
+
+        セッションディレクトリの更新時刻が前回の走査時と同じなら、追加・削除されたセッションはないため
+        インデックスファイルのstatだけで終了する。
+
+        Args:
+            full: 全セッションを走査し直すかどうか
+
+        Returns:
+            インデックスを更新したかどうか
+        """
+        mtime_ns = os.stat(self.sessions_dir).st_mtime_ns
+        with self.lock:
+            self._reload_if_changed()
+            if not full and mtime_ns == self._sessions_mtime_ns:
+                return False
+
+            with os.scandir(self.sessions_dir) as entries:
+                names = {entry.name for entry in entries if entry.is_dir()}
+            for name in set(self.sessions) - names:
+                del self.sessions[name]
+            for name in names:
+                if full or name not in self.sessions:
+                    self.sessions[name] = scan_session(self.sessions_dir / name)
+            self._sessions_mtime_ns = mtime_ns
+            self._save()
+        return True
+
+    def update(self, session_dir: Path) -> SessionEntry:
+        """
+        1セッション分の概要を走査し直す（編集・結合・分割の後に使う）
+
+        Args:
+            session_dir: セッションディレクトリ
+
+        Returns:
+            更新後の概要
+        """
+        entry = scan_session(session_dir)
+        with self.lock:
+            self._reload_if_changed()
+            self.sessions[entry.name] = entry
+            self._save()
+        return entry
+
+    def record_capture(self, session_dir: Path, filepath: Path) -> SessionEntry:
+        """
+        撮影した画像1枚分を概要に加える（ディレクトリは走査せず、ジャーナルへの1行追記のみ）
+
+        Args:
+            session_dir: セッションディレクトリ
+            filepath: 撮影した画像のパス
+
+        Returns:
+            更新後の概要
+        """
+        st = os.stat(filepath)
+        session_dir = Path(session_dir)
+        line = json.dumps({
+            "session": session_dir.name,
+            "filepath": str(filepath),
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+        }, ensure_ascii=False) + "\n"
+        with self.lock:
+            self._reload_if_changed()
+            if session_dir.name not in self.sessions:
+                # 最初の撮影ではセッションを走査して項目を作る（インデックスも書き直す）
+                self.sessions[session_dir.name] = scan_session(session_dir)
+                self._save()
+                return self.sessions[session_dir.name]
+            with open(self.journal_file, 'ab') as f:
+                f.write(line.encode('utf-8'))
+            self._apply_journal_tail()
+        return self.sessions[session_dir.name]
+
+    def get(self, name: str) -> Optional[SessionEntry]:
+        """セッション名に対応する概要を取得"""
+        return self.sessions.get(name)
+
+    def search(self, query: str = "", min_images: int = 0) -> List[SessionEntry]:
+        """
+        セッションを検索（新しい順）
+
+        Args:
+            query: セッション名に含まれる文字列（空文字列ですべて）
+            min_images: 画像数の下限
+
+        Returns:
+            条件に合うセッションの概要のリスト
+        """
+        results = [
+            entry for entry in self.sessions.values()
+            if entry.image_count >= min_images and entry.matches(query)
+        ]
+        return sorted(results, key=lambda entry: (entry.mtime, entry.name), reverse=True)
@@ -0,0 +1,178 @@
+"""
+セッションの結合・分割モジュール
+
+画像データは1件ずつ逐次処理し、画像ファイルはバイト列をコピーせず
+移動またはハードリンクで受け渡すため、セッションの大きさに関わらずメモリ使用量は一定。
+"""
+import os
+import shutil
+from pathlib import Path
+from typing import List
+from dataclasses import replace
+from contextlib import ExitStack
+import config
+from utils.image_manager import (
+    ImageData,
+    MetadataWriter,
+    iter_image_entries,
+    parse_capture_counter,
+    session_lock,
+)
+from utils.blob_store import BlobStore
+
+
+# ファイルの受け渡し方法
+MODE_LINK = "link"  # ハードリンク（元セッションはそのまま）
+MODE_MOVE = "move"  # 移動（元セッションから取り除く）
+
+
+def resolve_session(name: str) -> Path:
+    """
+    セッション名またはパスからセッションディレクトリを解決
+
+    Args:
+        name: セッション名（config.SESSIONS_DIR 配下）またはディレクトリのパス
+
+    Returns:
+        セッションディレクトリ
+
+    Raises:
+        FileNotFoundError: セッションが存在しない場合
+    """
+    session_dir = Path(name)
+    if not session_dir.is_dir():
+        session_dir = config.SESSIONS_DIR / name
+    if not session_dir.is_dir():
+        raise FileNotFoundError(f"セッションが見つかりません: {name}")
+    return session_dir
+
+
+def _renumbered_name(filename: str, counter: int) -> str:
+    """連番部分を振り直したファイル名（``0003_20240101_120000.png`` → ``0012_20240101_120000.png``）"""
+    if parse_capture_counter(filename) is None:
+        return f"{counter:04d}_{filename}"
+    return f"{counter:04d}_{filename.split('_', 1)[1]}"
+
+
+def _transfer(img: ImageData, dest_dir: Path, counter: int, mode: str) -> ImageData:
+    """
+    画像ファイルを受け渡し（バイト列のコピーは別ファイルシステム時のみ）
+
+    Args:
+        img: 元の画像データ
+        dest_dir: 受け渡し先セッションディレクトリ
+        counter: 受け渡し先での連番
+        mode: MODE_LINK または MODE_MOVE
+
+    Returns:
+        受け渡し先のパスを持つ画像データ
+    """
+    src = Path(img.filepath)
+    dest = dest_dir / _renumbered_name(src.name, counter)
+    if img.missing or not src.exists():
+        return replace(img, filepath=str(dest), missing=True)
+
+    if mode == MODE_MOVE:
+        try:
+            os.replace(src, dest)
+        except OSError:
+            shutil.move(src, dest)
+    else:
+        try:
+            os.link(src, dest)
+        except OSError:
+            shutil.copy2(src, dest)
+    return replace(img, filepath=str(dest))
+
+
+def _discard_journal(session_dir: Path) -> None:
+    """スナップショットへ書き出し済みのジャーナルを削除"""
+    journal_file = session_dir / "metadata.journal"
+    if journal_file.exists():
+        journal_file.unlink()
+
+
+def _release_blobs(sessions: List[Path]) -> None:
+    """
+    移動元セッションに残った削除済み画像のリンクを外し、参照のなくなったブロブを回収
+
+    Args:
+        sessions: 画像を移動した元セッションディレクトリ
+    """
+    if not config.BLOB_STORE_ENABLED:
+        return
+    store = BlobStore()
+    for session_dir in sessions:
+        store.prune_session(session_dir)
+    store.gc()
+
+
+def merge_sessions(sources: List[Path], dest_dir: Path, mode: str = MODE_LINK) -> int:
+    """
+    複数のセッションを順番に結合して新しいセッションを作成
+
+    Args:
+        sources: 結合するセッションディレクトリ（この順に並ぶ）
+        dest_dir: 作成するセッションディレクトリ（未作成であること）
+        mode: MODE_LINK（元セッションを残す）または MODE_MOVE（元セッションから移動）
+
+    Returns:
+        結合後の画像数
+    """
+    sources = [Path(source) for source in sources]
+    dest_dir = Path(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=False)
+
+    with ExitStack() as stack:
+        for source in sources:
+            stack.enter_context(session_lock(source))
+
+        with MetadataWriter(dest_dir / "metadata.json") as merged:
+            for source in sources:
+                for img in iter_image_entries(source):
+                    merged.append(_transfer(img, dest_dir, merged.count, mode))
+
+        if mode == MODE_MOVE:
+            # 画像を移動し終えたセッションは空にする
+            for source in sources:
+                with MetadataWriter(source / "metadata.json"):
+                    pass
+                _discard_journal(source)
+    if mode == MODE_MOVE:
+        _release_blobs(sources)
+    return merged.count
+
+
+def split_session(source: Path, index: int, dest_dir: Path) -> int:
+    """
+    セッションを指定位置で2つに分割（index以降の画像を新しいセッションへ移動）
+
+    元セッションに残したファイルは復旧処理で孤立ファイルとして再登録されるため、
+    分割では常にファイルを移動する。
+
+    Args:
+        source: 分割するセッションディレクトリ
+        index: 新しいセッションに移す最初の画像のインデックス（0始まり）
+        dest_dir: 作成するセッションディレクトリ（未作成であること）
+
+    Returns:
+        新しいセッションに移した画像数
+    """
+    source = Path(source)
+    dest_dir = Path(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=False)
+    metadata_file = source / "metadata.json"
+    tmp_file = metadata_file.with_name(metadata_file.name + ".tmp")
+
+    with session_lock(source):
+        with MetadataWriter(tmp_file) as head, MetadataWriter(dest_dir / "metadata.json") as tail:
+            for i, img in enumerate(iter_image_entries(source)):
+                if i < index:
+                    head.append(img)
+                else:
+                    tail.append(_transfer(img, dest_dir, tail.count, MODE_MOVE))
+
+        os.replace(tmp_file, metadata_file)
+        _discard_journal(source)
+    _release_blobs([source])
+    return tail.count
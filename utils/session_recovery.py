@@ -0,0 +1,181 @@
+"""
+クラッシュ後のセッション復旧モジュール
+（画像ファイルとメタデータの突き合わせ）
+"""
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+from dataclasses import dataclass, field
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import config
+from utils.image_manager import (
+    ImageManager, ImageData, parse_capture_counter, capture_sort_key, read_deleted_names
+)
+from utils.frame_spill import encode_spill, pending_filenames
+
+
+@dataclass
+class RecoveryReport:
+    """復旧結果データクラス"""
+    session_dir: Path
+    restored: List[str] = field(default_factory=list)  # メタデータに復元した画像
+    missing: List[str] = field(default_factory=list)   # ファイルが見つからない画像
+    relocated: List[str] = field(default_factory=list)  # セッションの移動に合わせてパスを付け替えた画像
+    error: str = ""
+
+    @property
+    def changed(self) -> bool:
+        """メタデータを更新したかどうか"""
+        return bool(self.restored or self.missing or self.relocated)
+
+
+def _timestamp_from_filename(filename: str) -> str:
+    """ファイル名の撮影日時（``0001_20240101_120000.png``）をISO形式に変換"""
+    try:
+        stamp = "_".join(Path(filename).stem.split("_")[1:3])
+        return datetime.strptime(stamp, "%Y%m%d_%H%M%S").isoformat()
+    except ValueError:
+        return ""
+
+
+def _merge_orphans(images: List[ImageData], orphans: List[str], session_dir: Path) -> List[ImageData]:
+    """
+    孤立ファイルを、連番が直前となる画像の後ろに挿入した画像リストを作成
+
+    画像と孤立ファイルをそれぞれ連番順に並べて1回の走査で挿入位置を求める。
+    連番のない孤立ファイルは末尾に追加する。
+
+    Args:
+        images: 現在の画像リスト（ユーザーが並び替えた順）
+        orphans: 孤立ファイルのファイル名（撮影順）
+        session_dir: セッションディレクトリ
+
+    Returns:
+        孤立ファイルを挿入した画像リスト
+    """
+    numbered = []
+    for i, img in enumerate(images):
+        counter = parse_capture_counter(Path(img.filepath).name)
+        if counter is not None:
+            numbered.append((counter, i))
+    numbered.sort()
+    inserts: Dict[int, List[ImageData]] = {}
+    j = 0
+    position = 0
+    for name in orphans:
+        counter = parse_capture_counter(name)
+        if counter is None:
+            position = len(images)
+        else:
+            # 連番が小さい画像のうち、リスト上で最も後ろにある画像の直後
+            while j < len(numbered) and numbered[j][0] < counter:
+                position = max(position, numbered[j][1] + 1)
+                j += 1
+        inserts.setdefault(position, []).append(ImageData(
+            filepath=str(session_dir / name),
+            timestamp=_timestamp_from_filename(name)
+        ))
+
+    merged = []
+    for i, img in enumerate(images):
+        merged.extend(inserts.get(i, ()))
+        merged.append(img)
+    merged.extend(inserts.get(len(images), ()))
+    return merged
+
+
+def recover_session(session_dir: Path) -> RecoveryReport:
+    """
+    セッションディレクトリの内容とメタデータを1回のscandirで突き合わせて復旧
+
+    - メタデータにない画像（孤立ファイル）は連番に従って撮影順の位置に復元（編集UIで削除した画像は除く）
+    - 画像はファイル名で突き合わせ、移動・名前変更したセッションではパスをセッションディレクトリに付け替える
+    - ファイルが存在しない画像は missing フラグを立てる（再出現時は解除）
+
+    Args:
+        session_dir: セッションディレクトリ
+
+    Returns:
+        復旧結果
+    """
+    session_dir = Path(session_dir)
+    report = RecoveryReport(session_dir=session_dir)
+    suffix = f".{config.SCREENSHOT_FORMAT}"
+
+    # 後からエンコードする収録の残りのフレームを画像にして登録（収録中の場合は収録プロセスに任せる）
+    try:
+        encode_spill(session_dir)
+    except TimeoutError:
+        pass
+
+    with os.scandir(session_dir) as entries:
+        present = {entry.name for entry in entries if entry.name.endswith(suffix) and entry.is_file()}
+    # 収録中にエンコードされた画像はクリック位置とともに収録プロセスが登録する
+    present -= pending_filenames(session_dir)
+
+    manager = ImageManager(session_dir)
+    with manager.lock:
+        manager.refresh()
+        images = manager.images
+        known = read_deleted_names(session_dir)
+        changed = False
+
+        for img in images:
+            path = Path(img.filepath)
+            known.add(path.name)
+            if path.name in present:
+                exists = True
+                if path.parent != session_dir and not path.exists():
+                    # セッションの移動・名前変更で古い場所を指している
+                    img.filepath = str(session_dir / path.name)
+                    report.relocated.append(path.name)
+                    changed = True
+            else:
+                # セッション外を参照する画像のみ個別に確認
+                exists = path.parent != session_dir and path.exists()
+            if img.missing != (not exists):
+                img.missing = not exists
+                changed = True
+                if img.missing:
+                    report.missing.append(path.name)
+
+        orphans = sorted(present - known, key=capture_sort_key)
+        if orphans:
+            images = manager.images = _merge_orphans(images, orphans, session_dir)
+            report.restored.extend(orphans)
+
+        if report.restored or changed:
+            for i, img in enumerate(images):
+                img.order = i
+            manager.save_metadata()
+
+    return report
+
+
+def recover_all_sessions(
+    sessions_dir: Optional[Path] = None,
+    max_workers: Optional[int] = None
+) -> List[RecoveryReport]:
+    """
+    全セッションを並列に復旧
+
+    Args:
+        sessions_dir: セッションの親ディレクトリ（省略時は config.SESSIONS_DIR）
+        max_workers: 並列数（省略時は ThreadPoolExecutor の既定値）
+
+    Returns:
+        セッションごとの復旧結果
+    """
+    sessions_dir = Path(sessions_dir) if sessions_dir else config.SESSIONS_DIR
+    with os.scandir(sessions_dir) as entries:
+        session_dirs = sorted(Path(entry.path) for entry in entries if entry.is_dir())
+
+    def _recover(session_dir: Path) -> RecoveryReport:
+        try:
+            return recover_session(session_dir)
+        except Exception as e:
+            return RecoveryReport(session_dir=session_dir, error=str(e))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_recover, session_dirs))
@@ -0,0 +1,208 @@
+"""
+サムネイルキャッシュモジュール
+
+編集UIの画像グリッドに表示する縮小画像を作成してディスクに保存する。
+キーは元画像のパス・サイズ・更新時刻と縮小設定のため、画像が差し替えられると自動的に作り直される。
+使うたびにサムネイルの更新時刻を進め、上限サイズを超えたら最後に使った時刻の古いものから削除する
+（削除・差し替えられた画像の古いサムネイルもいずれ削除される）。
+"""
+import os
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from PIL import Image
+import config
+
+
+# 保存形式ごとの拡張子
+FORMAT_SUFFIXES = {"webp": ".webp", "jpeg": ".jpg", "png": ".png"}
+
+
+def make_thumbnail(src: Path, dest: Path, width: int, image_format: str, quality: int) -> Path:
+    """
+    縮小画像を作成（一時ファイル経由で書き込み）
+
+    Args:
+        src: 元画像のパス
+        dest: 縮小画像の保存先
+        width: 最大幅（元画像より大きくはしない）
+        image_format: 保存形式（webp / jpeg / png）
+        quality: 品質
+
+    Returns:
+        縮小画像のパス
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest.with_name(f"{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    with Image.open(src) as img:
+        # JPEGは縮小しながら読み込む
+        img.draft("RGB", (width, width * img.height // max(img.width, 1)))
+        img = img.convert("RGB")
+        img.thumbnail((width, img.height), Image.LANCZOS)
+        img.save(tmp_path, format=image_format.upper(), quality=quality)
+    os.replace(tmp_path, dest)
+    return dest
+
+
+class ThumbnailCache:
+    """サムネイルキャッシュクラス"""
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        width: Optional[int] = None,
+        image_format: Optional[str] = None,
+        quality: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        max_bytes: Optional[int] = None
+    ):
+        """
+        Args:
+            cache_dir: キャッシュディレクトリ（省略時は config.THUMBNAIL_DIR）
+            width: サムネイルの最大幅（省略時は config.THUMBNAIL_WIDTH）
+            image_format: 保存形式（省略時は config.THUMBNAIL_FORMAT）
+            quality: 品質（省略時は config.THUMBNAIL_QUALITY）
+            max_workers: 作成に使うスレッド数（省略時は config.THUMBNAIL_WORKERS）
+            max_bytes: キャッシュの上限サイズ（省略時は config.THUMBNAIL_MAX_BYTES）
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else config.THUMBNAIL_DIR
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.width = width or config.THUMBNAIL_WIDTH
+        self.image_format = image_format or config.THUMBNAIL_FORMAT
+        self.quality = quality or config.THUMBNAIL_QUALITY
+        self.max_bytes = max_bytes if max_bytes is not None else config.THUMBNAIL_MAX_BYTES
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or config.THUMBNAIL_WORKERS,
+            thread_name_prefix="thumbnail"
+        )
+        self._pending: Dict[Path, Future] = {}  # 作成中のサムネイル
+        self._lock = threading.Lock()
+
+    def thumbnail_path(self, path: str) -> Path:
+        """
+        画像に対応するサムネイルのパス（画像の現在のサイズと更新時刻に基づく）
+
+        Args:
+            path: 元画像のパス
+
+        Returns:
+            サムネイルのパス
+
+        Raises:
+            FileNotFoundError: 元画像が存在しない場合
+        """
+        st = os.stat(path)
+        key_source = f"{Path(path).resolve()}|{st.st_size}|{st.st_mtime_ns}|{self.width}|{self.image_format}|{self.quality}"
+        key = hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+        return self.cache_dir / key[:2] / f"{key}{FORMAT_SUFFIXES[self.image_format]}"
+
+    def get(self, path: str) -> Optional[Path]:
+        """
+        作成済みのサムネイルを取得（作成はしない）
+
+        Args:
+            path: 元画像のパス
+
+        Returns:
+            サムネイルのパス（未作成の場合はNone）
+        """
+        thumb = self.thumbnail_path(path)
+        return thumb if _touch(thumb) else None
+
+    def prefetch(self, paths: List[str]) -> List[Future]:
+        """
+        未作成のサムネイルをバックグラウンドで作成
+
+        Args:
+            paths: 元画像のパスのリスト
+
+        Returns:
+            paths と同じ順の Future（結果はサムネイルのパス）
+        """
+        return [self._submit(path) for path in paths]
+
+    def ensure(self, paths: List[str]) -> List[Path]:
+        """
+        サムネイルを取得（未作成のものは並列に作成して待機）
+
+        Args:
+            paths: 元画像のパスのリスト
+
+        Returns:
+            paths と同じ順のサムネイルのパス
+        """
+        return [future.result() for future in self.prefetch(paths)]
+
+    def prune(self) -> int:
+        """
+        上限サイズを超えた分を最後に使った時刻の古い順に削除
+
+        Returns:
+            削除したファイル数
+        """
+        entries = []
+        total = 0
+        for bucket in self.cache_dir.iterdir():
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue  # 別プロセスが削除済み
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return 0
+
+        with self._lock:
+            pending = {str(thumb) for thumb in self._pending}
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path in pending:
+                continue
+            Path(path).unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def shutdown(self):
+        """作成中のサムネイルを待って終了"""
+        self._executor.shutdown(wait=True)
+
+    def _submit(self, path: str) -> Future:
+        """サムネイルの作成を登録（作成済み・作成中の場合は再利用）"""
+        thumb = self.thumbnail_path(path)
+        with self._lock:
+            future = self._pending.get(thumb)
+            if future is not None:
+                return future
+            future = Future()
+            if _touch(thumb):
+                future.set_result(thumb)
+                return future
+            future = self._executor.submit(
+                make_thumbnail, Path(path), thumb, self.width, self.image_format, self.quality
+            )
+            self._pending[thumb] = future
+        future.add_done_callback(lambda _: self._done(thumb))
+        return future
+
+    def _done(self, thumb: Path):
+        """作成が終わったサムネイルを作成中の一覧から外す"""
+        with self._lock:
+            self._pending.pop(thumb, None)
+
+
+def _touch(path: Path) -> bool:
+    """ファイルの更新時刻を現在時刻にする（最後に使った時刻の記録、存在しない場合はFalse）"""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False